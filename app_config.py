@@ -0,0 +1,49 @@
+import os
+import json
+import tempfile
+
+# 程序数据目录（可通过环境变量 PYPI_MANAGER_HOME 修改）
+APP_DIR_NAME = ".pypi_manager"
+
+
+def get_data_dir(*parts):
+    """获取程序数据目录下的子目录，不存在时自动创建"""
+    base_dir = os.environ.get("PYPI_MANAGER_HOME") or os.path.join(os.path.expanduser("~"), APP_DIR_NAME)
+    path = os.path.join(base_dir, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def load_json(path, default=None):
+    """读取JSON文件，文件不存在或损坏时返回默认值"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_json(path, data):
+    """原子方式写入JSON文件（先写临时文件再替换）"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            # json.dumps使用C编码器，比json.dump逐块写入快得多
+            f.write(json.dumps(data, ensure_ascii=False))
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def load_settings():
+    """读取程序设置"""
+    return load_json(os.path.join(get_data_dir(), "settings.json"), {})
+
+
+def save_settings(settings):
+    """保存程序设置"""
+    save_json(os.path.join(get_data_dir(), "settings.json"), settings)
@@ -0,0 +1,59 @@
+import sys
+from collections import namedtuple
+
+from package_inventory import PackageInventory, normalize_name
+from pip_runner import SplitRetry
+
+# 单个包的卸载结果
+UninstallResult = namedtuple("UninstallResult", ["name", "version", "success", "message"])
+
+
+class BatchUninstaller:
+    def __init__(self, python_path=None, timeout_per_package=10, min_timeout=60, max_invocations=20):
+        self.python_path = python_path or sys.executable
+        self.timeout_per_package = timeout_per_package
+        self.min_timeout = min_timeout
+        # 拆分重试的pip调用次数上限
+        self.max_invocations = max_invocations
+        # pip调用次数
+        self.invocations = 0
+
+    def build_command(self, packages):
+        """构建一次性卸载所有包的pip命令"""
+        cmd = [self.python_path, "-m", "pip", "uninstall", "-y", "--disable-pip-version-check"]
+        cmd.extend(packages)
+        return cmd
+
+    def uninstall(self, packages, status_callback=None, line_callback=None):
+        """在一次pip事务中卸载所有包，失败时二分拆分以定位出错的包
+
+        超时（如Windows上文件被占用）时拆分也无济于事，整组记为失败
+
+        line_callback 不为None时实时逐行回调pip的输出
+        返回 UninstallResult 列表，顺序与输入一致
+        """
+        inventory = PackageInventory(self.python_path)
+        before = {normalize_name(p.name): p.version for p in inventory.list_packages()}
+
+        runner = SplitRetry(
+            self.build_command,
+            lambda chunk: max(self.min_timeout, self.timeout_per_package * len(chunk)),
+            max_invocations=self.max_invocations
+        )
+        failures = runner.run(packages, status_callback, line_callback)
+        self.invocations = runner.invocations
+
+        after = {normalize_name(p.name) for p in inventory.list_packages()}
+        results = []
+        for name in packages:
+            key = normalize_name(name)
+            if key not in before:
+                results.append(UninstallResult(name, None, False, "未安装"))
+            elif key not in after:
+                # 整组失败（如超时）前可能已卸载了其中一部分
+                results.append(UninstallResult(name, before.get(key), True, ""))
+            elif key in failures:
+                results.append(UninstallResult(name, before.get(key), False, failures[key]))
+            else:
+                results.append(UninstallResult(name, before.get(key), False, "卸载后仍存在"))
+        return results
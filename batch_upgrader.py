@@ -0,0 +1,97 @@
+import sys
+import time
+import subprocess
+from collections import namedtuple
+
+from package_inventory import PackageInventory, normalize_name
+from dependency_graph import DependencyGraph
+from pip_runner import SplitRetry, summarize_pip_error
+from mirror_failover import is_mirror_error
+
+# 单个包的升级结果，changed 为False表示pip成功但版本未变化
+UpgradeResult = namedtuple("UpgradeResult", ["name", "old_version", "new_version", "success", "message", "changed"])
+
+
+class BatchUpgrader:
+    def __init__(self, python_path=None, mirror_url=None, timeout_per_package=30, min_timeout=120, max_invocations=20):
+        self.python_path = python_path or sys.executable
+        self.mirror_url = mirror_url
+        self.timeout_per_package = timeout_per_package
+        self.min_timeout = min_timeout
+        # 拆分重试的pip调用次数上限，多个包失败时避免调用次数失控
+        self.max_invocations = max_invocations
+        # pip调用次数，用于估算节省的时间
+        self.invocations = 0
+
+    def build_command(self, packages):
+        """构建一次性升级所有包的pip命令"""
+        cmd = [self.python_path, "-m", "pip", "install", "--upgrade",
+               "--disable-pip-version-check", "--progress-bar", "off"]
+        cmd.extend(packages)
+        if self.mirror_url:
+            cmd.extend(["-i", self.mirror_url])
+        return cmd
+
+    def upgrade(self, packages, status_callback=None, line_callback=None):
+        """在一次pip事务中升级所有包，失败时二分拆分以定位出错的包
+
+        超时或镜像源故障时拆分也无济于事，整组记为失败
+
+        line_callback 不为None时实时逐行回调pip的输出
+        返回 UpgradeResult 列表，顺序与输入一致
+        """
+        inventory = PackageInventory(self.python_path)
+        installed = inventory.list_packages()
+        before = {normalize_name(p.name): p.version for p in installed}
+
+        # 按依赖顺序排列（依赖在前），拆分重试时先升级被依赖的包
+        ordered = DependencyGraph(installed).topological_order(packages)
+        runner = SplitRetry(
+            self.build_command,
+            lambda chunk: max(self.min_timeout, self.timeout_per_package * len(chunk)),
+            fatal_error=self._fatal_error,
+            max_invocations=self.max_invocations
+        )
+        failures = runner.run(ordered, status_callback, line_callback)
+        self.invocations = runner.invocations
+
+        after = {normalize_name(p.name): p.version for p in inventory.list_packages()}
+        results = []
+        for name in packages:
+            key = normalize_name(name)
+            old_version = before.get(key)
+            new_version = after.get(key)
+            if key in failures:
+                results.append(UpgradeResult(name, old_version, new_version, False, failures[key], False))
+            elif old_version == new_version:
+                results.append(UpgradeResult(name, old_version, new_version, True, "版本未变化", False))
+            else:
+                results.append(UpgradeResult(name, old_version, new_version, True, "", True))
+        return results
+
+    def _fatal_error(self, message):
+        """镜像源故障时每一半都会同样失败，不再拆分"""
+        if is_mirror_error(message):
+            return f"镜像源连接失败: {summarize_pip_error(message)}"
+        return None
+
+    def measure_pip_overhead(self):
+        """测量一次pip进程的启动开销（秒）"""
+        start_time = time.time()
+        try:
+            subprocess.run(
+                [self.python_path, "-m", "pip", "--version"],
+                capture_output=True,
+                text=True,
+                timeout=30
+            )
+        except Exception:
+            return 0.0
+        return time.time() - start_time
+
+    def estimate_time_saved(self, package_count, overhead=None):
+        """估算与逐个升级相比节省的时间（秒）"""
+        if overhead is None:
+            overhead = self.measure_pip_overhead()
+        saved_invocations = max(0, package_count - self.invocations)
+        return saved_invocations * overhead
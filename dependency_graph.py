@@ -0,0 +1,151 @@
+import re
+import heapq
+from collections import deque
+
+from package_inventory import normalize_name, requirement_name
+
+# 打包工具，即使没有其他包依赖也不视为孤立包
+PROTECTED_PACKAGES = {"pip", "setuptools", "wheel"}
+
+# 只在安装extras时才需要的依赖，如 'PySocks>=1.5.6; extra == "socks"'
+EXTRA_MARKER_PATTERN = re.compile(r";.*\bextra\s*==")
+EXTRA_NAME_PATTERN = re.compile(r"\bextra\s*==\s*[\"']([^\"']+)[\"']")
+
+
+class DependencyGraph:
+    """根据已安装包的Requires-Dist元数据建立的依赖关系图
+
+    只包含已安装的包之间的依赖。extras条件的依赖（多为测试和可选功能）不计入普通依赖，
+    单独记录在 extra_forward 中，仅在 closure 指定extras时使用；
+    平台等环境标记的依赖都计入，判断包是否仍被需要时偏保守
+    """
+
+    def __init__(self, packages):
+        self.packages = {normalize_name(p.name): p for p in packages}
+        # 正向索引: 包 -> 它依赖的包；反向索引: 包 -> 依赖它的包
+        self.forward = {key: set() for key in self.packages}
+        self.reverse = {key: set() for key in self.packages}
+        # extras的依赖单独记录: 包 -> {extra: 依赖的包}
+        self.extra_forward = {}
+        for key, package in self.packages.items():
+            for requirement in package.requires:
+                if EXTRA_MARKER_PATTERN.search(requirement):
+                    dependency = requirement_name(requirement)
+                    if dependency in self.packages:
+                        for extra in EXTRA_NAME_PATTERN.findall(requirement):
+                            extras = self.extra_forward.setdefault(key, {})
+                            extras.setdefault(normalize_name(extra), set()).add(dependency)
+                    continue
+                dependency = requirement_name(requirement)
+                if dependency in self.packages and dependency != key:
+                    self.forward[key].add(dependency)
+                    self.reverse[dependency].add(key)
+
+    def name(self, key):
+        """规范化名称对应的原始包名"""
+        return self.packages[key].name
+
+    def requirements(self, name):
+        """包直接依赖的已安装包（规范化名称）"""
+        return set(self.forward.get(normalize_name(name), ()))
+
+    def dependents(self, name, transitive=False):
+        """依赖该包的已安装包（规范化名称），transitive 为True时包括间接依赖它的包"""
+        key = normalize_name(name)
+        if not transitive:
+            return set(self.reverse.get(key, ()))
+        found = set()
+        queue = deque([key])
+        while queue:
+            for dependent in self.reverse.get(queue.popleft(), ()):
+                if dependent not in found and dependent != key:
+                    found.add(dependent)
+                    queue.append(dependent)
+        return found
+
+    def closure(self, roots):
+        """roots 及其全部依赖（规范化名称集合）
+
+        roots 中的元素为包名或 (包名, extras)，指定extras时包括对应extras的依赖
+        """
+        found = set()
+        queue = deque()
+        for root in roots:
+            name, extras = (root, ()) if isinstance(root, str) else root
+            key = normalize_name(name)
+            if key not in self.packages:
+                continue
+            queue.append(key)
+            for extra in extras:
+                queue.extend(self.extra_forward.get(key, {}).get(normalize_name(extra), ()))
+        while queue:
+            key = queue.popleft()
+            if key in found:
+                continue
+            found.add(key)
+            queue.extend(self.forward[key] - found)
+        return found
+
+    def impact(self, removing):
+        """卸载 removing 后受影响的包: {包: [它依赖的被卸载或受影响的包]}
+
+        直接依赖被卸载包的包会缺少依赖，间接依赖的包也可能无法正常使用
+        """
+        removed = {normalize_name(name) for name in removing}
+        affected = {}
+        queue = deque(removed)
+        while queue:
+            key = queue.popleft()
+            for dependent in self.reverse.get(key, ()):
+                if dependent in removed:
+                    continue
+                if dependent not in affected:
+                    affected[dependent] = []
+                    queue.append(dependent)
+                affected[dependent].append(key)
+        return {key: sorted(causes) for key, causes in affected.items()}
+
+    def topological_order(self, names=None):
+        """依赖在前、依赖它的包在后的顺序（同一层按名称排序），用于升级
+
+        names 不为None时只返回其中的包（保持整体图中的相对顺序），
+        未安装的包排在最后；循环依赖中的包按名称排在已排序的包之后
+        """
+        remaining = {key: len(deps) for key, deps in self.forward.items()}
+        ready = [key for key, count in remaining.items() if count == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            key = heapq.heappop(ready)
+            order.append(key)
+            for dependent in self.reverse[key]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    heapq.heappush(ready, dependent)
+        if len(order) < len(self.packages):
+            placed = set(order)
+            order.extend(sorted(key for key in self.packages if key not in placed))
+
+        if names is None:
+            return order
+        position = {key: i for i, key in enumerate(order)}
+        return sorted(names, key=lambda name: position.get(normalize_name(name), len(order)))
+
+    def orphans(self, removing):
+        """卸载 removing 后不再被任何包需要的依赖包（规范化名称，按名称排序）
+
+        用户主动安装的包（有REQUESTED标记）和打包工具不会被视为孤立包
+        """
+        removed = {normalize_name(name) for name in removing}
+        orphans = set()
+        pending = [dep for key in removed for dep in self.forward.get(key, ())]
+        while pending:
+            key = pending.pop()
+            if key in removed or key in PROTECTED_PACKAGES or self.packages[key].requested:
+                continue
+            if self.reverse[key] <= removed:
+                removed.add(key)
+                orphans.add(key)
+                # 该包也被卸载后，它的依赖可能随之变为孤立包
+                pending.extend(self.forward[key])
+        return sorted(orphans)
@@ -15,7 +15,7 @@ print("Current directory:", os.getcwd())
 print("Python path:", sys.executable)
 
 # Check necessary files
-files = ["main.py", "main_gui.py", "version_fetcher.py", "installer.py"]
+files = ["main.py", "main_gui.py", "version_fetcher.py", "installer.py", "package_inventory.py", "version_utils.py", "pypi_index.py", "outdated_checker.py", "batch_upgrader.py", "app_config.py", "index_cache.py", "mirror_probe.py", "mirror_failover.py", "index_proxy.py", "download_engine.py", "installer_cache.py", "release_index.py", "http_client.py", "progress.py", "pip_runner.py", "install_monitor.py", "multi_env.py", "venv_discovery.py", "venv_clone.py", "batch_uninstaller.py", "dependency_graph.py", "lockfile.py", "requirements.py", "env_sync.py", "search_index.py", "version_lookup.py"]
 
 print("\nChecking files:")
 all_files_exist = True
@@ -0,0 +1,188 @@
+import os
+import time
+import hashlib
+import threading
+
+import requests
+
+from app_config import load_json, save_json
+from http_client import get_client
+
+
+class DownloadError(Exception):
+    """下载或校验失败"""
+
+
+class DownloadEngine:
+    def __init__(self, connections=4, buffer_size=1024 * 1024, min_segment_size=2 * 1024 * 1024,
+                 timeout=30, max_retries=3, session=None):
+        self.connections = connections
+        # 写入缓冲区大小（原实现为8KB）
+        self.buffer_size = buffer_size
+        self.min_segment_size = min_segment_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = session or get_client().session
+
+    def download(self, url, dest_path, expected_hash=None, progress_callback=None):
+        """下载文件到dest_path，支持多连接分段下载和断点续传
+
+        expected_hash: (算法, 十六进制摘要)，如 ("sha256", "..."), 为None时不校验
+        progress_callback(已下载字节数, 总字节数)
+        """
+        part_path = dest_path + ".part"
+        state_path = dest_path + ".part.json"
+
+        size, accepts_ranges, etag = self._probe(url)
+        if size and accepts_ranges:
+            self._download_segmented(url, part_path, state_path, size, etag, progress_callback)
+        else:
+            self._download_single(url, part_path, state_path, accepts_ranges, progress_callback)
+
+        if expected_hash:
+            algorithm, expected = expected_hash
+            actual = self.file_hash(part_path, algorithm)
+            if actual.lower() != expected.lower():
+                # 数据已损坏，删除后下次重新下载
+                os.remove(part_path)
+                if os.path.exists(state_path):
+                    os.remove(state_path)
+                raise DownloadError(f"{algorithm}校验失败: 期望 {expected}，实际 {actual}")
+
+        os.replace(part_path, dest_path)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        return dest_path
+
+    def file_hash(self, path, algorithm="sha256"):
+        """计算文件摘要"""
+        digest = hashlib.new(algorithm)
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(self.buffer_size), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _probe(self, url):
+        """获取文件大小、是否支持Range以及ETag"""
+        try:
+            response = self.session.head(url, allow_redirects=True, timeout=self.timeout)
+            if response.status_code >= 400:
+                return 0, False, None
+            size = int(response.headers.get("Content-Length", 0) or 0)
+            accepts_ranges = response.headers.get("Accept-Ranges", "").lower() == "bytes"
+            return size, accepts_ranges, response.headers.get("ETag")
+        except (requests.RequestException, ValueError):
+            return 0, False, None
+
+    def _plan_segments(self, size):
+        """按连接数切分下载区间 [start, end]"""
+        count = max(1, min(self.connections, size // self.min_segment_size))
+        segment_size = size // count
+        segments = []
+        for i in range(count):
+            start = i * segment_size
+            end = size - 1 if i == count - 1 else start + segment_size - 1
+            segments.append({"start": start, "end": end, "done": 0})
+        return segments
+
+    def _download_segmented(self, url, part_path, state_path, size, etag, progress_callback):
+        """多连接Range下载到预分配的文件中"""
+        state = load_json(state_path)
+        resumable = (
+            state is not None
+            and os.path.exists(part_path)
+            and state.get("url") == url
+            and state.get("size") == size
+            and state.get("etag") == etag
+        )
+        if not resumable:
+            state = {"url": url, "size": size, "etag": etag, "segments": self._plan_segments(size)}
+            # 预分配文件空间
+            with open(part_path, "wb") as f:
+                f.truncate(size)
+            save_json(state_path, state)
+
+        lock = threading.Lock()
+        errors = []
+        last_saved = [time.time()]
+
+        def downloaded_total():
+            return sum(seg["done"] for seg in state["segments"])
+
+        def report():
+            if progress_callback:
+                progress_callback(downloaded_total(), size)
+
+        def fetch_segment(segment):
+            attempts = 0
+            while segment["start"] + segment["done"] <= segment["end"]:
+                offset = segment["start"] + segment["done"]
+                try:
+                    headers = {"Range": f"bytes={offset}-{segment['end']}"}
+                    with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                        if response.status_code != 206:
+                            raise DownloadError(f"服务器未返回分段内容 (HTTP {response.status_code})")
+                        with open(part_path, "r+b") as f:
+                            f.seek(offset)
+                            for chunk in response.iter_content(chunk_size=self.buffer_size):
+                                if not chunk:
+                                    continue
+                                f.write(chunk)
+                                with lock:
+                                    segment["done"] += len(chunk)
+                                    # 定期保存进度以便中断后续传
+                                    if time.time() - last_saved[0] >= 1:
+                                        save_json(state_path, state)
+                                        last_saved[0] = time.time()
+                                report()
+                    if segment["start"] + segment["done"] <= segment["end"]:
+                        # 服务器提前结束响应（包括返回0字节）时不会抛出异常，也算作一次失败，避免无限重试
+                        received = segment["start"] + segment["done"] - offset
+                        raise DownloadError(f"分段内容不完整（收到 {received} 字节，需要 {segment['end'] - offset + 1} 字节）")
+                except (requests.RequestException, OSError, DownloadError) as e:
+                    attempts += 1
+                    if attempts > self.max_retries:
+                        with lock:
+                            errors.append(e)
+                        return
+                    time.sleep(min(2 ** attempts, 10))
+
+        threads = []
+        for segment in state["segments"]:
+            if segment["start"] + segment["done"] <= segment["end"]:
+                thread = threading.Thread(target=fetch_segment, args=(segment,))
+                thread.daemon = True
+                thread.start()
+                threads.append(thread)
+        report()
+        for thread in threads:
+            thread.join()
+
+        save_json(state_path, state)
+        if errors:
+            raise DownloadError(f"分段下载失败（已保存进度，可重新下载续传）: {errors[0]}")
+
+    def _download_single(self, url, part_path, state_path, accepts_ranges, progress_callback):
+        """服务器不支持Range或大小未知时的单连接下载"""
+        state = load_json(state_path)
+        offset = 0
+        if accepts_ranges and state and state.get("url") == url and os.path.exists(part_path):
+            offset = os.path.getsize(part_path)
+        else:
+            save_json(state_path, {"url": url, "single": True})
+
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if offset and response.status_code != 206:
+                # 服务器忽略了Range，从头开始
+                offset = 0
+            response.raise_for_status()
+            total = int(response.headers.get("Content-Length", 0) or 0) + offset
+            downloaded = offset
+            with open(part_path, "ab" if offset else "wb") as f:
+                for chunk in response.iter_content(chunk_size=self.buffer_size):
+                    if chunk:
+                        f.write(chunk)
+                        downloaded += len(chunk)
+                        if progress_callback:
+                            progress_callback(downloaded, total)
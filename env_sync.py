@@ -0,0 +1,145 @@
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from package_inventory import PackageInventory, normalize_name
+from dependency_graph import DependencyGraph, PROTECTED_PACKAGES
+from requirements import (
+    evaluate_markers, parse_requirements_file, merge_requirements, requirement_line, write_temp_requirements
+)
+from version_utils import version_matches
+
+# 同步计划
+# install: 未安装的依赖；change: [(依赖, 已安装版本)] 已安装但版本不满足约束；
+# remove: 不再需要的已安装包；satisfied: 已满足的依赖；
+# unmanaged: 无法按名称比较的行（URL、本地路径、-e 等），每次同步都交给pip处理；
+# options: 索引地址等pip选项，只在需要安装时传给pip；
+# skipped: 环境标记不适用于目标解释器的依赖；notes: 提示信息
+SyncPlan = namedtuple("SyncPlan", ["install", "change", "remove", "satisfied", "unmanaged", "options", "skipped", "notes"])
+
+# 只在实际安装时才需要传给pip的选项（索引地址等），不单独触发安装
+PASSTHROUGH_OPTIONS = (
+    "-c", "--constraint", "-i", "--index-url", "--extra-index-url", "--no-index", "-f", "--find-links",
+    "--pre", "--trusted-host", "--prefer-binary", "--only-binary", "--no-binary"
+)
+
+
+def _own_requirements():
+    """本程序自身的依赖（requires.txt），同步当前解释器时不能卸载"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "requires.txt")
+    try:
+        requirements, _ = parse_requirements_file(path)
+    except OSError:
+        return []
+    return requirements
+
+
+def _is_passthrough(line):
+    return line.split("=", 1)[0].split(None, 1)[0] in PASSTHROUGH_OPTIONS
+
+
+class EnvSync:
+    def __init__(self, python_path=None):
+        self.python_path = python_path or sys.executable
+        self.inventory = PackageInventory(self.python_path)
+
+    def plan(self, requirements, others=(), remove_extra=False):
+        """比较依赖列表与已安装的包，计算最小的安装、变更和卸载计划
+
+        requirements 为 Requirement 列表，others 为无法按名称比较的行；
+        remove_extra 为True时列出不被任何依赖需要的已安装包
+        """
+        # 读取已安装的包与在目标解释器中计算环境标记互不依赖，同时进行
+        markers = [r.marker for r in requirements if r.marker]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            marker_future = executor.submit(evaluate_markers, markers, self.python_path)
+            packages = self.inventory.list_packages()
+            applicable = marker_future.result()
+
+        installed = {normalize_name(p.name): p for p in packages}
+        install = []
+        change = []
+        satisfied = []
+        skipped = []
+        wanted = []
+        for requirement in requirements:
+            if requirement.marker and not applicable.get(requirement.marker, True):
+                skipped.append(requirement)
+            else:
+                wanted.append(requirement)
+
+        for requirement in merge_requirements(wanted, by_marker=False):
+            package = installed.get(requirement.key)
+            if package is None:
+                install.append(requirement)
+            elif not version_matches(package.version, requirement.specifier):
+                change.append((requirement, package.version))
+            else:
+                satisfied.append(requirement)
+
+        unmanaged = [line for line in others if not _is_passthrough(line)]
+        options = [line for line in others if _is_passthrough(line)]
+        notes = []
+        remove = []
+        if remove_extra:
+            if unmanaged:
+                # 无法得知URL、本地路径等安装的是哪个包，卸载可能误删
+                notes.append("文件中包含无法按名称比较的依赖，不列出多余的包")
+            else:
+                remove = self._extra_packages(packages, wanted)
+
+        return SyncPlan(install, change, remove, satisfied, unmanaged, options, skipped, notes)
+
+    def _extra_packages(self, packages, requirements):
+        """已安装但不被依赖列表（及其依赖）需要的包，按名称排序"""
+        graph = DependencyGraph(packages)
+        roots = [(r.key, r.extras) for r in requirements]
+        if os.path.normcase(os.path.abspath(self.python_path)) == os.path.normcase(os.path.abspath(sys.executable)):
+            roots.extend((r.key, r.extras) for r in _own_requirements())
+        keep = graph.closure(roots) | PROTECTED_PACKAGES
+        return sorted(graph.name(key) for key in graph.packages if key not in keep)
+
+    def needs_install(self, plan):
+        return bool(plan.install or plan.change or plan.unmanaged)
+
+    def write_install_file(self, plan, directory=None):
+        """把安装和变更的依赖写入临时requirements文件，返回文件路径（调用方负责删除）
+
+        directory 为原requirements文件所在目录，使其中的相对路径保持有效
+        """
+        requirements = plan.install + [r for r, _ in plan.change]
+        lines = list(plan.options) + [requirement_line(r) for r in requirements] + list(plan.unmanaged)
+        return write_temp_requirements(lines, directory)
+
+    def install_command(self, requirements_path):
+        """安装和变更在一次pip事务中完成，由pip统一解析依赖"""
+        return [self.python_path, "-m", "pip", "install", "--disable-pip-version-check", "-r", requirements_path]
+
+    def confirm_removals(self, plan):
+        """安装完成后重新计算多余的包，去掉新安装的包依赖的包"""
+        if not plan.remove:
+            return []
+        requirements = plan.satisfied + plan.install + [r for r, _ in plan.change]
+        extra = {normalize_name(name) for name in self._extra_packages(self.inventory.list_packages(), requirements)}
+        return [name for name in plan.remove if normalize_name(name) in extra]
+
+
+def format_plan(plan):
+    """同步计划的文本说明"""
+    lines = [
+        f"已满足: {len(plan.satisfied)}  安装: {len(plan.install)}  变更版本: {len(plan.change)}  卸载: {len(plan.remove)}"
+    ]
+    for requirement in plan.install:
+        lines.append(f"  + {requirement_line(requirement, with_options=False)}")
+    for requirement, version in plan.change:
+        lines.append(f"  ~ {requirement.name} {version} -> {requirement.specifier}")
+    for name in plan.remove:
+        lines.append(f"  - {name}")
+    for line in plan.unmanaged:
+        lines.append(f"  ? {line}（交给pip处理）")
+    for requirement in plan.skipped:
+        lines.append(f"  跳过（环境标记不适用）: {requirement.line}")
+    for note in plan.notes:
+        lines.append(f"  ⚠️ {note}")
+    return "\n".join(lines)
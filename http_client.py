@@ -0,0 +1,131 @@
+import time
+import threading
+from collections import namedtuple, deque
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app_config import load_settings
+
+RequestMetric = namedtuple("RequestMetric", ["method", "host", "url", "status", "elapsed", "size", "error"])
+
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 30
+DEFAULT_RETRIES = 3
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class _MeteredSession(requests.Session):
+    """记录每个请求耗时并提供默认超时的Session"""
+
+    def __init__(self, client):
+        super().__init__()
+        self._client = client
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self._client.timeout)
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, **kwargs)
+        except requests.RequestException as e:
+            self._client.record(method, url, None, time.perf_counter() - start, 0, type(e).__name__)
+            raise
+        # 流式请求只统计到收到响应头为止
+        size = len(response.content) if not kwargs.get("stream") else int(response.headers.get("Content-Length", 0) or 0)
+        self._client.record(method, url, response.status_code, time.perf_counter() - start, size, None)
+        return response
+
+
+class HttpClient:
+    def __init__(self, connect_timeout=None, read_timeout=None, retries=None, backoff_factor=0.5,
+                 pool_maxsize=16, proxy=None, max_metrics=1000):
+        self.backoff_factor = backoff_factor
+        self.pool_maxsize = pool_maxsize
+        self.metrics = deque(maxlen=max_metrics)
+        self._lock = threading.Lock()
+        self.session = _MeteredSession(self)
+        self.configure(connect_timeout, read_timeout, retries, proxy)
+
+    def configure(self, connect_timeout=None, read_timeout=None, retries=None, proxy=None):
+        """应用超时、重试和代理设置（未指定的项从程序设置中读取）"""
+        settings = load_settings()
+        connect_timeout = connect_timeout or settings.get("http_connect_timeout", DEFAULT_CONNECT_TIMEOUT)
+        read_timeout = read_timeout or settings.get("http_read_timeout", DEFAULT_READ_TIMEOUT)
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = settings.get("http_retries", DEFAULT_RETRIES) if retries is None else retries
+        self.proxy = proxy or settings.get("http_proxy")
+
+        # 只重试幂等请求，退避时间 0.5s, 1s, 2s ...
+        retry_kwargs = dict(
+            total=self.retries,
+            connect=self.retries,
+            read=self.retries,
+            status=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=RETRY_STATUS,
+            raise_on_status=False
+        )
+        try:
+            retry = Retry(allowed_methods=frozenset(["GET", "HEAD", "OPTIONS"]), **retry_kwargs)
+        except TypeError:
+            # urllib3 < 1.26
+            retry = Retry(method_whitelist=frozenset(["GET", "HEAD", "OPTIONS"]), **retry_kwargs)
+
+        # 每个主机一个连接池，连接保持复用
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=self.pool_maxsize, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.proxies = {"http": self.proxy, "https": self.proxy} if self.proxy else {}
+
+    def get(self, url, **kwargs):
+        return self.session.get(url, **kwargs)
+
+    def head(self, url, **kwargs):
+        kwargs.setdefault("allow_redirects", True)
+        return self.session.head(url, **kwargs)
+
+    def download_file(self, url, dest_path, chunk_size=1024 * 1024):
+        """下载小文件到本地"""
+        with self.session.get(url, stream=True) as response:
+            response.raise_for_status()
+            with open(dest_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if chunk:
+                        f.write(chunk)
+        return dest_path
+
+    def record(self, method, url, status, elapsed, size, error):
+        with self._lock:
+            self.metrics.append(RequestMetric(method.upper(), urlsplit(url).netloc, url, status, elapsed, size, error))
+
+    def summary(self):
+        """按主机汇总请求统计: {主机: {count, errors, total_time, avg_time, max_time, bytes}}"""
+        with self._lock:
+            metrics = list(self.metrics)
+        result = {}
+        for metric in metrics:
+            stats = result.setdefault(metric.host, {"count": 0, "errors": 0, "total_time": 0.0, "max_time": 0.0, "bytes": 0})
+            stats["count"] += 1
+            if metric.error or (metric.status and metric.status >= 400):
+                stats["errors"] += 1
+            stats["total_time"] += metric.elapsed
+            stats["max_time"] = max(stats["max_time"], metric.elapsed)
+            stats["bytes"] += metric.size
+        for stats in result.values():
+            stats["avg_time"] = stats["total_time"] / stats["count"]
+        return result
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """获取全局共享的HTTP客户端"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
@@ -0,0 +1,122 @@
+import os
+import time
+import hashlib
+import threading
+
+from app_config import get_data_dir, load_json, save_json
+
+
+class IndexCache:
+    def __init__(self, cache_dir=None, ttl=600, max_size=200 * 1024 * 1024):
+        self.cache_dir = cache_dir or get_data_dir("cache", "index")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._total_size = None
+
+    def _entry_path(self, mirror_url, project, kind):
+        """按 (镜像源, 项目, 类型) 计算缓存文件路径"""
+        key = f"{kind}\n{mirror_url.rstrip('/')}\n{project}"
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest + ".json")
+
+    def get(self, mirror_url, project, kind="simple"):
+        """读取缓存条目，不存在时返回None"""
+        path = self._entry_path(mirror_url, project, kind)
+        entry = load_json(path)
+        if entry is None:
+            return None
+        # 更新文件时间作为LRU访问时间
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry
+
+    def is_fresh(self, entry):
+        """条目是否仍在TTL有效期内"""
+        return time.time() - entry.get("fetched_at", 0) < self.ttl
+
+    def put(self, mirror_url, project, body, content_type="", etag=None, last_modified=None, kind="simple"):
+        """写入缓存条目，并在超出容量时按LRU淘汰"""
+        path = self._entry_path(mirror_url, project, kind)
+        entry = {
+            "mirror_url": mirror_url,
+            "project": project,
+            "kind": kind,
+            "content_type": content_type,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+            "body": body
+        }
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        save_json(path, entry)
+        new_size = os.path.getsize(path)
+
+        with self._lock:
+            if self._total_size is None:
+                self._total_size = self._compute_total_size()
+            else:
+                self._total_size += new_size - old_size
+            if self._total_size > self.max_size:
+                self._evict()
+        return entry
+
+    def touch(self, mirror_url, project, entry, kind="simple"):
+        """重新验证成功（304）后刷新条目的获取时间"""
+        entry["fetched_at"] = time.time()
+        save_json(self._entry_path(mirror_url, project, kind), entry)
+        return entry
+
+    def conditional_headers(self, entry):
+        """根据缓存条目生成条件请求头"""
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            for path, _, _ in self._iter_files():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._total_size = 0
+
+    def _iter_files(self):
+        """遍历所有缓存文件，返回 (路径, 大小, 访问时间)"""
+        for sub in os.scandir(self.cache_dir):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(".json"):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    yield entry.path, stat.st_size, stat.st_mtime
+
+    def _compute_total_size(self):
+        return sum(size for _, size, _ in self._iter_files())
+
+    def _evict(self):
+        """按最近最少使用顺序删除条目，直到总大小降到上限的90%"""
+        files = sorted(self._iter_files(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        target = self.max_size * 0.9
+        for path, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._total_size = total
@@ -0,0 +1,194 @@
+import os
+import html
+import shutil
+import hashlib
+import tempfile
+import threading
+import socketserver
+import http.server
+from urllib.parse import quote, unquote
+
+from app_config import get_data_dir
+from pypi_index import SimpleIndexClient
+from http_client import get_client
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class CachingIndexProxy:
+    def __init__(self, upstream_url, cache_dir=None, host="127.0.0.1", port=0, index_cache=None, timeout=60):
+        self.upstream_url = upstream_url
+        self.cache_dir = cache_dir or get_data_dir("cache", "artifacts")
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.session = get_client().session
+        self.client = SimpleIndexClient(upstream_url, timeout=timeout, session=self.session, cache=index_cache)
+
+        # 文件键 -> 上游下载地址（在返回项目页面时记录）
+        self._upstream_urls = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self.stats = {"hits": 0, "misses": 0, "bytes_served": 0}
+
+    @property
+    def url(self):
+        """pip可以直接使用的本地索引地址"""
+        if not self._server:
+            return None
+        return f"http://{self.host}:{self._server.server_address[1]}/simple/"
+
+    def is_running(self):
+        return self._server is not None
+
+    def start(self):
+        """在后台线程中启动代理服务器"""
+        if self._server:
+            return self.url
+        proxy = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                proxy._handle(self)
+
+            def do_HEAD(self):
+                proxy._handle(self, head_only=True)
+
+            def log_message(self, format, *args):
+                # 不向控制台输出访问日志
+                pass
+
+        self._server = _ThreadingHTTPServer((self.host, self.port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        """停止代理服务器"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
+
+    def blob_path(self, key):
+        """内容寻址的文件存储路径"""
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _handle(self, request, head_only=False):
+        path = request.path.split("?", 1)[0]
+        try:
+            if path.startswith("/simple/"):
+                project = unquote(path[len("/simple/"):].strip("/"))
+                if project:
+                    self._serve_project_page(request, project, head_only)
+                else:
+                    request.send_error(404, "Project list is not proxied")
+            elif path.startswith("/files/"):
+                parts = path[len("/files/"):].split("/", 1)
+                if len(parts) != 2:
+                    request.send_error(404)
+                else:
+                    self._serve_file(request, parts[0], unquote(parts[1]), head_only)
+            else:
+                request.send_error(404)
+        except Exception as e:
+            try:
+                request.send_error(502, f"Upstream error: {e}")
+            except Exception:
+                pass
+
+    def _serve_project_page(self, request, project, head_only):
+        """返回PEP 503项目页面，文件链接改写为本地地址"""
+        files = self.client.get_project_files(project)
+        if files is None:
+            request.send_error(404)
+            return
+
+        lines = ["<!DOCTYPE html>", "<html><body>"]
+        for item in files:
+            sha256 = item["hashes"].get("sha256")
+            if sha256:
+                key = sha256.lower()
+            else:
+                key = "url-" + hashlib.sha256(item["url"].encode("utf-8")).hexdigest()
+            with self._lock:
+                self._upstream_urls[key] = item["url"]
+
+            href = f"/files/{key}/{quote(item['filename'])}"
+            if sha256:
+                href += f"#sha256={sha256}"
+            attrs = f'href="{html.escape(href)}"'
+            if item["requires_python"]:
+                attrs += f' data-requires-python="{html.escape(item["requires_python"])}"'
+            if item["yanked"]:
+                attrs += ' data-yanked=""'
+            lines.append(f"<a {attrs}>{html.escape(item['filename'])}</a><br/>")
+        lines.append("</body></html>")
+
+        body = "\n".join(lines).encode("utf-8")
+        request.send_response(200)
+        request.send_header("Content-Type", "text/html; charset=utf-8")
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        if not head_only:
+            request.wfile.write(body)
+
+    def _serve_file(self, request, key, filename, head_only):
+        """命中时直接从磁盘返回，未命中时从上游下载并校验后保存"""
+        path = self.blob_path(key)
+        if os.path.exists(path):
+            with self._lock:
+                self.stats["hits"] += 1
+        else:
+            with self._lock:
+                upstream = self._upstream_urls.get(key)
+                key_lock = self._key_locks.setdefault(key, threading.Lock())
+            if not upstream:
+                request.send_error(404, "Unknown artifact, request the project page first")
+                return
+            # 同一文件的并发请求只下载一次
+            with key_lock:
+                if not os.path.exists(path):
+                    with self._lock:
+                        self.stats["misses"] += 1
+                    self._download(upstream, key, path)
+
+        size = os.path.getsize(path)
+        request.send_response(200)
+        request.send_header("Content-Type", "application/octet-stream")
+        request.send_header("Content-Length", str(size))
+        request.send_header("Content-Disposition", f'attachment; filename="{filename}"')
+        request.end_headers()
+        if head_only:
+            return
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, request.wfile, 1024 * 1024)
+        with self._lock:
+            self.stats["bytes_served"] += size
+
+    def _download(self, url, key, path):
+        """下载上游文件，sha256与键不符时丢弃"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                with self.session.get(url, stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_content(chunk_size=1024 * 1024):
+                        if chunk:
+                            f.write(chunk)
+                            digest.update(chunk)
+            if not key.startswith("url-") and digest.hexdigest() != key:
+                raise ValueError(f"sha256校验失败: {url}")
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
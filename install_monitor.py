@@ -0,0 +1,192 @@
+import os
+import re
+import time
+
+from app_config import get_data_dir, load_json, save_json
+
+# Burn安装程序日志中正在执行的安装包，如 "Applying execute package: core_AllUsers, action: Install"
+PACKAGE_PATTERN = re.compile(r"Applying execute package: (\w+)")
+
+# 安装包ID对应的说明
+PACKAGE_NAMES = {
+    "core": "核心解释器",
+    "exe": "可执行文件",
+    "dev": "开发头文件",
+    "lib": "标准库",
+    "test": "测试套件",
+    "doc": "文档",
+    "tcltk": "Tcl/Tk",
+    "launcher": "py启动器",
+    "pip": "pip",
+    "path": "环境变量",
+    "appendpath": "环境变量",
+    "compileall": "预编译标准库",
+    "ucrt": "运行库"
+}
+
+
+def default_target_dir(version, arch):
+    """安装程序为当前用户安装时的默认目录"""
+    major, minor = version.split(".")[:2]
+    suffix = {"win32": "-32", "arm64": "-arm64"}.get(arch, "")
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+    return os.path.join(base, "Programs", "Python", f"Python{major}{minor}{suffix}")
+
+
+def count_files(path):
+    """统计目录中的文件数量"""
+    total = 0
+    stack = [path]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            else:
+                total += 1
+    return total
+
+
+class InstallHistory:
+    def __init__(self, path=None, keep=10):
+        self.path = path or os.path.join(get_data_dir(), "install_history.json")
+        # 每个版本保留的记录数
+        self.keep = keep
+        self.data = load_json(self.path, {})
+
+    def record(self, version, duration, log_size, file_count):
+        records = self.data.setdefault(version, [])
+        records.append({
+            "duration": duration,
+            "log_size": log_size,
+            "file_count": file_count,
+            "finished_at": time.time()
+        })
+        del records[:-self.keep]
+        save_json(self.path, self.data)
+
+    def _records(self, version):
+        """同版本的记录，没有时使用同系列（如3.12.x）的记录，再没有时使用全部记录"""
+        if self.data.get(version):
+            return self.data[version]
+        series = ".".join(version.split(".")[:2]) + "."
+        records = [r for v, items in self.data.items() if v.startswith(series) for r in items]
+        if records:
+            return records
+        return [r for items in self.data.values() for r in items]
+
+    def expected(self, version):
+        """历史中位数: (耗时, 日志大小, 文件数)，没有历史记录时返回None"""
+        records = self._records(version)
+        if not records:
+            return None
+
+        def median(key):
+            values = sorted(r[key] for r in records if r.get(key))
+            return values[len(values) // 2] if values else 0
+
+        return median("duration"), median("log_size"), median("file_count")
+
+
+class InstallMonitor:
+    """根据安装日志增长和目标目录文件数估算安装进度"""
+
+    def __init__(self, version, log_path, target_dir, history=None, stall_seconds=120):
+        self.version = version
+        self.log_path = log_path
+        self.target_dir = target_dir
+        self.history = history or InstallHistory()
+        self.expected = self.history.expected(version)
+        self.stall_seconds = stall_seconds
+
+        self.start_time = time.time()
+        self.log_size = 0
+        self.file_count = 0
+        self.initial_files = count_files(target_dir) if os.path.isdir(target_dir) else 0
+        self.package = None
+        self._log_offset = 0
+        self._last_change = self.start_time
+        self._last_file_count = 0
+
+    def poll(self):
+        """读取当前状态，返回 (进度百分比或None, 当前安装包, 预计剩余秒数或None, 无进展秒数)"""
+        now = time.time()
+        try:
+            main_size = os.path.getsize(self.log_path)
+        except OSError:
+            main_size = 0
+        if main_size != self._log_offset:
+            self._read_new_log(main_size)
+
+        # 主日志之外，每个安装包还会写入 <日志名>_000_core_JustForMe.log 等日志
+        size = self._total_log_size()
+        if size != self.log_size:
+            self.log_size = size
+            self._last_change = now
+
+        if os.path.isdir(self.target_dir):
+            self.file_count = max(0, count_files(self.target_dir) - self.initial_files)
+            if self.file_count != self._last_file_count:
+                self._last_file_count = self.file_count
+                self._last_change = now
+
+        elapsed = now - self.start_time
+        percent = None
+        remaining = None
+        if self.expected:
+            duration, log_size, file_count = self.expected
+            ratios = []
+            if log_size:
+                ratios.append(self.log_size / log_size)
+            if file_count:
+                ratios.append(self.file_count / file_count)
+            if ratios:
+                percent = min(99, int(max(ratios) * 100))
+            if duration:
+                if percent:
+                    # 按实际进度推算剩余时间，比固定历史耗时更准确
+                    remaining = max(0, elapsed * (100 - percent) / percent)
+                else:
+                    remaining = max(0, duration - elapsed)
+        return percent, self.package, remaining, now - self._last_change
+
+    def _total_log_size(self):
+        directory = os.path.dirname(self.log_path) or "."
+        prefix = os.path.splitext(os.path.basename(self.log_path))[0]
+        total = 0
+        try:
+            for entry in os.scandir(directory):
+                if entry.name.startswith(prefix) and entry.name.endswith(".log"):
+                    total += entry.stat().st_size
+        except OSError:
+            pass
+        return total
+
+    def _read_new_log(self, size):
+        """只读取日志新增的部分，找出正在执行的安装包"""
+        try:
+            with open(self.log_path, "rb") as f:
+                f.seek(self._log_offset)
+                data = f.read(size - self._log_offset)
+            self._log_offset = size
+        except OSError:
+            return
+        # 去掉UTF-16编码日志中的空字节，关键字都是ASCII字符
+        text = data.replace(b"\x00", b"").decode("utf-8", errors="ignore")
+        for match in PACKAGE_PATTERN.finditer(text):
+            package_id = match.group(1).split("_")[0].lower()
+            self.package = PACKAGE_NAMES.get(package_id, package_id)
+
+    def is_stalled(self, idle_seconds):
+        return idle_seconds >= self.stall_seconds
+
+    def finish(self, success):
+        """安装结束，成功时写入历史记录用于下次估算"""
+        self.poll()
+        duration = time.time() - self.start_time
+        if success:
+            self.history.record(self.version, duration, self.log_size, self.file_count)
+        return duration
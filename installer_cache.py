@@ -0,0 +1,139 @@
+import os
+import shutil
+import hashlib
+import tempfile
+
+from app_config import get_data_dir, load_json, save_json, load_settings
+
+# 共享缓存目录环境变量（例如网络路径 \\server\share\python-installers）
+SHARED_CACHE_ENV = "PYPI_MANAGER_INSTALLER_CACHE"
+DEFAULT_MAX_SIZE_MB = 2048
+
+
+class InstallerCache:
+    def __init__(self, cache_dir=None, max_size_mb=None):
+        settings = load_settings()
+        shared_dir = os.environ.get(SHARED_CACHE_ENV) or settings.get("installer_cache_dir")
+        # 指定了目录（通常是网络共享路径）时即为共享模式
+        self.shared = bool(cache_dir or shared_dir)
+        self.cache_dir = cache_dir or shared_dir or get_data_dir("cache", "installers")
+        if max_size_mb is None:
+            max_size_mb = settings.get("installer_cache_max_mb", DEFAULT_MAX_SIZE_MB)
+        self.max_size = int(max_size_mb) * 1024 * 1024
+
+    @staticmethod
+    def arch_from_url(url):
+        """根据安装程序文件名判断架构"""
+        name = url.rsplit("/", 1)[-1].lower()
+        if "-amd64" in name:
+            return "amd64"
+        if "-arm64" in name:
+            return "arm64"
+        return "win32"
+
+    def _entry_dir(self, version, arch):
+        return os.path.join(self.cache_dir, f"{version}-{arch}")
+
+    def lookup(self, version, arch, expected_hash=None):
+        """查找缓存的安装程序，命中且校验通过时返回文件路径"""
+        entry_dir = self._entry_dir(version, arch)
+        meta = load_json(os.path.join(entry_dir, "meta.json"))
+        # 元数据损坏、不完整或来自旧版本时视为未命中，重新下载
+        sha256 = meta.get("sha256") if isinstance(meta, dict) else None
+        if not sha256 or not isinstance(sha256, str):
+            return None
+
+        path = os.path.join(entry_dir, sha256 + ".exe")
+        if not os.path.exists(path):
+            return None
+
+        # 校验文件完整性（共享目录中的文件可能被其他机器写坏）
+        if self.file_hash(path, "sha256") != sha256:
+            return None
+        if expected_hash:
+            algorithm, expected = expected_hash
+            if algorithm == "sha256":
+                actual = sha256
+            else:
+                actual = self.file_hash(path, algorithm)
+            if actual.lower() != expected.lower():
+                return None
+
+        # 更新修改时间作为LRU访问时间
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return path
+
+    def store(self, version, arch, file_path):
+        """将下载的安装程序移入缓存，返回缓存中的路径"""
+        sha256 = self.file_hash(file_path, "sha256")
+        entry_dir = self._entry_dir(version, arch)
+        os.makedirs(entry_dir, exist_ok=True)
+        dest_path = os.path.join(entry_dir, sha256 + ".exe")
+
+        if not os.path.exists(dest_path):
+            # 先写临时文件再改名，避免其他机器读到不完整的文件
+            fd, temp_path = tempfile.mkstemp(dir=entry_dir, suffix=".tmp")
+            os.close(fd)
+            try:
+                shutil.copyfile(file_path, temp_path)
+                os.replace(temp_path, dest_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+        else:
+            os.utime(dest_path, None)
+
+        save_json(os.path.join(entry_dir, "meta.json"), {
+            "version": version,
+            "arch": arch,
+            "sha256": sha256,
+            "size": os.path.getsize(dest_path)
+        })
+        self.evict()
+        return dest_path
+
+    def entries(self):
+        """列出缓存条目: [(路径, 大小, 最近使用时间)]"""
+        result = []
+        if not os.path.isdir(self.cache_dir):
+            return result
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_dir():
+                continue
+            for item in os.scandir(entry.path):
+                if item.name.endswith(".exe"):
+                    stat = item.stat()
+                    result.append((item.path, stat.st_size, stat.st_mtime))
+        return result
+
+    def total_size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """超出容量上限时删除最久未使用的安装程序"""
+        entries = sorted(self.entries(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                # 元数据指向被删除的文件时一并删除
+                meta_path = os.path.join(os.path.dirname(path), "meta.json")
+                meta = load_json(meta_path, {})
+                if isinstance(meta, dict) and f"{meta.get('sha256')}.exe" == os.path.basename(path):
+                    os.remove(meta_path)
+            except OSError:
+                pass
+
+    def file_hash(self, path, algorithm="sha256"):
+        """计算文件摘要"""
+        digest = hashlib.new(algorithm)
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
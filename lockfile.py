@@ -0,0 +1,283 @@
+import os
+import sys
+import json
+import time
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from app_config import get_data_dir
+from package_inventory import PackageInventory, normalize_name
+from pypi_index import SimpleIndexClient, version_from_filename, SDIST_EXTENSIONS
+from download_engine import DownloadEngine
+from pip_runner import run_streaming
+from version_utils import parse_version
+
+LOCK_VERSION = 1
+
+# 在目标解释器中获取其支持的wheel标签（按优先级排序）、Python版本和平台
+TARGET_INFO_SCRIPT = """
+import json, platform, sysconfig
+try:
+    from pip._vendor.packaging.tags import sys_tags
+    tags = [str(tag) for tag in sys_tags()]
+except Exception:
+    tags = []
+print(json.dumps({"tags": tags, "python_version": platform.python_version(), "platform": sysconfig.get_platform()}))
+"""
+
+
+def target_info(python_path=None):
+    """目标解释器信息: {"tags": [...], "python_version": ..., "platform": ...}"""
+    result = subprocess.run(
+        [python_path or sys.executable, "-c", TARGET_INFO_SCRIPT],
+        capture_output=True,
+        text=True,
+        timeout=30
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"无法读取解释器信息: {result.stderr.strip()}")
+    return json.loads(result.stdout)
+
+
+def wheel_tags(filename):
+    """wheel文件名中的所有标签组合，如 {"cp311-cp311-manylinux_2_17_x86_64", ...}"""
+    parts = filename[:-len(".whl")].split("-")
+    if len(parts) < 5:
+        return set()
+    python_tags, abi_tags, platform_tags = parts[-3], parts[-2], parts[-1]
+    return {
+        f"{py}-{abi}-{plat}"
+        for py in python_tags.split(".")
+        for abi in abi_tags.split(".")
+        for plat in platform_tags.split(".")
+    }
+
+
+def select_artifact(files, project, version, tags):
+    """从项目文件中选出该版本最适合目标解释器的文件（优先级最高的wheel，其次源码包）"""
+    rank = {tag: i for i, tag in enumerate(tags)}
+    # 按规范化的版本比较，已安装元数据与文件名中的写法可能不同（如 1.0.0 与 1.0、2.0rc1 与 2.0.0rc1）
+    version_key = parse_version(version)
+    best = None
+    best_rank = None
+    for item in files:
+        if item["yanked"] or not item["hashes"].get("sha256"):
+            continue
+        file_version = version_from_filename(item["filename"], project)
+        if file_version is None:
+            continue
+        if version_key is None:
+            if file_version.lower() != version.lower():
+                continue
+        elif parse_version(file_version) != version_key:
+            continue
+        if item["filename"].endswith(".whl"):
+            ranks = [rank[tag] for tag in wheel_tags(item["filename"]) if tag in rank]
+            if not ranks:
+                continue
+            item_rank = min(ranks)
+        elif item["filename"].lower().endswith(SDIST_EXTENSIONS):
+            item_rank = len(rank)
+        else:
+            continue
+        if best_rank is None or item_rank < best_rank:
+            best, best_rank = item, item_rank
+    return best
+
+
+class LockfileBuilder:
+    def __init__(self, mirror_urls, python_path=None, cache=None, max_workers=16):
+        # 第一个镜像源为主镜像源，文件和哈希以它为准
+        self.mirror_urls = [url.rstrip("/") + "/" for url in mirror_urls]
+        self.python_path = python_path or sys.executable
+        self.max_workers = max_workers
+        self.clients = [SimpleIndexClient(url, cache=cache) for url in self.mirror_urls]
+
+    def build(self, packages=None, progress_callback=None):
+        """为已安装的包（或指定的 InstalledPackage 列表）生成锁定数据
+
+        progress_callback(已完成数, 总数, 包名)
+        """
+        info = target_info(self.python_path)
+        if packages is None:
+            packages = PackageInventory(self.python_path).list_packages()
+
+        entries = []
+        unresolved = []
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._lock_one, p, info["tags"]): p for p in packages}
+            for future in as_completed(futures):
+                package = futures[future]
+                try:
+                    entry, reason = future.result()
+                except Exception as e:
+                    entry, reason = None, str(e)
+                if entry:
+                    entries.append(entry)
+                else:
+                    unresolved.append({"name": package.name, "version": package.version, "reason": reason})
+                done += 1
+                if progress_callback:
+                    progress_callback(done, len(packages), package.name)
+
+        return {
+            "lock_version": LOCK_VERSION,
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python_version": info["python_version"],
+            "platform": info["platform"],
+            "mirrors": self.mirror_urls,
+            "packages": sorted(entries, key=lambda e: normalize_name(e["name"])),
+            "unresolved": sorted(unresolved, key=lambda e: normalize_name(e["name"]))
+        }
+
+    def _lock_one(self, package, tags):
+        """返回 (锁定条目, None) 或 (None, 无法锁定的原因)"""
+        files = self.clients[0].get_project_files(package.name)
+        if files is None:
+            return None, "主镜像源上不存在该项目"
+        artifact = select_artifact(files, package.name, package.version, tags)
+        if artifact is None:
+            return None, f"主镜像源上没有版本 {package.version} 的兼容文件"
+
+        sha256 = artifact["hashes"]["sha256"]
+        urls = {self.mirror_urls[0]: artifact["url"]}
+        for mirror_url, client in zip(self.mirror_urls[1:], self.clients[1:]):
+            try:
+                mirror_files = client.get_project_files(package.name) or []
+            except Exception:
+                continue
+            for item in mirror_files:
+                # 文件名相同但哈希不同的镜像源文件不可信，不记录
+                if item["filename"] == artifact["filename"] and item["hashes"].get("sha256", sha256) == sha256:
+                    urls[mirror_url] = item["url"]
+                    break
+
+        return {
+            "name": package.name,
+            "version": package.version,
+            "filename": artifact["filename"],
+            "sha256": sha256,
+            "urls": urls
+        }, None
+
+
+def save_lockfile(lock, path):
+    """写入锁定文件（缩进格式，便于版本管理中比较差异）"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(lock, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_lockfile(path):
+    """读取锁定文件，格式不正确时抛出 ValueError"""
+    with open(path, "r", encoding="utf-8") as f:
+        lock = json.load(f)
+    if not isinstance(lock, dict) or "packages" not in lock:
+        raise ValueError(f"{path} 不是锁定文件")
+    if lock.get("lock_version") != LOCK_VERSION:
+        raise ValueError(f"不支持的锁定文件版本: {lock.get('lock_version')}")
+    return lock
+
+
+def is_lockfile(path):
+    """根据文件内容判断是否为锁定文件"""
+    try:
+        load_lockfile(path)
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+class LockedInstaller:
+    def __init__(self, python_path=None, mirror_order=None, download_dir=None, max_workers=8):
+        self.python_path = python_path or sys.executable
+        # 优先使用的镜像源顺序，未列出的镜像源按锁定文件中的顺序排在后面
+        self.mirror_order = [url.rstrip("/") + "/" for url in (mirror_order or [])]
+        self.download_dir = download_dir or get_data_dir("cache", "locked")
+        self.max_workers = max_workers
+        self.engine = DownloadEngine()
+
+    def check_target(self, lock):
+        """目标解释器与生成锁定文件的解释器不一致时返回警告信息列表"""
+        info = target_info(self.python_path)
+        warnings = []
+        if info["python_version"].split(".")[:2] != lock.get("python_version", "").split(".")[:2]:
+            warnings.append(f"锁定文件为 Python {lock.get('python_version')} 生成，当前为 Python {info['python_version']}")
+        if info["platform"] != lock.get("platform"):
+            warnings.append(f"锁定文件为 {lock.get('platform')} 平台生成，当前为 {info['platform']}")
+        return warnings
+
+    def plan(self, lock):
+        """返回 (需要安装的条目, 已是锁定版本的条目)"""
+        installed = {normalize_name(p.name): p.version for p in PackageInventory(self.python_path).list_packages()}
+        to_install = []
+        satisfied = []
+        for entry in lock["packages"]:
+            if installed.get(normalize_name(entry["name"])) == entry["version"]:
+                satisfied.append(entry)
+            else:
+                to_install.append(entry)
+        return to_install, satisfied
+
+    def _ordered_urls(self, entry):
+        urls = entry["urls"]
+        preferred = [urls[m] for m in self.mirror_order if m in urls]
+        return preferred + [url for mirror, url in urls.items() if url not in preferred]
+
+    def artifact_path(self, entry):
+        """下载文件按哈希存放，已下载过的文件直接复用"""
+        return os.path.join(self.download_dir, entry["sha256"][:2], entry["sha256"], entry["filename"])
+
+    def download(self, entries, progress_callback=None):
+        """并行下载所有文件并校验SHA-256，返回 ({包名: 文件路径}, {包名: 错误信息})
+
+        progress_callback(已完成数, 总数, 包名)
+        """
+        paths = {}
+        errors = {}
+        done = 0
+
+        def fetch(entry):
+            path = self.artifact_path(entry)
+            # 文件只在校验通过后才移动到按哈希命名的目录中
+            if os.path.exists(path):
+                return path
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            last_error = None
+            # 依次尝试各镜像源的下载地址
+            for url in self._ordered_urls(entry):
+                try:
+                    return self.engine.download(url, path, expected_hash=("sha256", entry["sha256"]))
+                except Exception as e:
+                    last_error = e
+            raise last_error or RuntimeError("没有可用的下载地址")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(fetch, entry): entry for entry in entries}
+            for future in as_completed(futures):
+                entry = futures[future]
+                try:
+                    paths[entry["name"]] = future.result()
+                except Exception as e:
+                    errors[entry["name"]] = str(e)
+                done += 1
+                if progress_callback:
+                    progress_callback(done, len(entries), entry["name"])
+        return paths, errors
+
+    def install(self, entries, paths, line_callback=None, timeout=None):
+        """不解析依赖、不访问索引，按哈希安装已下载的文件，返回 CompletedProcess"""
+        requirements_path = os.path.join(self.download_dir, f"locked-install-{os.getpid()}.txt")
+        with open(requirements_path, "w", encoding="utf-8") as f:
+            for entry in entries:
+                # pip按空白拆分requirements行，路径写成file:地址（空格会被编码），数据目录含空格时也能安装
+                url = Path(os.path.abspath(paths[entry["name"]])).as_uri()
+                f.write(f"{url} --hash=sha256:{entry['sha256']}\n")
+        cmd = [self.python_path, "-m", "pip", "install", "--no-deps", "--no-index", "--require-hashes",
+               "--disable-pip-version-check", "-r", requirements_path]
+        try:
+            return run_streaming(cmd, line_callback, timeout=timeout or max(120, 10 * len(entries)))
+        finally:
+            os.remove(requirements_path)
@@ -1,5 +1,30 @@
 from version_fetcher import VersionFetcher
 from installer import PythonInstaller
+from package_inventory import PackageInventory, normalize_name
+from outdated_checker import OutdatedChecker, format_outdated_table
+from batch_upgrader import BatchUpgrader
+from batch_uninstaller import BatchUninstaller
+from dependency_graph import DependencyGraph
+from lockfile import LockfileBuilder, LockedInstaller, save_lockfile, load_lockfile, is_lockfile
+from requirements import (
+    RequirementsParser, find_requirements_files, format_conflicts, option_line, requirement_line,
+    constraint_line, write_temp_requirements
+)
+from env_sync import EnvSync, format_plan
+from search_index import SearchIndex, add_summaries, fetch_project_info
+from index_cache import IndexCache
+from version_utils import is_prerelease, parse_version
+from version_lookup import VersionLookup, latest_version
+from mirror_probe import MirrorProbe, format_probe_table
+from mirror_failover import MirrorFailover
+from index_proxy import CachingIndexProxy
+from download_engine import DownloadEngine
+from http_client import get_client
+from progress import PipProgress
+from pip_runner import run_streaming, get_runner
+from multi_env import MultiEnvExecutor, format_report
+from venv_discovery import VenvDiscovery
+from venv_clone import clone_venv, verify_clone
 import sys
 import traceback
 
@@ -30,6 +55,15 @@ class CommandLineInstaller:
             }
             self.custom_mirrors = {}
             self.default_mirror = "1"  # 默认使用清华源
+            # 镜像源索引的磁盘缓存（跨会话复用）
+            self.index_cache = IndexCache()
+            # 镜像源测速：自动选择最快的镜像源并定期重新测速
+            self.mirror_probe = MirrorProbe()
+            self.auto_select_mirror = True
+            self._mirror_reprobe_timer = None
+            self._apply_saved_mirror_ranking()
+            # 本地缓存代理（启动后pip通过它安装，重复下载直接从磁盘返回）
+            self.index_proxy = None
             print("Python版本选择安装器初始化成功")
         except Exception as e:
             print(f"程序初始化失败: {str(e)}")
@@ -43,7 +77,7 @@ class CommandLineInstaller:
                 print("\nPyPi Manager")
                 print("1. 管理pip包")
                 print("2. 检查并修复pip")
-                print("3. 配置镜像源")
+                print("3. 设置（镜像源、网络）")
                 print("4. 批量包管理")
                 print("5. Python版本管理")
                 print("6. Python环境管理")
@@ -61,7 +95,7 @@ class CommandLineInstaller:
                 elif choice == "2":
                     self.check_and_fix_pip()
                 elif choice == "3":
-                    self.manage_mirrors()
+                    self.settings()
                 elif choice == "4":
                     self.batch_package_management()
                 elif choice == "5":
@@ -97,13 +131,36 @@ class CommandLineInstaller:
             print("无法获取Python版本信息，请检查网络连接")
             return
         
-        print(f"\n成功获取到 {len(versions)} 个版本:")
+        print(f"\n各系列的最新版本:")
         print("-" * 80)
         
+        availability = self.version_fetcher.get_availability([item['version'] for item in versions])
         for i, version_info in enumerate(versions, 1):
-            print(f"{i}. {version_info['type']}: Python {version_info['version']} ({version_info['date']})")
+            labels = self._format_availability(availability.get(version_info['version'], {}))
+            print(f"{i}. {version_info['type']}: Python {version_info['version']} ({version_info['date']}) {labels}")
         
         print("-" * 80)
+        
+        # 从本地索引查询某个系列的所有版本
+        while True:
+            query = input("输入系列号查看该系列所有版本（如 3.12），直接回车返回: ").strip()
+            if not query:
+                break
+            matches = self.version_fetcher.find_versions(query, include_prereleases=True)
+            if not matches:
+                print(f"未找到版本: {query}")
+                continue
+            for version_info in matches:
+                print(f"  {version_info['type']}: Python {version_info['version']} ({version_info['date']})")
+    
+    def _format_availability(self, row):
+        """格式化安装程序可用性，如 [64位 32位]"""
+        labels = [label for key, label in (("amd64-exe", "64位"), ("win32-exe", "32位"), ("arm64-exe", "ARM64")) if row.get(key)]
+        if labels:
+            return f"[{' '.join(labels)}]"
+        if row:
+            return "[无Windows安装程序]"
+        return ""
     
     def install_version(self):
         """安装指定版本"""
@@ -119,19 +176,30 @@ class CommandLineInstaller:
         print(f"\n可用版本列表:")
         print("-" * 80)
         
+        availability = self.version_fetcher.get_availability([item['version'] for item in versions])
         for i, version_info in enumerate(versions, 1):
-            print(f"{i}. {version_info['type']}: Python {version_info['version']} ({version_info['date']})")
+            labels = self._format_availability(availability.get(version_info['version'], {}))
+            print(f"{i}. {version_info['type']}: Python {version_info['version']} ({version_info['date']}) {labels}")
         
         print("-" * 80)
         
-        # 获取用户选择
+        # 获取用户选择（列表编号，或完整版本号如 3.11.4）
         try:
-            choice = int(input("请输入要安装的版本编号: "))
-            if choice < 1 or choice > len(versions):
-                print("无效的版本编号")
-                return
-            
-            selected_version = versions[choice - 1]
+            choice = input("请输入要安装的版本编号或版本号: ").strip()
+            if "." in choice:
+                matches = self.version_fetcher.find_versions(choice, include_prereleases=True)
+                if not matches:
+                    print(f"未找到版本: {choice}")
+                    return
+                # 输入系列号时选择该系列的最新稳定版本
+                stable = [item for item in matches if item['type'] == 'stable']
+                selected_version = (stable or matches)[0]
+            else:
+                choice = int(choice)
+                if choice < 1 or choice > len(versions):
+                    print("无效的版本编号")
+                    return
+                selected_version = versions[choice - 1]
             version = selected_version['version']
             
             print(f"\n您选择了: Python {version}")
@@ -149,11 +217,16 @@ class CommandLineInstaller:
                 print(f"无法获取 Python {version} 的下载链接")
                 return
             
+            # 获取官方发布的校验值，用于校验下载的安装程序
+            expected_hash = self.version_fetcher.get_file_hash(version, download_url)
+            if not expected_hash:
+                print("⚠️  未获取到官方校验值，将跳过文件校验")
+            
             # 开始安装
             print(f"\n开始安装 Python {version}...")
             print(f"下载链接: {download_url}")
             
-            success = self.installer.install(version, download_url)
+            success = self.installer.install(version, download_url, expected_hash)
             
             if success:
                 print(f"\n🎉 Python {version} 安装成功！")
@@ -312,8 +385,8 @@ class CommandLineInstaller:
         """显示已安装的依赖库"""
         print("\n显示已安装的依赖库...")
         
-        import subprocess
         import sys
+        import time
         
         try:
             # 首先检查Python可执行文件路径
@@ -321,34 +394,29 @@ class CommandLineInstaller:
             python_path = sys.executable
             print(f"当前Python可执行文件: {python_path}")
             
-            # 尝试使用当前Python可执行文件运行pip list
+            # 直接读取site-packages中的元数据，无需启动pip
             print("\n正在获取已安装的依赖库...")
-            result = subprocess.run(
-                [python_path, "-m", "pip", "list"],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            start_time = time.time()
+            packages = PackageInventory(python_path).list_packages()
+            elapsed = (time.time() - start_time) * 1000
             
-            if result.returncode == 0:
+            if packages:
+                name_width = max(len("Package"), max(len(p.name) for p in packages))
+                version_width = max(len("Version"), max(len(p.version) for p in packages))
                 print("\n已安装的依赖库:")
-                print(result.stdout)
+                print(f"{'Package':<{name_width}} {'Version':<{version_width}}")
+                print(f"{'-' * name_width} {'-' * version_width}")
+                for package in packages:
+                    print(f"{package.name:<{name_width}} {package.version:<{version_width}}")
+                print(f"\n共 {len(packages)} 个包（用时 {elapsed:.0f} 毫秒）")
             else:
-                print(f"获取依赖库列表失败: {result.stderr}")
-                # 检测pip错误
-                if "No module named pip" in result.stderr:
-                    print("\n⚠️  检测到pip未安装")
-                    print("建议运行: python -m ensurepip --upgrade 来安装pip")
-                elif "ImportError" in result.stderr or "ModuleNotFoundError" in result.stderr:
-                    print("\n⚠️  检测到pip损坏")
-                    self.suggest_fix_pip()
-        except subprocess.TimeoutExpired:
-            print("\n❌ 获取依赖库列表超时，请检查网络连接或尝试重新运行")
+                print("\n未找到已安装的依赖库")
         except FileNotFoundError:
             print("\n❌ 找不到Python可执行文件，请检查Python安装")
         except Exception as e:
             print(f"\n❌ 显示依赖库时出错: {e}")
             # 尝试使用where命令查找Python
+            import subprocess
             try:
                 where_result = subprocess.run(
                     ["where", "python"],
@@ -363,85 +431,108 @@ class CommandLineInstaller:
                 pass
     
     def search_package(self):
-        """搜索依赖库"""
-        package_name = input("\n请输入要搜索的依赖库名称: ")
+        """搜索依赖库（使用本地搜索索引）"""
+        package_name = input("\n请输入要搜索的依赖库名称: ").strip()
+        if not package_name:
+            return
         
-        import subprocess
-        import sys
+        import time
         
         try:
-            python_path = sys.executable
-            print(f"\n搜索依赖库: {package_name}...")
+            # 索引基于真实镜像源的项目列表，不经过本地缓存代理
+            mirror_url = self.get_mirror_url(self.default_mirror)
+            index = SearchIndex(mirror_url)
+            if not index.ensure_fresh(status_callback=print):
+                print("\n搜索索引不可用，直接查询该依赖库的版本信息")
+                self.get_package_versions(package_name)
+                return
             
-            # 尝试使用pip search命令
-            print("\n使用pip search命令搜索...")
-            result = subprocess.run(
-                [python_path, "-m", "pip", "search", package_name],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            start_time = time.time()
+            results = index.search(package_name, limit=20)
+            elapsed = time.time() - start_time
+            # 只显示缓存中已有的简介，不为每个结果访问网络
+            results = add_summaries(results, mirror_url, self.index_cache)
             
-            if result.returncode == 0:
-                print("\n搜索结果:")
-                print(result.stdout)
-                # 尝试获取版本信息
-                self.get_package_versions(package_name)
-            else:
-                # pip search命令失败，尝试使用pip index versions命令获取版本信息
-                print("\npip search命令不可用，尝试获取版本信息...")
-                self.get_package_versions(package_name)
-                
-                # 提供备用方案
-                print("\n备用搜索方式:")
-                print(f"请访问 https://pypi.org/search/?q={package_name} 查看详细搜索结果")
-                print("\n或者尝试直接安装:")
-                confirm = input("是否直接安装此依赖库？ (y/n): ")
-                if confirm.lower() == "y":
-                    self.install_package(package_name)
+            if not results:
+                print(f"\n在 {len(index)} 个项目中未找到与 {package_name} 相关的依赖库")
+                return
+            
+            match_names = {"exact": "完全匹配", "prefix": "前缀", "substring": "包含", "fuzzy": "相似"}
+            print(f"\n搜索结果（共 {len(index)} 个项目，耗时 {elapsed * 1000:.0f} 毫秒）:")
+            for i, result in enumerate(results, 1):
+                line = f"{i:>2}. {result.name:<36} {match_names[result.match]}"
+                if result.summary:
+                    summary = result.summary if len(result.summary) <= 60 else result.summary[:57] + "..."
+                    line += f"  {summary}"
+                print(line)
+            
+            choice = input("\n输入序号查看详情并选择是否安装（直接回车返回）: ").strip()
+            if not choice.isdigit() or not 1 <= int(choice) <= len(results):
+                return
+            name = results[int(choice) - 1].name
+            
+            try:
+                info = fetch_project_info(name, mirror_url, cache=self.index_cache)
+            except Exception as e:
+                info = None
+                print(f"\n获取 {name} 的详细信息失败: {e}")
+            if info:
+                print(f"\n{info.get('name') or name} {info.get('version') or ''}")
+                if info.get("summary"):
+                    print(f"简介: {info['summary']}")
+                home_page = info.get("home_page") or (info.get("project_urls") or {}).get("Homepage")
+                if home_page:
+                    print(f"主页: {home_page}")
+            
+            confirm = input(f"\n是否安装 {name}？ (y/n): ")
+            if confirm.lower() == "y":
+                self.install_package(name)
         except Exception as e:
             print(f"搜索依赖库时出错: {e}")
             # 尝试获取版本信息作为备用
             self.get_package_versions(package_name)
     
-    def get_package_versions(self, package_name):
-        """获取依赖库的版本信息"""
-        import subprocess
+    def get_package_versions(self, package_name, show=True):
+        """查询依赖库的版本信息，返回 ProjectVersions（查询出错时返回None）
+
+        show 为True时同时显示可用版本和已安装版本
+        """
         import sys
         
         try:
-            python_path = sys.executable
-            print(f"\n获取 {package_name} 的版本信息...")
-            
-            # 尝试使用pip index versions命令
-            result = subprocess.run(
-                [python_path, "-m", "pip", "index", "versions", package_name],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
-            if result.returncode == 0:
-                print("\n版本信息:")
-                print(result.stdout)
-            else:
-                # 尝试使用pip show命令获取已安装版本
-                print("\n尝试检查已安装版本...")
-                show_result = subprocess.run(
-                    [python_path, "-m", "pip", "show", package_name],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                
-                if show_result.returncode == 0:
-                    print("\n已安装版本信息:")
-                    print(show_result.stdout)
-                else:
-                    print(f"\n无法获取 {package_name} 的版本信息")
-                    print("该依赖库可能未安装，或者pip版本不支持此命令")
+            if show:
+                print(f"\n获取 {package_name} 的版本信息...")
+            # 通过镜像源的Simple API查询（结果缓存在本地磁盘）
+            info = VersionLookup(self.get_default_mirror_url(), cache=self.index_cache).get(package_name)
+            if show:
+                self._show_package_versions(info, PackageInventory(sys.executable).get_package(package_name))
+            return info
         except Exception as e:
             print(f"获取版本信息时出错: {e}")
+            return None
+    
+    def _show_package_versions(self, info, installed):
+        """显示 ProjectVersions 和已安装版本"""
+        if info.versions:
+            print("\n版本信息:")
+            print(f"{info.name} ({info.latest})")
+            print(f"Available versions: {', '.join(reversed(info.versions))}")
+            if info.yanked:
+                print(f"Yanked versions: {', '.join(reversed(info.yanked))}")
+            if installed:
+                print(f"  INSTALLED: {installed.version}")
+            print(f"  LATEST:    {info.latest}")
+        elif installed:
+            print("\n已安装版本信息:")
+            print(f"Name: {installed.name}")
+            print(f"Version: {installed.version}")
+            print(f"Location: {installed.location}")
+        else:
+            print(f"\n无法获取 {info.name} 的版本信息")
+            if info.error:
+                print(f"查询失败: {info.error}")
+            else:
+                print("该依赖库可能不存在于当前镜像源，且未安装")
     
     def install_package(self, package_name=None):
         """安装依赖库"""
@@ -449,17 +540,26 @@ class CommandLineInstaller:
             package_name = input("\n请输入要安装的依赖库名称: ")
         
         # 显示版本信息
-        self.get_package_versions(package_name)
-        
-        version = input("请输入版本号（可选，按回车安装最新版本）: ")
+        info = self.get_package_versions(package_name)
+        
+        version = input("请输入版本号（可选，按回车安装最新版本）: ").strip()
+        if version and info and info.versions is not None:
+            # 按PEP 440比较，1.0 与 1.0.0 视为同一版本
+            key = parse_version(version)
+            if any(parse_version(v) == key for v in info.yanked):
+                print(f"\n⚠️ 版本 {version} 已被撤回（yanked）")
+                if input("仍要安装吗？ (y/n): ").lower() != "y":
+                    return
+            elif not any(parse_version(v) == key for v in info.versions):
+                print(f"\n⚠️ 镜像源上没有 {package_name} 的版本 {version}")
+                if input("仍要尝试安装吗？ (y/n): ").lower() != "y":
+                    return
         if version:
             package_spec = f"{package_name}=={version}"
         else:
             package_spec = package_name
         
-        import subprocess
         import sys
-        import time
         
         try:
             python_path = sys.executable
@@ -467,68 +567,32 @@ class CommandLineInstaller:
             mirror_url = self.get_default_mirror_url()
             print(f"使用镜像源: {self.get_mirror_name(self.default_mirror)} - {mirror_url}")
             
+            # 镜像源由故障转移器依次追加，这里不指定 -i
             cmd = [python_path, "-m", "pip", "install", package_spec]
-            if mirror_url:
-                cmd.extend(["-i", mirror_url])
+            failover = self._create_mirror_failover()
+            attempts = []
             
-            # 显示安装进度
+            # 根据pip的实时输出显示进度
             print("\n安装过程中...")
+            progress = PipProgress()
+            try:
+                result, attempts = failover.run_pip(cmd, project=package_name, timeout=60, line_callback=progress.feed)
+            finally:
+                progress.finish()
             
-            # 定义安装步骤
-            install_steps = [
-                "解析依赖关系",
-                "下载依赖库",
-                "安装依赖库",
-                "验证安装结果"
-            ]
-            
-            # 启动安装线程
-            import threading
-            result = None
-            error = None
-            
-            def install_thread():
-                nonlocal result, error
-                try:
-                    result = subprocess.run(
-                        cmd,
-                        capture_output=True,
-                        text=True,
-                        timeout=60
-                    )
-                except Exception as e:
-                    error = e
-            
-            thread = threading.Thread(target=install_thread)
-            thread.daemon = True
-            thread.start()
-            
-            # 显示进度
-            step = 0
-            while thread.is_alive() and step < len(install_steps):
-                print(f"[{install_steps[step]}] ", end="")
-                self._print_spinner()
-                time.sleep(0.5)
-                step += 1
-            
-            # 等待线程结束
-            thread.join()
-            
-            if error:
-                raise error
+            self._report_mirror_attempts(attempts)
             
             if result.returncode == 0:
-                print("\n[验证安装结果] ✅")
                 print("\n安装成功！")
                 print(result.stdout)
                 # 再次显示版本信息，确认安装结果
                 print("\n安装后版本信息:")
                 self.get_package_versions(package_name)
             else:
-                print("\n[验证安装结果] ❌")
                 print(f"\n安装失败: {result.stderr}")
                 # 检测pip错误
                 self.detect_pip_error(result.stderr)
+                print(f"完整的pip输出日志: {get_runner().log_path}")
         except Exception as e:
             print(f"安装依赖库时出错: {e}")
             # 检测异常中的pip错误
@@ -550,30 +614,28 @@ class CommandLineInstaller:
             print("3. 激活虚拟环境")
             print("4. 退出虚拟环境")
             print("5. 删除虚拟环境")
-            print("6. 返回主菜单")
+            print("6. 批量操作多个虚拟环境")
+            print("7. 设置虚拟环境搜索目录")
+            print("8. 返回主菜单")
             
-            choice = input("请输入选择 (1-6): ")
+            choice = input("请输入选择 (1-8): ")
             
             if choice == "1":
                 # 列出所有虚拟环境
                 print("\n列出所有虚拟环境...")
-                # 检查当前目录下的虚拟环境
-                current_dir = os.getcwd()
-                venvs = []
-                for item in os.listdir(current_dir):
-                    item_path = os.path.join(current_dir, item)
-                    if os.path.isdir(item_path):
-                        # 检查是否是虚拟环境（包含Scripts目录和python.exe）
-                        if os.path.exists(os.path.join(item_path, "Scripts", "python.exe")):
-                            venvs.append(item)
+                discovery = VenvDiscovery()
+                venvs = discovery.find()
                 
                 if venvs:
                     print("\n已找到的虚拟环境:")
                     for i, venv in enumerate(venvs, 1):
-                        print(f"{i}. {venv}")
+                        version = f"Python {venv.version}" if venv.version else "未知版本"
+                        print(f"{i}. {self._venv_display_path(venv)} ({version})")
                 else:
-                    print("\n当前目录下未找到虚拟环境")
-                    print("提示: 虚拟环境通常是包含Scripts目录的文件夹")
+                    print("\n搜索目录下未找到虚拟环境")
+                    print("提示: 虚拟环境是包含 pyvenv.cfg 文件的目录")
+                print(f"\n搜索目录: {', '.join(discovery.roots)}")
+                print(f"查找耗时 {discovery.last_scan_time * 1000:.1f} 毫秒（重新读取 {discovery.last_scanned_dirs} 个目录）")
                     
             elif choice == "2":
                 # 创建新的虚拟环境
@@ -587,6 +649,13 @@ class CommandLineInstaller:
                     print(f"错误: 目录 {venv_path} 已存在")
                     continue
                 
+                print("\n创建方式:")
+                print("1. 使用 python -m venv 创建空环境")
+                print("2. 从模板虚拟环境克隆（包含模板中已安装的包）")
+                if input("请输入选择 (1-2，默认1): ").strip() == "2":
+                    self.clone_environment(venv_path)
+                    continue
+                
                 print(f"\n创建虚拟环境: {venv_name}...")
                 
                 try:
@@ -610,23 +679,20 @@ class CommandLineInstaller:
                 print("\n提示: 在命令行中，虚拟环境需要在新的终端中激活")
                 print("以下是激活命令:")
                 
-                # 检查当前目录下的虚拟环境
-                current_dir = os.getcwd()
-                venvs = []
-                for item in os.listdir(current_dir):
-                    item_path = os.path.join(current_dir, item)
-                    if os.path.isdir(item_path):
-                        if os.path.exists(os.path.join(item_path, "Scripts", "python.exe")):
-                            venvs.append(item)
+                venvs = VenvDiscovery().find()
                 
                 if venvs:
                     print("\n可用的虚拟环境:")
                     for venv in venvs:
-                        print(f"- {venv}")
-                        print(f"  Windows命令: {venv}\Scripts\activate.bat")
-                        print(f"  PowerShell命令: {venv}\Scripts\Activate.ps1")
+                        venv_path = self._venv_display_path(venv)
+                        print(f"- {venv_path}")
+                        if os.path.isdir(os.path.join(venv.path, "Scripts")):
+                            print(f"  Windows命令: {venv_path}\\Scripts\\activate.bat")
+                            print(f"  PowerShell命令: {venv_path}\\Scripts\\Activate.ps1")
+                        else:
+                            print(f"  Shell命令: source {venv_path}/bin/activate")
                 else:
-                    print("\n当前目录下未找到虚拟环境")
+                    print("\n搜索目录下未找到虚拟环境")
                     
             elif choice == "4":
                 # 退出虚拟环境
@@ -637,22 +703,15 @@ class CommandLineInstaller:
                 
             elif choice == "5":
                 # 删除虚拟环境
-                # 检查当前目录下的虚拟环境
-                current_dir = os.getcwd()
-                venvs = []
-                for item in os.listdir(current_dir):
-                    item_path = os.path.join(current_dir, item)
-                    if os.path.isdir(item_path):
-                        if os.path.exists(os.path.join(item_path, "Scripts", "python.exe")):
-                            venvs.append(item)
+                venvs = VenvDiscovery().find()
                 
                 if not venvs:
-                    print("\n当前目录下未找到虚拟环境")
+                    print("\n搜索目录下未找到虚拟环境")
                     continue
                 
                 print("\n选择要删除的虚拟环境:")
                 for i, venv in enumerate(venvs, 1):
-                    print(f"{i}. {venv}")
+                    print(f"{i}. {self._venv_display_path(venv)}")
                 
                 try:
                     venv_choice = int(input("请输入编号: "))
@@ -660,8 +719,8 @@ class CommandLineInstaller:
                         print("无效的选择")
                         continue
                     
-                    selected_venv = venvs[venv_choice - 1]
-                    venv_path = os.path.join(current_dir, selected_venv)
+                    selected_venv = venvs[venv_choice - 1].name
+                    venv_path = venvs[venv_choice - 1].path
                     
                     confirm = input(f"确认删除虚拟环境 {selected_venv} 吗？ (y/n): ")
                     if confirm.lower() != "y":
@@ -680,10 +739,184 @@ class CommandLineInstaller:
                     print(f"❌ 删除虚拟环境时出错: {e}")
                     
             elif choice == "6":
+                # 批量操作多个虚拟环境
+                venvs = VenvDiscovery().find()
+                
+                if not venvs:
+                    print("\n搜索目录下未找到虚拟环境")
+                    continue
+                
+                self.batch_environment_operations([venv.path for venv in venvs])
+                
+            elif choice == "7":
+                self.configure_venv_roots()
+                    
+            elif choice == "8":
                 break
             else:
                 print("无效选择，请重新输入")
     
+    def clone_environment(self, venv_path):
+        """从模板虚拟环境克隆新环境"""
+        import os
+        
+        templates = VenvDiscovery().find()
+        if not templates:
+            print("\n搜索目录下未找到可用作模板的虚拟环境")
+            return
+        
+        print("\n选择模板虚拟环境:")
+        for i, venv in enumerate(templates, 1):
+            version = f"Python {venv.version}" if venv.version else "未知版本"
+            print(f"{i}. {self._venv_display_path(venv)} ({version})")
+        try:
+            template = templates[int(input("请输入编号: ")) - 1]
+        except (ValueError, IndexError):
+            print("无效的选择")
+            return
+        
+        print(f"\n从 {template.name} 克隆虚拟环境: {os.path.basename(venv_path)}...")
+        try:
+            result = clone_venv(template.path, venv_path)
+        except Exception as e:
+            print(f"\n❌ 克隆虚拟环境失败: {e}")
+            return
+        
+        print(f"文件 {result.files} 个: 硬链接 {result.linked} 个，复制 {result.copied} 个，改写路径 {result.rewritten} 个")
+        print(f"耗时 {result.elapsed:.2f} 秒")
+        if not verify_clone(venv_path):
+            print("\n⚠️ 新环境的解释器无法正常启动，请检查模板环境")
+            return
+        print(f"\n✅ 虚拟环境 {os.path.basename(venv_path)} 克隆成功！")
+        print(f"路径: {venv_path}")
+        if result.linked:
+            print("提示: 包文件与模板共享硬链接，请勿直接编辑模板或新环境中的包文件（pip安装/卸载不受影响）")
+    
+    def _venv_display_path(self, venv):
+        """当前目录下的虚拟环境显示相对路径"""
+        import os
+        
+        try:
+            relative = os.path.relpath(venv.path)
+        except ValueError:
+            # Windows下不同盘符无法计算相对路径
+            return venv.path
+        return venv.path if relative.startswith("..") else relative
+    
+    def configure_venv_roots(self):
+        """设置虚拟环境搜索目录"""
+        import os
+        from app_config import load_settings, save_settings
+        from venv_discovery import DEFAULT_MAX_DEPTH
+        
+        settings = load_settings()
+        roots = settings.get("venv_roots", [])
+        print("\n虚拟环境搜索目录（当前目录总是会被搜索）:")
+        if roots:
+            for i, root in enumerate(roots, 1):
+                print(f"{i}. {root}")
+        else:
+            print("未设置额外的搜索目录")
+        print(f"最大搜索深度: {settings.get('venv_scan_depth', DEFAULT_MAX_DEPTH)}")
+        
+        print("\n1. 添加搜索目录")
+        print("2. 删除搜索目录")
+        print("3. 设置最大搜索深度")
+        print("4. 清除索引并重新扫描")
+        print("5. 返回")
+        choice = input("请输入选择 (1-5): ").strip()
+        
+        if choice == "1":
+            path = input("请输入目录路径: ").strip()
+            if not os.path.isdir(path):
+                print("目录不存在")
+                return
+            path = os.path.abspath(os.path.expanduser(path))
+            if path not in roots:
+                roots.append(path)
+            settings["venv_roots"] = roots
+            save_settings(settings)
+            print(f"✅ 已添加搜索目录: {path}")
+        elif choice == "2":
+            try:
+                index = int(input("请输入要删除的编号: ")) - 1
+                removed = roots.pop(index) if 0 <= index < len(roots) else None
+            except ValueError:
+                removed = None
+            if removed is None:
+                print("无效的选择")
+                return
+            settings["venv_roots"] = roots
+            save_settings(settings)
+            print(f"✅ 已删除搜索目录: {removed}")
+        elif choice == "3":
+            try:
+                depth = int(input("请输入最大搜索深度: "))
+            except ValueError:
+                print("请输入有效的数字")
+                return
+            settings["venv_scan_depth"] = max(1, depth)
+            save_settings(settings)
+            print(f"✅ 最大搜索深度已设置为 {settings['venv_scan_depth']}")
+        elif choice == "4":
+            discovery = VenvDiscovery()
+            discovery.clear()
+            venvs = discovery.find()
+            print(f"✅ 找到 {len(venvs)} 个虚拟环境，耗时 {discovery.last_scan_time * 1000:.1f} 毫秒")
+    
+    def batch_environment_operations(self, venvs):
+        """在多个虚拟环境中并发执行包操作"""
+        import os
+        import time
+        
+        print("\n可用的虚拟环境:")
+        for i, venv in enumerate(venvs, 1):
+            print(f"{i}. {venv}")
+        
+        selection = input("\n请输入要操作的环境编号（多个编号用空格分隔，直接回车选择全部）: ").strip()
+        if selection:
+            selected = [venvs[int(idx) - 1] for idx in selection.split() if idx.isdigit() and 0 < int(idx) <= len(venvs)]
+        else:
+            selected = list(venvs)
+        if not selected:
+            print("未选择任何环境")
+            return
+        
+        print("\n选择操作:")
+        print("1. 列出已安装包")
+        print("2. 检查可更新的包")
+        print("3. 升级所有可更新的包")
+        print("4. 导出包列表")
+        operations = {"1": "inventory", "2": "outdated", "3": "upgrade", "4": "export"}
+        operation = operations.get(input("请输入选择 (1-4): ").strip())
+        if operation is None:
+            print("无效选择")
+            return
+        
+        options = {}
+        if operation in ("outdated", "upgrade"):
+            options["mirror_url"] = self.get_default_mirror_url()
+        elif operation == "export":
+            options["output_dir"] = input("请输入导出目录（直接回车使用当前目录）: ").strip() or os.getcwd()
+        
+        if operation == "upgrade":
+            confirm = input(f"确认升级 {len(selected)} 个环境中所有可更新的包吗？ (y/n): ")
+            if confirm.lower() != "y":
+                print("操作已取消")
+                return
+        
+        executor = MultiEnvExecutor()
+        print(f"\n在 {len(selected)} 个环境中执行（最多 {executor.max_workers} 个进程并行）...")
+        
+        def on_progress(done, result):
+            status = "✅" if result.success else "❌"
+            print(f"[{done}/{len(selected)}] {status} {result.env}")
+        
+        start_time = time.time()
+        results = executor.run(operation, selected, progress_callback=on_progress, **options)
+        print("\n" + format_report(results))
+        print(f"总耗时: {time.time() - start_time:.1f} 秒")
+    
     def tool_menu(self):
         """工具菜单"""
         print("\n工具菜单")
@@ -721,11 +954,11 @@ class CommandLineInstaller:
             
             if result.returncode != 0:
                 print("未安装autopep8，正在安装...")
-                install_result = subprocess.run(
-                    [sys.executable, "-m", "pip", "install", "autopep8"],
-                    capture_output=True,
-                    text=True
-                )
+                progress = PipProgress()
+                try:
+                    install_result = run_streaming([sys.executable, "-m", "pip", "install", "autopep8"], progress.feed)
+                finally:
+                    progress.finish()
                 if install_result.returncode != 0:
                     print(f"安装autopep8失败: {install_result.stderr}")
                     return
@@ -785,11 +1018,11 @@ class CommandLineInstaller:
             
             if result.returncode != 0:
                 print("未安装pylint，正在安装...")
-                install_result = subprocess.run(
-                    [sys.executable, "-m", "pip", "install", "pylint"],
-                    capture_output=True,
-                    text=True
-                )
+                progress = PipProgress()
+                try:
+                    install_result = run_streaming([sys.executable, "-m", "pip", "install", "pylint"], progress.feed)
+                finally:
+                    progress.finish()
                 if install_result.returncode != 0:
                     print(f"安装pylint失败: {install_result.stderr}")
                     return
@@ -893,7 +1126,6 @@ class CommandLineInstaller:
         """从GitHub获取最新文件来修复"""
         print("\n从GitHub获取最新文件...")
         
-        import requests
         import zipfile
         import os
         import shutil
@@ -908,13 +1140,7 @@ class CommandLineInstaller:
                 
                 # 下载zip文件
                 print("正在下载最新代码...")
-                response = requests.get(repo_url, stream=True, timeout=30)
-                response.raise_for_status()
-                
-                # 保存zip文件
-                with open(zip_path, "wb") as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
+                DownloadEngine().download(repo_url, zip_path)
                 
                 print("下载完成，正在解压...")
                 
@@ -947,6 +1173,33 @@ class CommandLineInstaller:
                     "diagnostic.py",
                     "version_fetcher.py",
                     "installer.py",
+                    "package_inventory.py",
+                    "version_utils.py",
+                    "pypi_index.py",
+                    "outdated_checker.py",
+                    "batch_upgrader.py",
+                    "app_config.py",
+                    "index_cache.py",
+                    "mirror_probe.py",
+                    "mirror_failover.py",
+                    "index_proxy.py",
+                    "download_engine.py",
+                    "installer_cache.py",
+                    "release_index.py",
+                    "http_client.py",
+                    "progress.py",
+                    "pip_runner.py",
+                    "install_monitor.py",
+                    "multi_env.py",
+                    "venv_discovery.py",
+                    "venv_clone.py",
+                    "batch_uninstaller.py",
+                    "dependency_graph.py",
+                    "lockfile.py",
+                    "requirements.py",
+                    "env_sync.py",
+                    "search_index.py",
+                    "version_lookup.py",
                     "setup.bat",
                     "README.md",
                     "README_CN.md"
@@ -1034,8 +1287,9 @@ class CommandLineInstaller:
                 print("   - 选择 '管理pip包' 选项")
                 print("   - 在子菜单中选择相应操作")
                 print("\n3. 配置镜像源")
-                print("   - 选择 '配置镜像源' 选项")
+                print("   - 选择 '设置' 选项，再选择 '管理镜像源'")
                 print("   - 选择合适的镜像源")
+                print("   - 在 '网络设置与请求统计' 中可配置超时、重试次数和代理")
                 print("\n4. 批量操作")
                 print("   - 选择 '批量包管理' 选项")
                 print("   - 按照提示进行操作")
@@ -1091,75 +1345,48 @@ class CommandLineInstaller:
         """升级依赖库"""
         package_name = input("\n请输入要升级的依赖库名称: ")
         
-        import subprocess
         import sys
-        import time
-        import threading
         
         try:
             python_path = sys.executable
+            
+            # 已是最新版本时不启动pip
+            installed = PackageInventory(python_path).get_package(package_name)
+            info = self.get_package_versions(package_name, show=False)
+            if installed and info and info.versions and parse_version(installed.version):
+                latest = latest_version(info, include_prereleases=is_prerelease(installed.version))
+                if parse_version(latest) <= parse_version(installed.version):
+                    print(f"\n{installed.name} 已是最新版本 ({installed.version})")
+                    return
+                print(f"\n{installed.name}: {installed.version} -> {latest}")
+            
             print(f"\n升级依赖库: {package_name}...")
             mirror_url = self.get_default_mirror_url()
             print(f"使用镜像源: {self.get_mirror_name(self.default_mirror)} - {mirror_url}")
             
+            # 镜像源由故障转移器依次追加，这里不指定 -i
             cmd = [python_path, "-m", "pip", "install", "--upgrade", package_name]
-            if mirror_url:
-                cmd.extend(["-i", mirror_url])
+            failover = self._create_mirror_failover()
+            attempts = []
             
-            # 显示升级进度
+            # 根据pip的实时输出显示进度
             print("\n升级过程中...")
+            progress = PipProgress()
+            try:
+                result, attempts = failover.run_pip(cmd, project=package_name, timeout=60, line_callback=progress.feed)
+            finally:
+                progress.finish()
             
-            # 定义升级步骤
-            upgrade_steps = [
-                "检查当前版本",
-                "下载最新版本",
-                "安装最新版本",
-                "验证升级结果"
-            ]
-            
-            # 启动升级线程
-            result = None
-            error = None
-            
-            def upgrade_thread():
-                nonlocal result, error
-                try:
-                    result = subprocess.run(
-                        cmd,
-                        capture_output=True,
-                        text=True,
-                        timeout=60
-                    )
-                except Exception as e:
-                    error = e
-            
-            thread = threading.Thread(target=upgrade_thread)
-            thread.daemon = True
-            thread.start()
-            
-            # 显示进度
-            step = 0
-            while thread.is_alive() and step < len(upgrade_steps):
-                print(f"[{upgrade_steps[step]}] ", end="")
-                self._print_spinner()
-                time.sleep(0.5)
-                step += 1
-            
-            # 等待线程结束
-            thread.join()
-            
-            if error:
-                raise error
+            self._report_mirror_attempts(attempts)
             
             if result.returncode == 0:
-                print("\n[验证升级结果] ✅")
                 print("\n升级成功！")
                 print(result.stdout)
             else:
-                print("\n[验证升级结果] ❌")
                 print(f"\n升级失败: {result.stderr}")
                 # 检测pip错误
                 self.detect_pip_error(result.stderr)
+                print(f"完整的pip输出日志: {get_runner().log_path}")
         except Exception as e:
             print(f"升级依赖库时出错: {e}")
             # 检测异常中的pip错误
@@ -1168,114 +1395,80 @@ class CommandLineInstaller:
     
     def check_updatable_packages(self):
         """检查可更新的依赖库"""
-        import subprocess
-        import sys
-        import time
-        import threading
-        
         try:
-            python_path = sys.executable
             print("\n检查可更新的依赖库...")
-            print("这可能需要一些时间，请耐心等待...")
-            
-            # 定义检查步骤
-            check_steps = [
-                "收集已安装的依赖库",
-                "检查每个依赖库的版本",
-                "比对最新版本信息",
-                "生成可更新列表"
-            ]
-            
-            # 启动检查线程
-            result = None
-            error = None
-            
-            def check_thread():
-                nonlocal result, error
-                try:
-                    # 运行pip list --outdated命令
-                    result = subprocess.run(
-                        [python_path, "-m", "pip", "list", "--outdated"],
-                        capture_output=True,
-                        text=True,
-                        timeout=60
-                    )
-                except Exception as e:
-                    error = e
-            
-            thread = threading.Thread(target=check_thread)
-            thread.daemon = True
-            thread.start()
-            
-            # 显示进度
-            step = 0
-            while thread.is_alive() and step < len(check_steps):
-                print(f"[{check_steps[step]}] ", end="")
-                self._print_spinner()
-                time.sleep(0.5)
-                step += 1
-            
-            # 等待线程结束
-            thread.join()
-            
-            if error:
-                raise error
+            outdated = self._find_outdated_packages()
+            if outdated is None:
+                return
             
-            if result.returncode == 0:
-                output = result.stdout
-                if output.strip():
-                    print("\n发现可更新的依赖库:")
-                    print("=" * 80)
-                    print(output)
-                    print("=" * 80)
-                    
-                    # 提取可更新的包名列表
-                    lines = output.strip().split('\n')[2:]  # 跳过表头
-                    updatable_packages = []
-                    for line in lines:
-                        if line.strip():
-                            parts = line.split()
-                            if len(parts) >= 1:
-                                updatable_packages.append(parts[0])
-                    
-                    # 询问用户是否更新
-                    if updatable_packages:
-                        print("\n更新选项:")
-                        print("1. 更新所有可更新的依赖库")
-                        print("2. 选择特定的依赖库更新")
-                        print("3. 不更新，返回菜单")
-                        
-                        choice = input("\n请输入选择 (1-3): ")
-                        
-                        if choice == "1":
-                            # 更新所有
-                            self.update_all_packages(updatable_packages)
-                        elif choice == "2":
-                            # 选择更新
-                            self.selective_update(updatable_packages)
-                        elif choice == "3":
-                            # 不更新
-                            print("\n取消更新操作")
-                        else:
-                            print("\n无效选择，请重新输入")
+            if outdated:
+                print("\n发现可更新的依赖库:")
+                print("=" * 80)
+                print(format_outdated_table(outdated))
+                print("=" * 80)
+                
+                # 提取可更新的包名列表
+                updatable_packages = [row.name for row in outdated]
+                
+                # 询问用户是否更新
+                print("\n更新选项:")
+                print("1. 更新所有可更新的依赖库")
+                print("2. 选择特定的依赖库更新")
+                print("3. 不更新，返回菜单")
+                
+                choice = input("\n请输入选择 (1-3): ")
+                
+                if choice == "1":
+                    # 更新所有
+                    self.update_all_packages(updatable_packages)
+                elif choice == "2":
+                    # 选择更新
+                    self.selective_update(updatable_packages)
+                elif choice == "3":
+                    # 不更新
+                    print("\n取消更新操作")
                 else:
-                    print("\n所有依赖库均为最新版本，无需更新！")
+                    print("\n无效选择，请重新输入")
             else:
-                print(f"\n检查失败: {result.stderr}")
-                # 检测pip错误
-                self.detect_pip_error(result.stderr)
+                print("\n所有依赖库均为最新版本，无需更新！")
         except Exception as e:
             print(f"检查可更新依赖库时出错: {e}")
-            # 检测异常中的pip错误
-            if "pip" in str(e).lower():
-                self.suggest_fix_pip()
+    
+    def _find_outdated_packages(self, python_path=None):
+        """并发查询镜像源，返回可更新包列表（失败时返回None）"""
+        import sys
+        import time
+        
+        python_path = python_path or sys.executable
+        mirror_url = self.get_default_mirror_url()
+        print(f"使用镜像源: {self.get_mirror_name(self.default_mirror)} - {mirror_url}")
+        
+        packages = PackageInventory(python_path).list_packages()
+        if not packages:
+            print("\n未找到已安装的包")
+            return None
+        
+        def show_progress(done, total):
+            print(f"\r[检查版本] {done}/{total}", end="", flush=True)
+        
+        start_time = time.time()
+        checker = OutdatedChecker(mirror_url, python_path=python_path, cache=self.index_cache)
+        outdated, errors = checker.check(packages, progress_callback=show_progress)
+        print(f"\n检查完成，用时 {time.time() - start_time:.1f} 秒")
+        
+        if errors:
+            print(f"⚠️  {len(errors)} 个包查询失败:")
+            for name, message in sorted(errors.items())[:10]:
+                print(f"  - {name}: {message[:100]}")
+            if len(errors) == len(packages):
+                print("请检查网络连接或切换镜像源后重试")
+                return None
+        return outdated
     
     def update_all_packages(self, packages):
-        """更新所有可更新的依赖库"""
-        import subprocess
+        """更新所有可更新的依赖库（一次pip事务完成）"""
         import sys
         import time
-        import threading
         
         python_path = sys.executable
         mirror_url = self.get_default_mirror_url()
@@ -1283,76 +1476,54 @@ class CommandLineInstaller:
         print(f"\n更新所有 {len(packages)} 个可更新的依赖库...")
         print(f"使用镜像源: {self.get_mirror_name(self.default_mirror)} - {mirror_url}")
         
+        # 每次pip调用使用新的进度显示
+        progress = [None]
+        
+        def show_status(chunk):
+            if progress[0]:
+                progress[0].finish()
+            if len(chunk) == len(packages):
+                print(f"\n正在一次性升级 {len(chunk)} 个包...")
+            else:
+                print(f"批量升级失败，拆分重试: {', '.join(chunk)}")
+            progress[0] = PipProgress()
+        
+        def show_line(line):
+            progress[0].feed(line)
+        
+        upgrader = BatchUpgrader(python_path, mirror_url)
+        start_time = time.time()
+        try:
+            results = upgrader.upgrade(packages, status_callback=show_status, line_callback=show_line)
+        except Exception as e:
+            print(f"❌ 更新时出错: {e}")
+            self.detect_pip_error(str(e))
+            return
+        finally:
+            if progress[0]:
+                progress[0].finish()
+        elapsed = time.time() - start_time
+        
         success_count = 0
+        unchanged_count = 0
         fail_count = 0
-        
-        for i, package in enumerate(packages, 1):
-            try:
-                print(f"\n[{i}/{len(packages)}] 正在更新: {package}...")
-                
-                cmd = [python_path, "-m", "pip", "install", "--upgrade", package]
-                if mirror_url:
-                    cmd.extend(["-i", mirror_url])
-                
-                # 显示更新进度
-                print("更新过程中...")
-                
-                # 定义更新步骤
-                update_steps = [
-                    "检查当前版本",
-                    "下载最新版本",
-                    "安装最新版本",
-                    "验证更新结果"
-                ]
-                
-                # 启动更新线程
-                result = None
-                error = None
-                
-                def update_thread():
-                    nonlocal result, error
-                    try:
-                        result = subprocess.run(
-                            cmd,
-                            capture_output=True,
-                            text=True,
-                            timeout=60
-                        )
-                    except Exception as e:
-                        error = e
-                
-                thread = threading.Thread(target=update_thread)
-                thread.daemon = True
-                thread.start()
-                
-                # 显示进度
-                step = 0
-                while thread.is_alive() and step < len(update_steps):
-                    print(f"[{update_steps[step]}] ", end="")
-                    self._print_spinner()
-                    time.sleep(0.3)
-                    step += 1
-                
-                # 等待线程结束
-                thread.join()
-                
-                if error:
-                    raise error
-                
-                if result.returncode == 0:
-                    print("\n[验证更新结果] ✅")
-                    print(f"✅ {package} 更新成功！")
-                    success_count += 1
-                else:
-                    print("\n[验证更新结果] ❌")
-                    print(f"❌ {package} 更新失败: {result.stderr[:100]}...")
-                    fail_count += 1
-            except Exception as e:
-                print(f"❌ {package} 更新时出错: {e}")
+        for i, item in enumerate(results, 1):
+            if item.success and not item.changed:
+                print(f"[{i}/{len(results)}] ➖ {item.name} 版本未变化 ({item.old_version})")
+                unchanged_count += 1
+            elif item.success:
+                print(f"[{i}/{len(results)}] ✅ {item.name} {item.old_version} -> {item.new_version}")
+                success_count += 1
+            else:
+                print(f"[{i}/{len(results)}] ❌ {item.name} 更新失败: {item.message[:100]}")
                 fail_count += 1
         
         print(f"\n更新完成！")
-        print(f"成功: {success_count}, 失败: {fail_count}")
+        print(f"成功: {success_count}, 未变化: {unchanged_count}, 失败: {fail_count}")
+        print(f"用时 {elapsed:.1f} 秒，共调用pip {upgrader.invocations} 次")
+        if len(packages) > upgrader.invocations:
+            saved = upgrader.estimate_time_saved(len(packages))
+            print(f"与逐个升级相比至少节省约 {saved:.1f} 秒（按每次pip启动开销估算）")
     
     def selective_update(self, packages):
         """选择特定的依赖库更新"""
@@ -1426,7 +1597,6 @@ class CommandLineInstaller:
     
     def check_for_updates(self):
         """从GitHub检查最新版本并自动下载"""
-        import requests
         import json
         import threading
         import time
@@ -1456,7 +1626,8 @@ class CommandLineInstaller:
             
             # 从GitHub API获取仓库信息
             repo_url = "https://api.github.com/repos/zhangleyan0413/PyPi-Manager"
-            response = requests.get(repo_url, timeout=10)
+            http = get_client()
+            response = http.get(repo_url, timeout=10)
             
             loading = False
             
@@ -1466,7 +1637,7 @@ class CommandLineInstaller:
                 # 获取默认分支的最新提交
                 default_branch = repo_data.get("default_branch", "main")
                 branch_url = f"https://api.github.com/repos/zhangleyan0413/PyPi-Manager/branches/{default_branch}"
-                branch_response = requests.get(branch_url, timeout=10)
+                branch_response = http.get(branch_url, timeout=10)
                 
                 if branch_response.status_code == 200:
                     branch_data = branch_response.json()
@@ -1482,7 +1653,7 @@ class CommandLineInstaller:
                     # 尝试从仓库中获取版本号
                     # 检查README.md文件中的版本号
                     readme_url = f"https://api.github.com/repos/zhangleyan0413/PyPi-Manager/contents/README.md"
-                    readme_response = requests.get(readme_url, timeout=10)
+                    readme_response = http.get(readme_url, timeout=10)
                     
                     repo_version = ""
                     if readme_response.status_code == 200:
@@ -1574,7 +1745,6 @@ class CommandLineInstaller:
     
     def _download_and_update(self, download_url, version):
         """下载并更新程序"""
-        import requests
         import zipfile
         import os
         import shutil
@@ -1587,25 +1757,16 @@ class CommandLineInstaller:
         
         try:
             # 显示下载进度
-            def download_with_progress(url, file_path):
-                response = requests.get(url, stream=True, timeout=30)
-                total_size = int(response.headers.get('content-length', 0))
-                downloaded_size = 0
-                
-                with open(file_path, 'wb') as file:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            file.write(chunk)
-                            downloaded_size += len(chunk)
-                            
-                            # 显示进度
-                            progress = downloaded_size / total_size * 100
-                            print(f"下载进度: {progress:.1f}%", end="\r")
-                
-                print("\n下载完成！")
+            def show_progress(downloaded_size, total_size):
+                if total_size > 0:
+                    progress = downloaded_size / total_size * 100
+                    print(f"下载进度: {progress:.1f}%", end="\r")
+                else:
+                    print(f"已下载: {self._format_size(downloaded_size)}", end="\r")
             
-            # 下载文件
-            download_with_progress(download_url, zip_file_path)
+            # 下载文件（支持断点续传）
+            DownloadEngine().download(download_url, zip_file_path, progress_callback=show_progress)
+            print("\n下载完成！")
             
             # 解压文件
             print("\n正在解压文件...")
@@ -1807,9 +1968,10 @@ class CommandLineInstaller:
             print("1. 获取可用Python版本")
             print("2. 安装指定版本")
             print("3. 检查已安装的Python版本")
-            print("4. 返回主菜单")
+            print("4. 管理安装程序缓存")
+            print("5. 返回主菜单")
             
-            choice = input("请输入选择 (1-4): ")
+            choice = input("请输入选择 (1-5): ")
             
             if choice == "1":
                 self.fetch_versions()
@@ -1818,10 +1980,54 @@ class CommandLineInstaller:
             elif choice == "3":
                 self.check_installed_versions()
             elif choice == "4":
+                self.manage_installer_cache()
+            elif choice == "5":
                 break
             else:
                 print("无效选择，请重新输入")
     
+    def manage_installer_cache(self):
+        """查看和配置Python安装程序缓存"""
+        import os
+        from app_config import load_settings, save_settings
+        from installer_cache import InstallerCache, SHARED_CACHE_ENV
+        
+        cache = self.installer.installer_cache
+        entries = cache.entries()
+        print("\n安装程序缓存")
+        print(f"缓存目录: {cache.cache_dir}{' (共享)' if cache.shared else ''}")
+        print(f"已缓存: {len(entries)} 个安装程序，共 {self._format_size(sum(size for _, size, _ in entries))}")
+        print(f"容量上限: {self._format_size(cache.max_size)}")
+        
+        print("\n1. 设置共享缓存目录（如网络路径，留空恢复本地目录）")
+        print("2. 设置容量上限")
+        print("3. 返回")
+        choice = input("请输入选择 (1-3): ")
+        
+        settings = load_settings()
+        if choice == "1":
+            path = input("请输入缓存目录: ").strip()
+            if path:
+                settings["installer_cache_dir"] = path
+            else:
+                settings.pop("installer_cache_dir", None)
+            if os.environ.get(SHARED_CACHE_ENV):
+                print(f"注意: 环境变量 {SHARED_CACHE_ENV} 已设置，将优先使用其中的目录")
+        elif choice == "2":
+            try:
+                max_mb = int(input("请输入容量上限 (MB): ").strip())
+            except ValueError:
+                print("无效的数值")
+                return
+            settings["installer_cache_max_mb"] = max(max_mb, 0)
+        else:
+            return
+        
+        save_settings(settings)
+        self.installer.installer_cache = InstallerCache()
+        self.installer.installer_cache.evict()
+        print("安装程序缓存设置已保存")
+    
     def _format_size(self, size):
         """格式化文件大小"""
         for unit in ['B', 'KB', 'MB', 'GB']:
@@ -1830,163 +2036,25 @@ class CommandLineInstaller:
             size /= 1024
         return f"{size:.2f} TB"
     
-    def _print_spinner(self):
-        """打印加载动画"""
-        import sys
-        import time
-        
-        spinner = ['|', '/', '-', '\\']
-        for char in spinner:
-            sys.stdout.write(f"{char}\r")
-            sys.stdout.flush()
-            time.sleep(0.1)
-        sys.stdout.write(" " * 10 + "\r")
-        sys.stdout.flush()
-    
     def batch_update_packages(self):
         """批量更新所有包"""
         print("\n批量更新所有包")
         print("这可能需要一些时间，请耐心等待...")
         
-        import subprocess
-        import sys
-        import time
-        import threading
-        
         try:
-            python_path = sys.executable
-            mirror_url = self.get_default_mirror_url()
-            print(f"使用镜像源: {self.get_mirror_name(self.default_mirror)} - {mirror_url}")
-            
-            # 定义更新步骤
-            update_steps = [
-                "检查可更新的包",
-                "下载最新版本",
-                "安装更新",
-                "验证更新结果"
-            ]
-            
-            # 启动更新线程
-            result = None
-            error = None
-            
-            def update_thread():
-                nonlocal result, error
-                try:
-                    cmd = [python_path, "-m", "pip", "list", "--outdated"]
-                    outdated_result = subprocess.run(
-                        cmd,
-                        capture_output=True,
-                        text=True,
-                        timeout=60
-                    )
-                    
-                    if outdated_result.returncode == 0:
-                        # 处理输出格式
-                        lines = outdated_result.stdout.strip().split('\n')
-                        outdated_packages = []
-                        
-                        # 跳过表头
-                        for line in lines[2:]:  # 跳过前两行表头
-                            if line.strip():
-                                parts = line.split()
-                                if len(parts) >= 1:
-                                    pkg_name = parts[0]
-                                    outdated_packages.append(pkg_name)
-                        
-                        if outdated_packages:
-                            print(f"\n发现 {len(outdated_packages)} 个可更新的包")
-                            print("可更新的包:")
-                            for pkg in outdated_packages:
-                                print(f"- {pkg}")
-                            
-                            # 逐个更新
-                            success_count = 0
-                            fail_count = 0
-                            
-                            for i, pkg_name in enumerate(outdated_packages, 1):
-                                print(f"\n[{i}/{len(outdated_packages)}] 正在更新: {pkg_name}")
-                                
-                                update_cmd = [python_path, "-m", "pip", "install", "--upgrade", pkg_name]
-                                if mirror_url:
-                                    update_cmd.extend(["-i", mirror_url])
-                                
-                                # 定义更新步骤
-                                update_steps = [
-                                    "解析依赖关系",
-                                    "下载最新版本",
-                                    "安装更新",
-                                    "验证更新结果"
-                                ]
-                                
-                                # 启动更新线程
-                                update_result = None
-                                update_error = None
-                                
-                                def update_thread():
-                                    nonlocal update_result, update_error
-                                    try:
-                                        update_result = subprocess.run(
-                                            update_cmd,
-                                            capture_output=True,
-                                            text=True,
-                                            timeout=60
-                                        )
-                                    except Exception as e:
-                                        update_error = e
-                                
-                                thread = threading.Thread(target=update_thread)
-                                thread.daemon = True
-                                thread.start()
-                                
-                                # 显示进度
-                                step = 0
-                                while thread.is_alive() and step < len(update_steps):
-                                    print(f"[{update_steps[step]}] ", end="")
-                                    self._print_spinner()
-                                    time.sleep(0.3)
-                                    step += 1
-                                
-                                # 等待线程结束
-                                thread.join()
-                                
-                                if update_error:
-                                    print(f"❌ {pkg_name} 更新时出错: {update_error}")
-                                    fail_count += 1
-                                elif update_result.returncode == 0:
-                                    print("[验证更新结果] ✅")
-                                    print(f"✅ {pkg_name} 更新成功")
-                                    success_count += 1
-                                else:
-                                    print("[验证更新结果] ❌")
-                                    print(f"❌ {pkg_name} 更新失败")
-                                    fail_count += 1
-                            
-                            print(f"\n更新完成！成功: {success_count}, 失败: {fail_count}")
-                        else:
-                            print("\n所有包都是最新版本，无需更新")
-                    else:
-                        print(f"\n检查可更新包失败: {outdated_result.stderr}")
-                except Exception as e:
-                    error = e
-            
-            thread = threading.Thread(target=update_thread)
-            thread.daemon = True
-            thread.start()
-            
-            # 显示进度
-            step = 0
-            while thread.is_alive() and step < len(update_steps):
-                print(f"[{update_steps[step]}] ", end="")
-                self._print_spinner()
-                time.sleep(0.5)
-                step += 1
-            
-            # 等待线程结束
-            thread.join()
+            outdated = self._find_outdated_packages()
+            if outdated is None:
+                return
             
-            if error:
-                raise error
+            if outdated:
+                print(f"\n发现 {len(outdated)} 个可更新的包")
+                print("可更新的包:")
+                for row in outdated:
+                    print(f"- {row.name} ({row.installed} -> {row.latest})")
+                
+                self.update_all_packages([row.name for row in outdated])
+            else:
+                print("\n所有包都是最新版本，无需更新")
         except Exception as e:
             print(f"批量更新包时出错: {e}")
     
@@ -1994,102 +2062,70 @@ class CommandLineInstaller:
         """批量卸载包"""
         print("\n批量卸载包")
         
-        import subprocess
         import sys
+        import time
         
         try:
             python_path = sys.executable
             
             # 获取已安装的包
             print("获取已安装的包列表...")
-            result = subprocess.run(
-                [python_path, "-m", "pip", "list", "--format=freeze"],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            installed = PackageInventory(python_path).list_packages()
+            packages = [p.name for p in installed]
             
-            if result.returncode == 0:
-                packages = result.stdout.strip().split('\n')
-                if packages and packages[0]:
-                    print("\n已安装的包:")
-                    for i, pkg in enumerate(packages, 1):
-                        if pkg:
-                            pkg_name = pkg.split('==')[0]
-                            print(f"{i}. {pkg_name}")
+            if packages:
+                print("\n已安装的包:")
+                for i, pkg_name in enumerate(packages, 1):
+                    print(f"{i}. {pkg_name}")
+                
+                # 让用户选择要卸载的包
+                selection = input("\n请输入要卸载的包的编号（多个编号用空格分隔）: ")
+                selected_indices = [int(idx) - 1 for idx in selection.split() if idx.isdigit()]
+                
+                if selected_indices:
+                    packages_to_uninstall = [packages[idx] for idx in selected_indices if 0 <= idx < len(packages)]
                     
-                    # 让用户选择要卸载的包
-                    selection = input("\n请输入要卸载的包的编号（多个编号用空格分隔）: ")
-                    selected_indices = [int(idx) - 1 for idx in selection.split() if idx.isdigit()]
+                    print(f"\n将卸载以下 {len(packages_to_uninstall)} 个包:")
+                    for pkg in packages_to_uninstall:
+                        print(f"- {pkg}")
                     
-                    if selected_indices:
-                        packages_to_uninstall = [packages[idx].split('==')[0] for idx in selected_indices if 0 <= idx < len(packages)]
-                        
-                        print(f"\n将卸载以下 {len(packages_to_uninstall)} 个包:")
-                        for pkg in packages_to_uninstall:
+                    graph = DependencyGraph(installed)
+                    if not self._confirm_uninstall_impact(graph, packages_to_uninstall):
+                        print("卸载操作已取消")
+                        return
+                    
+                    # 找出卸载后不再被任何包需要的依赖
+                    orphans = [graph.name(key) for key in graph.orphans(packages_to_uninstall)]
+                    if orphans:
+                        print(f"\n以下 {len(orphans)} 个依赖包在卸载后将不再被其他包使用:")
+                        for pkg in orphans:
                             print(f"- {pkg}")
+                        if input("同时卸载这些依赖包吗？ (y/n): ").lower() == "y":
+                            packages_to_uninstall.extend(orphans)
+                    
+                    confirm = input(f"\n确认卸载 {len(packages_to_uninstall)} 个包吗？ (y/n): ")
+                    if confirm.lower() == "y":
+                        start_time = time.time()
+                        # 所有包在一次pip事务中卸载，根据pip的实时输出显示进度
+                        progress = PipProgress(total=len(packages_to_uninstall))
+                        uninstaller = BatchUninstaller(python_path)
+                        try:
+                            results = uninstaller.uninstall(packages_to_uninstall, line_callback=progress.feed)
+                        finally:
+                            progress.finish()
                         
-                        confirm = input("\n确认卸载吗？ (y/n): ")
-                        if confirm.lower() == "y":
-                            import threading
-                            import time
-                            
-                            for i, pkg in enumerate(packages_to_uninstall, 1):
-                                print(f"\n[{i}/{len(packages_to_uninstall)}] 正在卸载: {pkg}")
-                                
-                                # 定义卸载步骤
-                                uninstall_steps = [
-                                    "准备卸载",
-                                    "移除文件",
-                                    "清理配置",
-                                    "验证卸载结果"
-                                ]
-                                
-                                # 启动卸载线程
-                                uninstall_result = None
-                                uninstall_error = None
-                                
-                                def uninstall_thread():
-                                    nonlocal uninstall_result, uninstall_error
-                                    try:
-                                        uninstall_result = subprocess.run(
-                                            [python_path, "-m", "pip", "uninstall", "-y", pkg],
-                                            capture_output=True,
-                                            text=True,
-                                            timeout=30
-                                        )
-                                    except Exception as e:
-                                        uninstall_error = e
-                                
-                                thread = threading.Thread(target=uninstall_thread)
-                                thread.daemon = True
-                                thread.start()
-                                
-                                # 显示进度
-                                step = 0
-                                while thread.is_alive() and step < len(uninstall_steps):
-                                    print(f"[{uninstall_steps[step]}] ", end="")
-                                    self._print_spinner()
-                                    time.sleep(0.3)
-                                    step += 1
-                                
-                                # 等待线程结束
-                                thread.join()
-                                
-                                if uninstall_error:
-                                    print(f"❌ {pkg} 卸载时出错: {uninstall_error}")
-                                elif uninstall_result.returncode == 0:
-                                    print("[验证卸载结果] ✅")
-                                    print(f"✅ {pkg} 卸载成功")
-                                else:
-                                    print("[验证卸载结果] ❌")
-                                    print(f"❌ {pkg} 卸载失败")
-                    else:
-                        print("\n未选择任何包")
+                        succeeded = [r for r in results if r.success]
+                        failed = [r for r in results if not r.success]
+                        for result in failed:
+                            print(f"❌ {result.name} 卸载失败: {result.message}")
+                        print(f"\n✅ 成功卸载 {len(succeeded)} 个包，失败 {len(failed)} 个")
+                        print(f"耗时 {time.time() - start_time:.1f} 秒，pip调用 {uninstaller.invocations} 次")
+                        if failed:
+                            print(f"完整的pip输出日志: {get_runner().log_path}")
                 else:
-                    print("\n未安装任何包")
+                    print("\n未选择任何包")
             else:
-                print(f"\n获取包列表失败: {result.stderr}")
+                print("\n未安装任何包")
         except Exception as e:
             print(f"批量卸载包时出错: {e}")
     
@@ -2097,151 +2133,257 @@ class CommandLineInstaller:
         """导出已安装的包列表"""
         print("\n导出已安装的包列表")
         
-        import subprocess
         import sys
         import os
         
         try:
             python_path = sys.executable
-            import threading
-            import time
-            
-            # 定义导出步骤
-            export_steps = [
-                "获取已安装的包",
-                "处理包列表数据",
-                "写入文件",
-                "验证导出结果"
-            ]
-            
-            # 启动导出线程
-            result = None
-            export_error = None
-            packages = None
-            
-            def export_thread():
-                nonlocal result, export_error, packages
-                try:
-                    # 获取已安装的包
-                    result = subprocess.run(
-                        [python_path, "-m", "pip", "list", "--format=freeze"],
-                        capture_output=True,
-                        text=True,
-                        timeout=30
-                    )
-                    if result.returncode == 0:
-                        packages = result.stdout
-                except Exception as e:
-                    export_error = e
             
-            thread = threading.Thread(target=export_thread)
-            thread.daemon = True
-            thread.start()
-            
-            # 显示进度
-            step = 0
-            while thread.is_alive() and step < len(export_steps):
-                print(f"[{export_steps[step]}] ", end="")
-                self._print_spinner()
-                time.sleep(0.3)
-                step += 1
-            
-            # 等待线程结束
-            thread.join()
-            
-            if export_error:
-                print(f"\n导出包列表时出错: {export_error}")
-                return
-            
-            if result.returncode == 0 and packages:
+            # 直接读取已安装包的元数据
+            print("获取已安装的包...")
+            inventory = PackageInventory(python_path)
+            package_list = inventory.list_packages()
+            
+            if package_list:
+                print("\n导出格式:")
+                print("1. requirements.txt（name==version）")
+                print("2. 锁定文件 pypi-lock.json（精确版本、SHA-256哈希和各镜像源下载地址）")
+                if input("请输入选择 (1-2，默认1): ").strip() == "2":
+                    self.export_lockfile(package_list)
+                    return
+                
                 # 导出到文件
                 export_path = os.path.join(os.getcwd(), "requirements.txt")
                 with open(export_path, "w", encoding="utf-8") as f:
-                    f.write(packages)
+                    f.write(inventory.to_freeze(package_list))
                 
                 print(f"\n包列表已导出到: {export_path}")
-                # 修复f-string语法错误
-                newline = '\n'
-                package_count = len(packages.strip().split(newline))
-                print(f"共导出 {package_count} 个包")
+                print(f"共导出 {len(package_list)} 个包")
             else:
-                print(f"\n导出包列表失败: {result.stderr}")
+                print("\n导出包列表失败: 未找到已安装的包")
         except Exception as e:
             print(f"导出包列表时出错: {e}")
     
+    def export_lockfile(self, packages):
+        """导出锁定文件"""
+        import os
+        import sys
+        
+        # 本地缓存代理的地址不能写入锁定文件，使用实际的镜像源
+        mirror_urls = [self.get_mirror_url(self.default_mirror)]
+        if input("是否同时记录所有镜像源的下载地址（安装时可自动切换）？ (y/n): ").lower() == "y":
+            mirror_urls.extend(url for url in self._all_mirror_urls() if url not in mirror_urls)
+        
+        print(f"\n生成锁定文件（{len(packages)} 个包，{len(mirror_urls)} 个镜像源）...")
+        
+        def on_progress(done, total, name):
+            print(f"\r已处理 {done}/{total} 个包", end="", flush=True)
+        
+        builder = LockfileBuilder(mirror_urls, python_path=sys.executable, cache=self.index_cache)
+        lock = builder.build(packages, progress_callback=on_progress)
+        print()
+        
+        export_path = os.path.join(os.getcwd(), "pypi-lock.json")
+        save_lockfile(lock, export_path)
+        print(f"\n锁定文件已导出到: {export_path}")
+        print(f"共锁定 {len(lock['packages'])} 个包")
+        if lock["unresolved"]:
+            print(f"\n⚠️ 以下 {len(lock['unresolved'])} 个包无法锁定（安装时将跳过）:")
+            for entry in lock["unresolved"]:
+                print(f"- {entry['name']}=={entry['version']}: {entry['reason']}")
+    
+    def install_from_lockfile(self, file_path):
+        """按锁定文件安装：不解析依赖，并行下载并按哈希校验安装"""
+        import sys
+        import time
+        
+        try:
+            lock = load_lockfile(file_path)
+        except (OSError, ValueError) as e:
+            print(f"\n读取锁定文件失败: {e}")
+            return
+        
+        start_time = time.time()
+        installer = LockedInstaller(sys.executable, mirror_order=self._create_mirror_failover().ordered_mirrors())
+        warnings = installer.check_target(lock)
+        if warnings:
+            for warning in warnings:
+                print(f"\n⚠️ {warning}")
+            if input("锁定的文件可能无法在当前环境安装，仍要继续吗？ (y/n): ").lower() != "y":
+                return
+        
+        to_install, satisfied = installer.plan(lock)
+        print(f"\n锁定文件共 {len(lock['packages'])} 个包: 已是锁定版本 {len(satisfied)} 个，需要安装 {len(to_install)} 个")
+        for entry in lock.get("unresolved", []):
+            print(f"⚠️ 跳过未锁定的包: {entry['name']}=={entry['version']}")
+        if not to_install:
+            print("\n✅ 当前环境已与锁定文件一致")
+            return
+        
+        def on_download(done, total, name):
+            print(f"\r已下载 {done}/{total} 个文件", end="", flush=True)
+        
+        paths, errors = installer.download(to_install, progress_callback=on_download)
+        print()
+        if errors:
+            print(f"\n❌ {len(errors)} 个文件下载失败，未进行安装:")
+            for name, message in errors.items():
+                print(f"- {name}: {message}")
+            return
+        
+        progress = PipProgress()
+        try:
+            result = installer.install(to_install, paths, line_callback=progress.feed)
+        finally:
+            progress.finish()
+        
+        if result.returncode == 0:
+            print(f"\n✅ 按锁定文件安装完成，共安装 {len(to_install)} 个包，耗时 {time.time() - start_time:.1f} 秒")
+        else:
+            print(f"\n❌ 按锁定文件安装失败: {result.stderr}")
+            self.detect_pip_error(result.stderr)
+            print(f"完整的pip输出日志: {get_runner().log_path}")
+    
+    def sync_from_requirements(self, requirements, others):
+        """按合并后的requirements同步当前环境：先显示计划，只应用差异"""
+        import os
+        import sys
+        import time
+        
+        remove_extra = input("是否卸载文件中未列出且不被其他包依赖的包？ (y/n，默认: n): ").lower() == "y"
+        start_time = time.time()
+        sync = EnvSync(sys.executable)
+        plan = sync.plan(requirements, others, remove_extra=remove_extra)
+        print(f"\n同步计划（计算耗时 {time.time() - start_time:.2f} 秒）:")
+        print(format_plan(plan))
+        
+        if not (sync.needs_install(plan) or plan.remove):
+            print("\n✅ 当前环境已与文件一致，无需更改")
+            return
+        if input("\n确认按以上计划同步吗？ (y/n): ").lower() != "y":
+            print("已取消同步")
+            return
+        
+        # 安装和卸载会修改同一个site-packages，按顺序执行：先在一次pip事务中安装和变更版本
+        if sync.needs_install(plan):
+            print(f"\n使用镜像源: {self.get_mirror_name(self.default_mirror)} - {self.get_default_mirror_url()}")
+            requirements_path = sync.write_install_file(plan)
+            progress = PipProgress()
+            try:
+                result, attempts = self._create_mirror_failover().run_pip(
+                    sync.install_command(requirements_path), timeout=300, line_callback=progress.feed
+                )
+            finally:
+                progress.finish()
+                os.remove(requirements_path)
+            self._report_mirror_attempts(attempts)
+            if result.returncode != 0:
+                print(f"\n❌ 安装失败，未进行卸载: {result.stderr}")
+                self.detect_pip_error(result.stderr)
+                print(f"完整的pip输出日志: {get_runner().log_path}")
+                return
+            print("\n✅ 安装和版本变更完成")
+        
+        # 新安装的包可能依赖原计划卸载的包，重新计算后在一次pip事务中卸载
+        removing = sync.confirm_removals(plan)
+        if removing:
+            progress = PipProgress()
+            try:
+                results = BatchUninstaller(sys.executable).uninstall(removing, line_callback=progress.feed)
+            finally:
+                progress.finish()
+            failed = [r for r in results if not r.success]
+            print(f"\n已卸载 {len(results) - len(failed)} 个包")
+            for r in failed:
+                print(f"❌ {r.name}: {r.message}")
+        
+        print(f"\n同步完成，耗时 {time.time() - start_time:.1f} 秒")
+    
     def install_from_requirements(self):
         """从文件安装包"""
         print("\n从文件安装包")
         
-        import subprocess
         import sys
         import os
-        import time
-        import threading
         
         try:
             python_path = sys.executable
             mirror_url = self.get_default_mirror_url()
             
-            # 让用户输入文件路径
-            file_path = input("请输入requirements文件路径（默认: requirements.txt）: ")
-            if not file_path:
-                file_path = "requirements.txt"
+            # 让用户输入文件路径，可以是多个文件或目录
+            answer = input("请输入requirements文件、锁定文件或目录路径（多个路径用逗号分隔，默认: requirements.txt）: ")
+            paths = [p.strip().strip('"') for p in answer.split(",") if p.strip()] or ["requirements.txt"]
             
             # 检查文件是否存在
-            if not os.path.exists(file_path):
-                print(f"\n文件不存在: {file_path}")
-                return
+            for path in paths:
+                if not os.path.exists(path):
+                    print(f"\n文件不存在: {path}")
+                    return
             
-            print(f"\n从文件安装包: {file_path}")
-            print(f"使用镜像源: {self.get_mirror_name(self.default_mirror)} - {mirror_url}")
+            # 锁定文件使用锁定安装模式
+            if len(paths) == 1 and os.path.isfile(paths[0]) and is_lockfile(paths[0]):
+                self.install_from_lockfile(paths[0])
+                return
             
-            # 定义安装步骤
-            install_steps = [
-                "读取依赖文件",
-                "解析依赖关系",
-                "下载依赖包",
-                "安装依赖包",
-                "验证安装结果"
-            ]
-            
-            # 启动安装线程
-            result = None
-            error = None
-            
-            def install_thread():
-                nonlocal result, error
-                try:
-                    cmd = [python_path, "-m", "pip", "install", "-r", file_path]
-                    if mirror_url:
-                        cmd.extend(["-i", mirror_url])
-                    
-                    result = subprocess.run(
-                        cmd,
-                        capture_output=True,
-                        text=True,
-                        timeout=300  # 增加超时时间
-                    )
-                except Exception as e:
-                    error = e
+            files = []
+            for path in paths:
+                files.extend(find_requirements_files(path) if os.path.isdir(path) else [path])
+            if not files:
+                print("\n目录中未找到requirements文件")
+                return
             
-            thread = threading.Thread(target=install_thread)
-            thread.daemon = True
-            thread.start()
+            # 跟随 -r/-c 引用读取全部文件，合并为一个安装集合
+            parser = RequirementsParser()
+            resolved = parser.resolve(files)
+            print(f"\n已读取 {parser.last_files} 个文件（其中 {parser.last_cache_hits} 个未修改，使用缓存）")
+            print(f"合并后共 {len(resolved.requirements)} 个依赖、{len(resolved.constraints)} 个约束")
+            if resolved.missing:
+                print("\n❌ 引用的文件不存在:")
+                for path, origin in resolved.missing:
+                    print(f"- {path}" + (f"（由 {origin} 引用）" if origin else ""))
+                return
+            if resolved.conflicts:
+                print("\n❌ 不同文件中的版本固定互相矛盾，请先修改:")
+                print(format_conflicts(resolved.conflicts))
+                return
             
-            # 显示进度
-            step = 0
-            while thread.is_alive() and step < len(install_steps):
-                print(f"[{install_steps[step]}] ", end="")
-                self._print_spinner()
-                time.sleep(0.5)
-                step += 1
+            print("\n请选择安装方式:")
+            print("1. 完整安装（pip install -r）")
+            print("2. 同步（只安装、变更和卸载有差异的包）")
+            sync_mode = input("请输入选项（默认: 1）: ").strip() == "2"
             
-            # 等待线程结束
-            thread.join()
+            temp_files = []
+            try:
+                others = list(resolved.others)
+                if resolved.constraints:
+                    constraints_path = write_temp_requirements([constraint_line(r) for r in resolved.constraints])
+                    temp_files.append(constraints_path)
+                    others.append(option_line("-c", constraints_path))
+                
+                if sync_mode:
+                    self.sync_from_requirements(resolved.requirements, others)
+                    return
+                
+                merged_path = write_temp_requirements(others + [requirement_line(r) for r in resolved.requirements])
+                temp_files.append(merged_path)
+                
+                print(f"\n从文件安装包: {', '.join(paths)}")
+                print(f"使用镜像源: {self.get_mirror_name(self.default_mirror)} - {mirror_url}")
+                
+                failover = self._create_mirror_failover()
+                cmd = [python_path, "-m", "pip", "install", "-r", merged_path]
+                
+                # 根据pip的实时输出显示进度
+                progress = PipProgress()
+                try:
+                    result, attempts = failover.run_pip(cmd, timeout=300, line_callback=progress.feed)  # 增加超时时间
+                finally:
+                    progress.finish()
+            finally:
+                for path in temp_files:
+                    os.remove(path)
             
-            if error:
-                raise error
+            self._report_mirror_attempts(attempts)
             
             if result.returncode == 0:
                 print("\n✅ 从文件安装包成功！")
@@ -2249,6 +2391,7 @@ class CommandLineInstaller:
             else:
                 print(f"\n❌ 从文件安装包失败: {result.stderr}")
                 self.detect_pip_error(result.stderr)
+                print(f"完整的pip输出日志: {get_runner().log_path}")
         except Exception as e:
             print(f"从文件安装包时出错: {e}")
     
@@ -2256,59 +2399,24 @@ class CommandLineInstaller:
         """使用ensurepip修复pip"""
         import subprocess
         import sys
-        import time
-        import threading
         
         try:
             python_path = sys.executable
             print(f"\n正在使用ensurepip修复pip...")
             print(f"使用Python可执行文件: {python_path}")
             
-            # 定义修复步骤
-            fix_steps = [
-                "启动ensurepip模块",
-                "检查当前pip版本",
-                "下载最新版本",
-                "安装并配置pip",
-                "验证修复结果"
-            ]
-            
-            # 启动修复线程
-            result = None
-            error = None
-            
-            def fix_thread():
-                nonlocal result, error
-                try:
-                    result = subprocess.run(
-                        [python_path, "-m", "ensurepip", "--upgrade"],
-                        capture_output=True,
-                        text=True,
-                        timeout=30
-                    )
-                except Exception as e:
-                    error = e
-            
-            thread = threading.Thread(target=fix_thread)
-            thread.daemon = True
-            thread.start()
-            
-            # 显示进度
-            step = 0
-            while thread.is_alive() and step < len(fix_steps):
-                print(f"[{fix_steps[step]}] ", end="")
-                self._print_spinner()
-                time.sleep(0.5)
-                step += 1
-            
-            # 等待线程结束
-            thread.join()
-            
-            if error:
-                raise error
+            # ensurepip内部调用pip安装自带的wheel，输出格式与pip相同
+            progress = PipProgress()
+            try:
+                result = run_streaming(
+                    [python_path, "-m", "ensurepip", "--upgrade"],
+                    progress.feed,
+                    timeout=30
+                )
+            finally:
+                progress.finish()
             
             if result.returncode == 0:
-                print("\n[验证修复结果] ✅")
                 print("\n✅ pip修复成功！")
                 print(result.stdout)
                 # 验证修复结果
@@ -2357,7 +2465,7 @@ class CommandLineInstaller:
         import subprocess
         import os
         import sys
-        import urllib.request
+        import requests
         
         try:
             python_path = sys.executable
@@ -2371,18 +2479,18 @@ class CommandLineInstaller:
             print(f"\n正在下载get-pip.py脚本...")
             print(f"下载地址: {get_pip_url}")
             
-            # 使用urllib下载脚本
-            urllib.request.urlretrieve(get_pip_url, get_pip_path)
+            # 使用共享HTTP客户端下载脚本（连接复用，失败自动重试）
+            get_client().download_file(get_pip_url, get_pip_path)
             print(f"\n脚本下载完成: {get_pip_path}")
             
             # 运行get-pip.py脚本
             print("\n正在运行get-pip.py脚本安装pip...")
-            result = subprocess.run(
-                [python_path, get_pip_path],
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
+            # get-pip.py内部运行pip安装，输出格式与pip相同，流式显示进度并写入日志
+            progress = PipProgress()
+            try:
+                result = run_streaming([python_path, get_pip_path], progress.feed, timeout=60)
+            finally:
+                progress.finish()
             
             # 清理临时文件
             if os.path.exists(get_pip_path):
@@ -2403,8 +2511,9 @@ class CommandLineInstaller:
                     print(verify_result.stdout)
             else:
                 print(f"\n❌ pip安装失败: {result.stderr}")
+                print(f"完整的pip输出日志: {get_runner().log_path}")
                 print("\n建议尝试其他安装方法或重新安装Python")
-        except urllib.error.URLError as e:
+        except requests.RequestException as e:
             print(f"\n❌ 下载get-pip.py脚本失败: {e}")
             print("\n请检查网络连接后重试")
         except Exception as e:
@@ -2452,16 +2561,31 @@ class CommandLineInstaller:
         """卸载依赖库"""
         package_name = input("\n请输入要卸载的依赖库名称: ")
         
-        import subprocess
+        import sys
         
         try:
-            print(f"\n卸载依赖库: {package_name}...")
-            result = subprocess.run(
-                ["python", "-m", "pip", "uninstall", "-y", package_name],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            targets = [package_name]
+            graph = DependencyGraph(PackageInventory(sys.executable).list_packages())
+            if not self._confirm_uninstall_impact(graph, targets):
+                print("卸载操作已取消")
+                return
+            
+            orphans = [graph.name(key) for key in graph.orphans(targets)]
+            if orphans:
+                print(f"\n以下依赖包在卸载后将不再被其他包使用: {', '.join(orphans)}")
+                if input("同时卸载这些依赖包吗？ (y/n): ").lower() == "y":
+                    targets.extend(orphans)
+            
+            print(f"\n卸载依赖库: {', '.join(targets)}...")
+            progress = PipProgress(total=len(targets))
+            try:
+                result = run_streaming(
+                    [sys.executable, "-m", "pip", "uninstall", "-y"] + targets,
+                    progress.feed,
+                    timeout=max(30, 10 * len(targets))
+                )
+            finally:
+                progress.finish()
             
             if result.returncode == 0:
                 print("\n卸载成功！")
@@ -2471,12 +2595,33 @@ class CommandLineInstaller:
         except Exception as e:
             print(f"卸载依赖库时出错: {e}")
     
+    def _confirm_uninstall_impact(self, graph, removing):
+        """显示卸载后会缺少依赖的包，有影响时请用户确认"""
+        impact = graph.impact(removing)
+        if not impact:
+            return True
+        
+        removed = {normalize_name(name) for name in removing}
+        direct = sorted(key for key, causes in impact.items() if removed & set(causes))
+        indirect = sorted(key for key in impact if key not in direct)
+        print(f"\n⚠️ 以下 {len(direct)} 个包依赖将要卸载的包，卸载后可能无法正常使用:")
+        for key in direct[:30]:
+            missing = ", ".join(graph.name(cause) for cause in impact[key] if cause in removed)
+            print(f"- {graph.name(key)}（需要 {missing}）")
+        if len(direct) > 30:
+            print(f"... 共 {len(direct)} 个")
+        if indirect:
+            names = ", ".join(graph.name(key) for key in indirect[:10])
+            more = f" 等 {len(indirect)} 个" if len(indirect) > 10 else ""
+            print(f"另有间接依赖它们的包也可能受影响: {names}{more}")
+        return input("仍要继续卸载吗？ (y/n): ").lower() == "y"
+    
     def install_from_wheel(self):
         """从wheel文件安装依赖库"""
         wheel_path = input("\n请输入wheel文件的路径: ")
         
-        import subprocess
         import os
+        import sys
         
         if not os.path.exists(wheel_path):
             print(f"\n错误: 文件 {wheel_path} 不存在！")
@@ -2484,12 +2629,15 @@ class CommandLineInstaller:
         
         try:
             print(f"\n从wheel文件安装: {wheel_path}...")
-            result = subprocess.run(
-                ["python", "-m", "pip", "install", wheel_path],
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
+            progress = PipProgress()
+            try:
+                result = run_streaming(
+                    [sys.executable, "-m", "pip", "install", wheel_path],
+                    progress.feed,
+                    timeout=60
+                )
+            finally:
+                progress.finish()
             
             if result.returncode == 0:
                 print("\n安装成功！")
@@ -2506,17 +2654,67 @@ class CommandLineInstaller:
         while True:
             print("\n设置菜单")
             print("1. 管理镜像源")
-            print("2. 返回主菜单")
+            print("2. 网络设置与请求统计")
+            print("3. 返回主菜单")
             
-            choice = input("请输入选择 (1-2): ")
+            choice = input("请输入选择 (1-3): ")
             
             if choice == "1":
                 self.manage_mirrors()
             elif choice == "2":
+                self.network_settings()
+            elif choice == "3":
                 break
             else:
                 print("无效选择，请重新输入")
     
+    def network_settings(self):
+        """配置共享HTTP客户端的超时、重试和代理，并显示请求统计"""
+        from app_config import load_settings, save_settings
+        
+        http = get_client()
+        print("\n网络设置")
+        print(f"连接超时: {http.timeout[0]} 秒，读取超时: {http.timeout[1]} 秒")
+        print(f"失败重试次数: {http.retries}")
+        print(f"代理: {http.proxy or '未设置（使用系统环境变量）'}")
+        
+        summary = http.summary()
+        if summary:
+            print("\n本次运行的网络请求统计:")
+            print(f"{'主机':<35} {'请求数':>6} {'失败':>4} {'平均耗时':>9} {'最大耗时':>9} {'数据量':>12}")
+            for host, stats in sorted(summary.items(), key=lambda item: -item[1]["total_time"]):
+                print(f"{host:<35} {stats['count']:>6} {stats['errors']:>4} {stats['avg_time']:>8.2f}s "
+                      f"{stats['max_time']:>8.2f}s {self._format_size(stats['bytes']):>12}")
+        
+        print("\n1. 设置超时时间")
+        print("2. 设置重试次数")
+        print("3. 设置代理（留空清除）")
+        print("4. 返回")
+        choice = input("请输入选择 (1-4): ")
+        
+        settings = load_settings()
+        try:
+            if choice == "1":
+                settings["http_connect_timeout"] = float(input("连接超时 (秒): ").strip())
+                settings["http_read_timeout"] = float(input("读取超时 (秒): ").strip())
+            elif choice == "2":
+                settings["http_retries"] = max(0, int(input("重试次数: ").strip()))
+            elif choice == "3":
+                proxy = input("代理地址 (如 http://127.0.0.1:7890): ").strip()
+                if proxy:
+                    settings["http_proxy"] = proxy
+                else:
+                    settings.pop("http_proxy", None)
+            else:
+                return
+        except ValueError:
+            print("无效的数值")
+            return
+        
+        save_settings(settings)
+        http.configure()
+        print("网络设置已保存")
+    
     def manage_mirrors(self):
         """管理镜像源"""
         print("\n镜像源管理")
@@ -2528,9 +2726,11 @@ class CommandLineInstaller:
             print("3. 添加自定义镜像源")
             print("4. 删除自定义镜像源")
             print("5. 设置默认镜像源")
-            print("6. 返回设置菜单")
+            print("6. 测速并自动选择最快的镜像源")
+            print("7. 启动/停止本地缓存代理")
+            print("8. 返回设置菜单")
             
-            choice = input("请输入选择 (1-6): ")
+            choice = input("请输入选择 (1-8): ")
             
             if choice == "1":
                 self.show_current_mirror()
@@ -2543,6 +2743,10 @@ class CommandLineInstaller:
             elif choice == "5":
                 self.set_default_mirror()
             elif choice == "6":
+                self.benchmark_mirrors()
+            elif choice == "7":
+                self.toggle_index_proxy()
+            elif choice == "8":
                 break
             else:
                 print("无效选择，请重新输入")
@@ -2561,6 +2765,35 @@ class CommandLineInstaller:
             print("\n自定义镜像源:")
             for key, (name, url) in self.custom_mirrors.items():
                 print(f"{key}. {name} - {url}")
+        
+        if self.index_proxy and self.index_proxy.is_running():
+            print(f"\n本地缓存代理: {self.index_proxy.url}")
+            print(f"上游镜像源: {self.index_proxy.upstream_url}")
+    
+    def toggle_index_proxy(self):
+        """启动或停止本地缓存代理"""
+        if self.index_proxy and self.index_proxy.is_running():
+            stats = self.index_proxy.stats
+            self.index_proxy.stop()
+            self.index_proxy = None
+            print("\n本地缓存代理已停止")
+            print(f"命中: {stats['hits']}, 未命中: {stats['misses']}, 共提供 {self._format_size(stats['bytes_served'])}")
+            return
+        
+        upstream_url = self.get_mirror_url(self.default_mirror)
+        try:
+            self.index_proxy = CachingIndexProxy(upstream_url, index_cache=self.index_cache)
+            local_url = self.index_proxy.start()
+        except Exception as e:
+            self.index_proxy = None
+            print(f"\n❌ 启动本地缓存代理失败: {e}")
+            return
+        
+        print("\n✅ 本地缓存代理已启动")
+        print(f"代理地址: {local_url}")
+        print(f"上游镜像源: {self.get_mirror_name(self.default_mirror)} - {upstream_url}")
+        print(f"缓存目录: {self.index_proxy.cache_dir}")
+        print("之后的安装、升级操作将通过代理进行，已下载的文件直接从本地磁盘返回")
     
     def select_builtin_mirror(self):
         """选择内置镜像源"""
@@ -2571,6 +2804,7 @@ class CommandLineInstaller:
         choice = input("请输入选择的镜像源编号: ")
         if choice in self.mirror_sources:
             self.default_mirror = choice
+            self._disable_auto_mirror()
             print(f"\n已设置默认镜像源为: {self.get_mirror_name(choice)}")
         else:
             print("\n无效的选择，请重新输入")
@@ -2623,10 +2857,134 @@ class CommandLineInstaller:
         choice = input("请输入要设置为默认的镜像源编号: ")
         if choice in self.mirror_sources or choice in self.custom_mirrors:
             self.default_mirror = choice
+            self._disable_auto_mirror()
             print(f"\n已设置默认镜像源为: {self.get_mirror_name(choice)}")
         else:
             print("\n无效的选择，请重新输入")
     
+    def benchmark_mirrors(self):
+        """测速所有镜像源并自动选择最快的镜像源"""
+        mirror_urls = self._all_mirror_urls()
+        print(f"\n正在并发测速 {len(mirror_urls)} 个镜像源...")
+        
+        results = self.mirror_probe.probe_all(mirror_urls)
+        print("\n测速结果:")
+        print(format_probe_table(results, self._describe_mirror_url))
+        
+        if not self.mirror_probe.fastest(results):
+            print("\n❌ 所有镜像源均无法访问，请检查网络连接")
+            self.mirror_probe.save(results, auto_select=self.auto_select_mirror)
+            return
+        
+        choice = input("\n是否自动使用最快的镜像源并定期重新测速？ (y/n): ")
+        if choice.lower() == "y":
+            self.auto_select_mirror = True
+            key = self._select_fastest_mirror(results)
+            print(f"\n已设置默认镜像源为: {self.get_mirror_name(key)}")
+            if self._mirror_reprobe_timer is None:
+                self._schedule_mirror_reprobe(self.mirror_probe.reprobe_interval)
+        self.mirror_probe.save(results, auto_select=self.auto_select_mirror)
+    
+    def _create_mirror_failover(self):
+        """创建覆盖所有内置和自定义镜像源的故障转移器"""
+        results, _, _ = self.mirror_probe.load()
+        ranking = [r.url for r in results if not r.error]
+        # 本地缓存代理运行时pip必须先经过代理，否则下载的文件不会被缓存
+        proxy_running = bool(self.index_proxy and self.index_proxy.is_running())
+        return MirrorFailover(
+            self._all_mirror_urls(), preferred=self.get_default_mirror_url(), ranking=ranking, pin_preferred=proxy_running
+        )
+    
+    def _report_mirror_attempts(self, attempts):
+        """显示镜像源故障转移情况"""
+        if len(attempts) <= 1:
+            return
+        for mirror, message in attempts[:-1]:
+            print(f"\n⚠️  镜像源 {self._describe_mirror_url(mirror)} 失败: {message}")
+        print(f"已切换到镜像源: {self._describe_mirror_url(attempts[-1][0])}")
+    
+    def _all_mirror_urls(self):
+        """获取所有内置和自定义镜像源URL"""
+        urls = list(self.mirror_sources.values())
+        urls.extend(url for _, url in self.custom_mirrors.values())
+        return urls
+    
+    def _find_mirror_key(self, url):
+        """根据URL查找镜像源编号"""
+        for key in list(self.mirror_sources) + list(self.custom_mirrors):
+            if self.get_mirror_url(key).rstrip("/") == url.rstrip("/"):
+                return key
+        return None
+    
+    def _describe_mirror_url(self, url):
+        """显示用的镜像源名称和URL"""
+        key = self._find_mirror_key(url)
+        if key:
+            return f"{self.get_mirror_name(key)} - {url}"
+        return url
+    
+    def _select_fastest_mirror(self, results):
+        """将测速结果中最快的镜像源设为默认"""
+        url = self.mirror_probe.fastest(results, self._all_mirror_urls())
+        key = self._find_mirror_key(url) if url else None
+        if key:
+            self.default_mirror = key
+        return key
+    
+    def _apply_saved_mirror_ranking(self):
+        """启动时应用上次的测速结果，过期时在后台重新测速"""
+        import time
+        
+        results, probed_at, auto_select = self.mirror_probe.load()
+        self.auto_select_mirror = auto_select
+        if not auto_select:
+            return
+        
+        self._select_fastest_mirror(results)
+        if self.mirror_probe.is_stale(probed_at):
+            delay = 0
+        else:
+            delay = self.mirror_probe.reprobe_interval - (time.time() - probed_at)
+        self._schedule_mirror_reprobe(delay)
+    
+    def _schedule_mirror_reprobe(self, delay):
+        """在指定秒数后于后台重新测速"""
+        import threading
+        
+        timer = threading.Timer(max(0, delay), self._background_reprobe)
+        timer.daemon = True
+        timer.start()
+        self._mirror_reprobe_timer = timer
+    
+    def _background_reprobe(self):
+        """后台测速并更新默认镜像源"""
+        try:
+            if not self.auto_select_mirror:
+                return
+            results = self.mirror_probe.probe_all(self._all_mirror_urls())
+            if self.auto_select_mirror:
+                self.mirror_probe.save(results, auto_select=True)
+                self._select_fastest_mirror(results)
+        except Exception:
+            pass
+        finally:
+            if self.auto_select_mirror:
+                self._schedule_mirror_reprobe(self.mirror_probe.reprobe_interval)
+            else:
+                self._mirror_reprobe_timer = None
+    
+    def _disable_auto_mirror(self):
+        """用户手动选择镜像源后，停止自动选择"""
+        self.auto_select_mirror = False
+        if self._mirror_reprobe_timer is not None:
+            self._mirror_reprobe_timer.cancel()
+            self._mirror_reprobe_timer = None
+        try:
+            results, probed_at, _ = self.mirror_probe.load()
+            self.mirror_probe.save(results, auto_select=False, probed_at=probed_at)
+        except Exception:
+            pass
+    
     def get_mirror_name(self, key):
         """获取镜像源名称"""
         if key in self.mirror_sources:
@@ -2653,7 +3011,9 @@ class CommandLineInstaller:
         return ""
     
     def get_default_mirror_url(self):
-        """获取默认镜像源URL"""
+        """获取默认镜像源URL（本地缓存代理运行时返回代理地址）"""
+        if self.index_proxy and self.index_proxy.is_running():
+            return self.index_proxy.url
         return self.get_mirror_url(self.default_mirror)
 
 if __name__ == "__main__":
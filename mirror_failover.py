@@ -0,0 +1,140 @@
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from http_client import get_client
+from package_inventory import normalize_name
+from pip_runner import run_streaming
+
+# pip输出中表示镜像源故障（而非包本身问题）的关键字
+MIRROR_ERROR_PATTERNS = [
+    "Retrying (Retry(",
+    "Could not fetch URL",
+    "ReadTimeoutError",
+    "ConnectTimeoutError",
+    "NewConnectionError",
+    "Max retries exceeded",
+    "Read timed out",
+    "Connection reset",
+    "Connection aborted",
+    "ProxyError",
+    "SSLError",
+    "Temporary failure in name resolution",
+    "500 Server Error",
+    "502 Server Error",
+    "503 Server Error",
+    "504 Server Error",
+    "HTTP error 5"
+]
+# 包名拼写错误或包不存在时pip同样输出 "(from versions: none)"，
+# 只有同时出现上面的网络错误时才视为镜像源故障，因此不列入
+
+
+def is_mirror_error(output):
+    """判断pip的失败是否由镜像源故障引起"""
+    return any(pattern in output for pattern in MIRROR_ERROR_PATTERNS)
+
+
+class MirrorFailover:
+    def __init__(self, mirror_urls, preferred=None, ranking=None, hedge_timeout=3, socket_timeout=15, retries=1,
+                 pin_preferred=False):
+        self.mirror_urls = list(dict.fromkeys(url for url in mirror_urls if url))
+        self.preferred = preferred
+        # 为True时首选镜像源（如本地缓存代理）始终最先使用，不参与对冲请求，其余镜像源只作为故障转移目标
+        self.pin_preferred = pin_preferred
+        # 测速排名（最快在前），来自 MirrorProbe
+        self.ranking = ranking or []
+        self.hedge_timeout = hedge_timeout
+        # 传给pip的单次网络超时和重试次数，慢镜像尽快失败并切换
+        self.socket_timeout = socket_timeout
+        self.retries = retries
+
+    def ordered_mirrors(self):
+        """按 默认镜像源 -> 测速排名 -> 其余镜像源 的顺序返回"""
+        known = {url.rstrip("/"): url for url in self.mirror_urls}
+        ordered = []
+        candidates = [self.preferred] + list(self.ranking) + list(self.mirror_urls)
+        for url in candidates:
+            if not url:
+                continue
+            url = known.get(url.rstrip("/"), url)
+            if url not in ordered:
+                ordered.append(url)
+        return ordered
+
+    def hedge_select(self, mirrors, project="pip"):
+        """同时向最快的两个镜像源请求项目页面，优先使用先成功响应的镜像源"""
+        if len(mirrors) < 2:
+            return mirrors
+
+        pair = mirrors[:2]
+        # 使用共享的连接池、代理和请求统计
+        session = get_client().session
+
+        def probe(url):
+            response = session.get(
+                f"{url.rstrip('/')}/{normalize_name(project)}/",
+                timeout=self.hedge_timeout
+            )
+            if response.status_code >= 500:
+                raise RuntimeError(f"HTTP {response.status_code}")
+            return url
+
+        executor = ThreadPoolExecutor(max_workers=2)
+        try:
+            pending = {executor.submit(probe, url) for url in pair}
+            while pending:
+                done, pending = wait(pending, timeout=self.hedge_timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    if future.exception() is None:
+                        winner = future.result()
+                        return [winner] + [url for url in mirrors if url != winner]
+        finally:
+            # 不等待较慢的请求
+            executor.shutdown(wait=False)
+        return mirrors
+
+    def is_mirror_error(self, output):
+        """判断pip的失败是否由镜像源故障引起"""
+        return is_mirror_error(output)
+
+    def run_pip(self, cmd, project="pip", timeout=60, hedge=True, line_callback=None):
+        """依次尝试各镜像源运行pip命令（cmd中不要包含 -i 参数）
+
+        pip输出以流式读取并写入日志，line_callback 不为None时实时逐行回调（用于显示进度）
+        返回 (result, attempts)：result 为最后一次的 CompletedProcess，
+        attempts 为 [(镜像源, 错误信息或None), ...]
+        """
+        mirrors = self.ordered_mirrors()
+        if hedge and not (self.pin_preferred and self.preferred):
+            mirrors = self.hedge_select(mirrors, project)
+
+        attempts = []
+        result = None
+        for mirror in mirrors:
+            full_cmd = list(cmd) + [
+                "-i", mirror,
+                "--timeout", str(self.socket_timeout),
+                "--retries", str(self.retries)
+            ]
+            try:
+                result = run_streaming(full_cmd, line_callback, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                attempts.append((mirror, f"超时（{timeout} 秒）"))
+                continue
+
+            if result.returncode == 0:
+                attempts.append((mirror, None))
+                return result, attempts
+
+            output = (result.stderr or "") + (result.stdout or "")
+            if not self.is_mirror_error(output):
+                # 与镜像源无关的错误（如版本不存在），换镜像源也无济于事
+                attempts.append((mirror, result.stderr.strip()[-200:]))
+                return result, attempts
+            attempts.append((mirror, "镜像源连接失败或响应过慢"))
+
+        if result is None:
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        return result, attempts
@@ -0,0 +1,137 @@
+import os
+import time
+import http.client
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from app_config import get_data_dir, load_json, save_json
+
+# 单个镜像源的测速结果（时间单位: 秒，吞吐量单位: 字节/秒）
+ProbeResult = namedtuple(
+    "ProbeResult",
+    ["url", "connect_time", "ttfb", "throughput", "total_time", "size", "error"]
+)
+
+
+class MirrorProbe:
+    def __init__(self, probe_path="six/", timeout=5, max_workers=8, reprobe_interval=24 * 3600, results_path=None):
+        # 测速使用一个体积很小、所有镜像都有的项目页面
+        self.probe_path = probe_path
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.reprobe_interval = reprobe_interval
+        self.results_path = results_path or os.path.join(get_data_dir(), "mirror_probe.json")
+
+    def probe_url(self, mirror_url):
+        """测量单个镜像源的连接时间、首字节时间和吞吐量"""
+        url = mirror_url.rstrip("/") + "/" + self.probe_path
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        if parts.scheme == "https":
+            conn_class = http.client.HTTPSConnection
+        else:
+            conn_class = http.client.HTTPConnection
+
+        conn = conn_class(parts.hostname, parts.port, timeout=self.timeout)
+        try:
+            start_time = time.perf_counter()
+            conn.connect()
+            connected = time.perf_counter()
+
+            conn.request("GET", path, headers={"Accept": "text/html", "User-Agent": "PyPi-Manager"})
+            response = conn.getresponse()
+            first_byte = time.perf_counter()
+            body = response.read()
+            finished = time.perf_counter()
+
+            if response.status >= 400:
+                return self._failed(mirror_url, f"HTTP {response.status}")
+
+            transfer_time = max(finished - first_byte, 1e-6)
+            return ProbeResult(
+                url=mirror_url,
+                connect_time=connected - start_time,
+                ttfb=first_byte - connected,
+                throughput=len(body) / transfer_time,
+                total_time=finished - start_time,
+                size=len(body),
+                error=None
+            )
+        except Exception as e:
+            return self._failed(mirror_url, str(e) or e.__class__.__name__)
+        finally:
+            conn.close()
+
+    def _failed(self, mirror_url, error):
+        return ProbeResult(mirror_url, None, None, None, None, 0, error)
+
+    def probe_all(self, mirror_urls):
+        """并发测速所有镜像源，按总耗时从快到慢排序（失败的排在最后）"""
+        urls = list(dict.fromkeys(mirror_urls))
+        if not urls:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls))) as executor:
+            results = list(executor.map(self.probe_url, urls))
+        return self.rank(results)
+
+    def rank(self, results):
+        """按总耗时排序"""
+        return sorted(
+            results,
+            key=lambda r: (r.error is not None, r.total_time if r.total_time is not None else 0)
+        )
+
+    def save(self, results, auto_select=True, probed_at=None):
+        """保存测速结果"""
+        data = {
+            "probed_at": probed_at or time.time(),
+            "auto_select": auto_select,
+            "results": [r._asdict() for r in results]
+        }
+        save_json(self.results_path, data)
+
+    def load(self):
+        """读取上次的测速结果，返回 (results, probed_at, auto_select)"""
+        data = load_json(self.results_path, {})
+        results = []
+        for item in data.get("results", []):
+            try:
+                results.append(ProbeResult(**item))
+            except TypeError:
+                continue
+        return results, data.get("probed_at", 0), data.get("auto_select", True)
+
+    def is_stale(self, probed_at):
+        """测速结果是否已过期，需要重新测速"""
+        return time.time() - probed_at >= self.reprobe_interval
+
+    def fastest(self, results, candidates=None):
+        """返回可用的最快镜像源URL，candidates用于限定范围"""
+        allowed = None
+        if candidates is not None:
+            allowed = {url.rstrip("/") for url in candidates}
+        for result in results:
+            if result.error:
+                continue
+            if allowed is None or result.url.rstrip("/") in allowed:
+                return result.url
+        return None
+
+
+def format_probe_table(results, name_lookup=None):
+    """将测速结果格式化为表格文本"""
+    lines = [f"{'排名':<4} {'连接':>8} {'首字节':>8} {'吞吐量':>12}  镜像源"]
+    for i, r in enumerate(results, 1):
+        name = name_lookup(r.url) if name_lookup else r.url
+        if r.error:
+            lines.append(f"{i:<4} {'-':>8} {'-':>8} {'-':>12}  {name} ❌ {r.error[:60]}")
+        else:
+            lines.append(
+                f"{i:<4} {r.connect_time * 1000:>6.0f}ms {r.ttfb * 1000:>6.0f}ms "
+                f"{r.throughput / 1024:>8.1f}KB/s  {name}"
+            )
+    return "\n".join(lines)
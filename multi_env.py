@@ -0,0 +1,233 @@
+import os
+import time
+import hashlib
+import multiprocessing
+from collections import namedtuple, Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from app_config import get_data_dir
+from venv_discovery import env_python
+
+# 单个环境的执行结果
+EnvResult = namedtuple("EnvResult", ["env", "operation", "success", "data", "error", "elapsed", "log_path"])
+
+OPERATION_NAMES = {
+    "inventory": "已安装包清单",
+    "outdated": "检查可更新的包",
+    "upgrade": "升级可更新的包",
+    "export": "导出包列表"
+}
+
+DEFAULT_MAX_WORKERS = 4
+
+
+def env_log_path(env_path):
+    """每个环境单独的pip日志，避免多个进程同时滚动同一个日志文件"""
+    env_path = os.path.abspath(env_path)
+    digest = hashlib.sha1(os.path.normcase(env_path).encode("utf-8")).hexdigest()[:8]
+    name = os.path.basename(env_path.rstrip(os.sep)) or "env"
+    return os.path.join(get_data_dir("logs", "envs"), f"{name}-{digest}.log")
+
+
+# 以下任务函数在子进程中执行，必须定义在模块顶层才能被pickle
+
+def _inventory_task(python_path, env_path):
+    from package_inventory import PackageInventory
+
+    packages = PackageInventory(python_path).list_packages()
+    return [(p.name, p.version) for p in packages]
+
+
+def _outdated_task(python_path, env_path, mirror_url=None):
+    from outdated_checker import OutdatedChecker
+    from index_cache import IndexCache
+
+    # 磁盘缓存原子写入，多个进程共享同一份索引缓存
+    checker = OutdatedChecker(mirror_url, python_path=python_path, cache=IndexCache())
+    outdated, errors = checker.check()
+    return {"outdated": sorted(outdated, key=lambda p: p.name.lower()), "errors": errors}
+
+
+def _upgrade_task(python_path, env_path, mirror_url=None, packages=None):
+    from batch_upgrader import BatchUpgrader
+
+    errors = {}
+    if packages is None:
+        checked = _outdated_task(python_path, env_path, mirror_url)
+        packages = [p.name for p in checked["outdated"]]
+        errors = checked["errors"]
+    results = BatchUpgrader(python_path, mirror_url).upgrade(packages) if packages else []
+    return {"results": results, "errors": errors}
+
+
+def _export_task(python_path, env_path, output_dir=None):
+    from package_inventory import PackageInventory
+
+    inventory = PackageInventory(python_path)
+    packages = inventory.list_packages()
+    output_dir = output_dir or os.getcwd()
+    os.makedirs(output_dir, exist_ok=True)
+    name = os.path.basename(os.path.abspath(env_path).rstrip(os.sep)) or "env"
+    output_path = os.path.join(output_dir, f"requirements-{name}.txt")
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(inventory.to_freeze(packages))
+    return {"path": output_path, "count": len(packages)}
+
+
+TASKS = {
+    "inventory": _inventory_task,
+    "outdated": _outdated_task,
+    "upgrade": _upgrade_task,
+    "export": _export_task
+}
+
+
+def _run_task(operation, env_path, options):
+    """在子进程中对单个环境执行操作，所有异常都转换为失败结果"""
+    from pip_runner import PipRunner, set_runner
+
+    start_time = time.time()
+    log_path = env_log_path(env_path)
+    python_path = env_python(env_path)
+    if python_path is None:
+        return EnvResult(env_path, operation, False, None, "未找到虚拟环境的解释器", 0.0, None)
+
+    try:
+        set_runner(PipRunner(log_path=log_path))
+        data = TASKS[operation](python_path, env_path, **options)
+        return EnvResult(env_path, operation, True, data, None, time.time() - start_time, log_path)
+    except Exception as e:
+        return EnvResult(env_path, operation, False, None, f"{type(e).__name__}: {e}",
+                         time.time() - start_time, log_path)
+
+
+class MultiEnvExecutor:
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or min(DEFAULT_MAX_WORKERS, os.cpu_count() or 1)
+
+    def run(self, operation, env_paths, progress_callback=None, **options):
+        """在多个环境中并发执行操作，返回与 env_paths 顺序一致的 EnvResult 列表
+
+        operation 为 inventory/outdated/upgrade/export 之一，options 传给对应的任务函数
+        （如 mirror_url、packages、output_dir）。单个环境出错不影响其他环境
+        """
+        if operation not in TASKS:
+            raise ValueError(f"未知的操作: {operation}")
+
+        results = {}
+        broken = self._run_pool(operation, env_paths, options, results, progress_callback,
+                                min(self.max_workers, len(env_paths)) or 1)
+
+        # 子进程异常退出会导致整个进程池失效，逐个重新执行受影响的环境，找出真正出错的环境
+        for env_path in broken:
+            self._run_pool(operation, [env_path], options, results, progress_callback, 1,
+                           retry=True)
+
+        return [results[env_path] for env_path in env_paths]
+
+    def _run_pool(self, operation, env_paths, options, results, progress_callback, workers, retry=False):
+        """返回因进程池失效而未完成的环境列表"""
+        broken = []
+        # 统一使用spawn启动子进程：与Windows行为一致，且不会继承父进程的连接池和锁
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = {
+                executor.submit(_run_task, operation, env_path, options): env_path
+                for env_path in env_paths
+            }
+            for future in as_completed(futures):
+                env_path = futures[future]
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    if not retry:
+                        broken.append(env_path)
+                        continue
+                    result = EnvResult(env_path, operation, False, None, "子进程异常退出", 0.0,
+                                       env_log_path(env_path))
+                except Exception as e:
+                    result = EnvResult(env_path, operation, False, None, f"{type(e).__name__}: {e}", 0.0,
+                                       env_log_path(env_path))
+                results[env_path] = result
+                if progress_callback:
+                    progress_callback(len(results), result)
+        return broken
+
+
+def _summarize(result):
+    """单个环境结果的一行摘要"""
+    data = result.data
+    if result.operation == "inventory":
+        return f"{len(data)} 个包"
+    if result.operation == "outdated":
+        text = f"{len(data['outdated'])} 个可更新"
+        if data["errors"]:
+            text += f"，{len(data['errors'])} 个检查失败"
+        return text
+    if result.operation == "upgrade":
+        succeeded = sum(1 for r in data["results"] if r.success and r.changed)
+        unchanged = sum(1 for r in data["results"] if r.success and not r.changed)
+        failed = len(data["results"]) - succeeded - unchanged
+        if not data["results"]:
+            return "没有需要升级的包"
+        text = f"升级成功 {succeeded} 个，失败 {failed} 个"
+        if unchanged:
+            text += f"，版本未变化 {unchanged} 个"
+        return text
+    if result.operation == "export":
+        return f"{data['count']} 个包 -> {data['path']}"
+    return ""
+
+
+def format_report(results):
+    """生成多环境操作的汇总报告"""
+    if not results:
+        return "没有执行任何操作"
+
+    operation = results[0].operation
+    lines = [f"多环境操作报告: {OPERATION_NAMES.get(operation, operation)}", "-" * 60]
+    name_width = max(len(os.path.basename(r.env.rstrip(os.sep)) or r.env) for r in results)
+
+    for result in results:
+        name = os.path.basename(result.env.rstrip(os.sep)) or result.env
+        if result.success:
+            lines.append(f"✅ {name.ljust(name_width)}  {result.elapsed:6.1f}s  {_summarize(result)}")
+        else:
+            lines.append(f"❌ {name.ljust(name_width)}  {result.elapsed:6.1f}s  {result.error}")
+
+    # 各操作的明细
+    for result in results:
+        if not result.success:
+            continue
+        name = os.path.basename(result.env.rstrip(os.sep)) or result.env
+        if operation == "outdated" and result.data["outdated"]:
+            lines.append(f"\n[{name}]")
+            for row in result.data["outdated"]:
+                lines.append(f"  {row.name} {row.installed} -> {row.latest}")
+        elif operation == "upgrade":
+            failed = [r for r in result.data["results"] if not r.success]
+            if failed:
+                lines.append(f"\n[{name}] 升级失败的包:")
+                for row in failed:
+                    lines.append(f"  {row.name}: {row.message}")
+
+    # 在多个环境中都需要更新的包
+    if operation == "outdated":
+        counter = Counter(
+            row.name.lower() for r in results if r.success for row in r.data["outdated"]
+        )
+        common = [(name, count) for name, count in counter.most_common() if count > 1]
+        if common:
+            lines.append("\n多个环境中都可更新的包:")
+            for name, count in common[:20]:
+                lines.append(f"  {name}: {count} 个环境")
+
+    succeeded = sum(1 for r in results if r.success)
+    lines.append("-" * 60)
+    lines.append(f"共 {len(results)} 个环境，成功 {succeeded} 个，失败 {len(results) - succeeded} 个")
+    failed_logs = [r.log_path for r in results if not r.success and r.log_path and os.path.exists(r.log_path)]
+    if failed_logs:
+        lines.append("失败环境的pip日志:")
+        lines.extend(f"  {path}" for path in failed_logs)
+    return "\n".join(lines)
@@ -0,0 +1,60 @@
+from collections import namedtuple
+
+from package_inventory import PackageInventory
+from version_lookup import VersionLookup, latest_version
+from version_utils import parse_version, is_prerelease
+
+# 可更新包记录
+OutdatedPackage = namedtuple("OutdatedPackage", ["name", "installed", "latest"])
+
+
+class OutdatedChecker:
+    def __init__(self, mirror_url, python_path=None, max_workers=16, timeout=15, cache=None):
+        self.mirror_url = mirror_url
+        self.python_path = python_path
+
+        # 批量版本查询使用共享HTTP客户端的连接池，保证连接复用
+        self.lookup = VersionLookup(mirror_url, cache=cache, max_workers=max_workers, timeout=timeout)
+
+    def check(self, packages=None, progress_callback=None):
+        """并发检查可更新的包
+
+        返回 (outdated, errors)：outdated 为 OutdatedPackage 列表，
+        errors 为 {包名: 错误信息}
+        """
+        if packages is None:
+            packages = PackageInventory(self.python_path).list_packages()
+
+        versions = self.lookup.lookup([p.name for p in packages], progress_callback)
+        outdated = []
+        errors = {}
+        for package in packages:
+            info = versions[package.name]
+            if info.error:
+                errors[package.name] = info.error
+                continue
+            installed_key = parse_version(package.version)
+            if installed_key is None or not info.versions:
+                continue
+            # 已安装预发布版本时才考虑预发布版本
+            latest = latest_version(info, include_prereleases=is_prerelease(package.version))
+            if parse_version(latest) > installed_key:
+                outdated.append(OutdatedPackage(package.name, package.version, latest))
+
+        outdated.sort(key=lambda row: row.name.lower())
+        return outdated, errors
+
+
+def format_outdated_table(rows):
+    """将可更新包格式化为表格文本"""
+    headers = ("Package", "Version", "Latest")
+    widths = [len(h) for h in headers]
+    for row in rows:
+        for i, value in enumerate(row):
+            widths[i] = max(widths[i], len(value))
+
+    lines = [" ".join(h.ljust(w) for h, w in zip(headers, widths))]
+    lines.append(" ".join("-" * w for w in widths))
+    for row in rows:
+        lines.append(" ".join(value.ljust(w) for value, w in zip(row, widths)))
+    return "\n".join(lines)
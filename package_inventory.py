@@ -0,0 +1,193 @@
+import os
+import re
+import sys
+import json
+import subprocess
+from collections import namedtuple
+
+# 已安装包记录
+InstalledPackage = namedtuple(
+    "InstalledPackage",
+    ["name", "version", "location", "installer", "requires", "requested"]
+)
+
+# 依赖声明开头的项目名，如 "urllib3<3,>=1.21.1" 中的 urllib3
+REQUIREMENT_NAME_PATTERN = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+
+
+def normalize_name(name):
+    """按照PEP 503规范化包名"""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def requirement_name(requirement):
+    """从Requires-Dist依赖声明中提取规范化的项目名，无法解析时返回None"""
+    match = REQUIREMENT_NAME_PATTERN.match(requirement)
+    return normalize_name(match.group(1)) if match else None
+
+
+class PackageInventory:
+    def __init__(self, python_path=None):
+        self.python_path = python_path or sys.executable
+        self._site_paths = None
+
+    def get_site_paths(self):
+        """获取目标解释器的模块搜索路径"""
+        if self._site_paths is not None:
+            return self._site_paths
+
+        if os.path.normcase(os.path.abspath(self.python_path)) == os.path.normcase(os.path.abspath(sys.executable)):
+            # 当前解释器直接使用sys.path
+            paths = [p for p in sys.path if p]
+        else:
+            # 其他解释器只需启动一次Python（不导入pip）获取sys.path
+            result = subprocess.run(
+                [self.python_path, "-c", "import json, sys; print(json.dumps(sys.path[1:]))"],
+                capture_output=True,
+                text=True,
+                timeout=30
+            )
+            if result.returncode != 0:
+                raise RuntimeError(f"无法读取解释器路径: {result.stderr.strip()}")
+            paths = [p for p in json.loads(result.stdout) if p]
+
+        # 去重并只保留存在的目录
+        seen = set()
+        self._site_paths = []
+        for path in paths:
+            key = os.path.normcase(os.path.abspath(path))
+            if key not in seen and os.path.isdir(path):
+                seen.add(key)
+                self._site_paths.append(path)
+        return self._site_paths
+
+    def list_packages(self):
+        """扫描元数据目录，返回已安装包列表（按名称排序）"""
+        packages = {}
+        for site_path in self.get_site_paths():
+            try:
+                entries = os.scandir(site_path)
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    if not entry.name.endswith((".dist-info", ".egg-info")):
+                        continue
+                    package = self._read_distribution(entry, site_path)
+                    if package is None:
+                        continue
+                    # 与导入系统一致：路径靠前的同名包优先
+                    key = normalize_name(package.name)
+                    if key not in packages:
+                        packages[key] = package
+        return sorted(packages.values(), key=lambda p: p.name.lower())
+
+    def get_package(self, name):
+        """按名称查找已安装包，未安装时返回None"""
+        key = normalize_name(name)
+        for package in self.list_packages():
+            if normalize_name(package.name) == key:
+                return package
+        return None
+
+    def to_freeze(self, packages=None):
+        """生成 name==version 格式的文本"""
+        if packages is None:
+            packages = self.list_packages()
+        return "".join(f"{p.name}=={p.version}\n" for p in packages)
+
+    def _read_distribution(self, entry, site_path):
+        """读取单个dist-info/egg-info的元数据"""
+        installer = ""
+        requires = []
+        # 无法判断时视为用户主动安装的包
+        requested = True
+
+        if entry.name.endswith(".dist-info"):
+            metadata_path = os.path.join(entry.path, "METADATA")
+            installer_path = os.path.join(entry.path, "INSTALLER")
+            if os.path.exists(installer_path):
+                try:
+                    with open(installer_path, "r", encoding="utf-8") as f:
+                        installer = f.read().strip()
+                except OSError:
+                    pass
+            # pip只为用户直接指定安装的包写入REQUESTED文件，作为依赖安装的包没有此文件
+            if installer in ("pip", "uv"):
+                requested = os.path.exists(os.path.join(entry.path, "REQUESTED"))
+        elif entry.is_dir():
+            metadata_path = os.path.join(entry.path, "PKG-INFO")
+            requires = self._read_egg_requires(os.path.join(entry.path, "requires.txt"))
+        else:
+            # 旧版distutils生成的单文件egg-info
+            metadata_path = entry.path
+
+        headers = self._read_metadata_headers(metadata_path)
+        name = headers.get("Name", [""])[0]
+        version = headers.get("Version", [""])[0]
+
+        # 元数据缺失时从目录名推断
+        if not name or not version:
+            stem = entry.name.rsplit(".", 1)[0]
+            parts = stem.split("-")
+            if len(parts) < 2:
+                return None
+            name = name or parts[0]
+            version = version or parts[1]
+
+        if "Requires-Dist" in headers:
+            requires = headers["Requires-Dist"]
+
+        return InstalledPackage(
+            name=name,
+            version=version,
+            location=site_path,
+            installer=installer,
+            requires=tuple(requires),
+            requested=requested
+        )
+
+    def _read_metadata_headers(self, path):
+        """只读取元数据头部（遇到空行即停止，跳过长描述）"""
+        headers = {}
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    line = line.rstrip("\r\n")
+                    if not line:
+                        break
+                    if line[0] in " \t" or ":" not in line:
+                        continue
+                    key, value = line.split(":", 1)
+                    headers.setdefault(key.strip(), []).append(value.strip())
+        except OSError:
+            pass
+        return headers
+
+    def _read_egg_requires(self, path):
+        """读取egg-info的requires.txt（只保留无条件依赖）"""
+        requires = []
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    line = line.strip()
+                    if line.startswith("["):
+                        # 后续均为extras或带条件的依赖
+                        break
+                    if line and not line.startswith("#"):
+                        requires.append(line)
+        except OSError:
+            pass
+        return requires
+
+
+if __name__ == "__main__":
+    import time
+
+    start_time = time.time()
+    inventory = PackageInventory()
+    packages = inventory.list_packages()
+    elapsed = (time.time() - start_time) * 1000
+    for package in packages:
+        print(f"{package.name:<30} {package.version:<15} {package.installer}")
+    print(f"\n共 {len(packages)} 个包，用时 {elapsed:.1f} 毫秒")
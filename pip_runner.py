@@ -0,0 +1,216 @@
+import os
+import time
+import queue
+import logging
+import threading
+import subprocess
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+from app_config import get_data_dir
+from package_inventory import normalize_name
+
+
+class PipStream:
+    """一次命令运行的输出流"""
+
+    def __init__(self, logger, cmd, timeout=None):
+        self._logger = logger
+        self.cmd = cmd
+        self.timeout = timeout
+        self.returncode = None
+
+    def __iter__(self):
+        cmd = self.cmd
+        timeout = self.timeout
+        self._logger.info("$ %s", subprocess.list2cmdline([str(part) for part in cmd]))
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1
+        )
+        lines = queue.Queue()
+
+        def reader(pipe, name):
+            for line in iter(pipe.readline, ""):
+                lines.put((name, line))
+            pipe.close()
+            lines.put((name, None))
+
+        for name, pipe in (("stdout", process.stdout), ("stderr", process.stderr)):
+            thread = threading.Thread(target=reader, args=(pipe, name))
+            thread.daemon = True
+            thread.start()
+
+        deadline = time.time() + timeout if timeout else None
+        open_pipes = 2
+        try:
+            while open_pipes:
+                remaining = deadline - time.time() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    raise subprocess.TimeoutExpired(cmd, timeout)
+                try:
+                    name, line = lines.get(timeout=remaining)
+                except queue.Empty:
+                    raise subprocess.TimeoutExpired(cmd, timeout)
+                if line is None:
+                    open_pipes -= 1
+                    continue
+                self._logger.info("[%s] %s", name, line.rstrip())
+                yield name, line
+
+            remaining = deadline - time.time() if deadline else None
+            self.returncode = process.wait(timeout=max(remaining, 0) if remaining is not None else None)
+            self._logger.info("exit code %s", self.returncode)
+        except subprocess.TimeoutExpired:
+            self._logger.info("timeout after %s seconds", timeout)
+            raise
+        finally:
+            # 超时或调用方提前停止读取时结束进程
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+
+class PipRunner:
+    def __init__(self, log_path=None, max_log_bytes=5 * 1024 * 1024, backup_count=3, tail_lines=200):
+        self.log_path = log_path or os.path.join(get_data_dir("logs"), "pip.log")
+        # 内存中只保留输出的最后若干行，用于错误诊断
+        self.tail_lines = tail_lines
+
+        self.logger = logging.getLogger(f"pypi_manager.pip.{self.log_path}")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        if not self.logger.handlers:
+            handler = RotatingFileHandler(self.log_path, maxBytes=max_log_bytes,
+                                          backupCount=backup_count, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self.logger.addHandler(handler)
+
+    def stream(self, cmd, timeout=None):
+        """运行命令，返回可迭代的 PipStream，逐行产生 (来源, 行)，来源为 "stdout" 或 "stderr"
+
+        输出同时写入滚动日志文件。迭代结束后可通过 returncode 属性获取退出码；
+        超时时终止进程并抛出 subprocess.TimeoutExpired
+        """
+        return PipStream(self.logger, cmd, timeout)
+
+    def run(self, cmd, line_callback=None, timeout=None):
+        """运行命令并逐行回调输出，返回 CompletedProcess
+
+        stdout/stderr 只包含最后 tail_lines 行，完整输出见日志文件
+        """
+        tails = {"stdout": deque(maxlen=self.tail_lines), "stderr": deque(maxlen=self.tail_lines)}
+        output = self.stream(cmd, timeout)
+        for name, line in output:
+            tails[name].append(line)
+            if line_callback:
+                line_callback(line)
+        return subprocess.CompletedProcess(
+            cmd, output.returncode, "".join(tails["stdout"]), "".join(tails["stderr"])
+        )
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner():
+    """获取共享的pip运行器（日志写入程序数据目录下的 logs/pip.log）"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = PipRunner()
+        return _runner
+
+
+def set_runner(runner):
+    """替换共享的pip运行器（如子进程中使用单独的日志文件）"""
+    global _runner
+    with _runner_lock:
+        _runner = runner
+
+
+def run_streaming(cmd, line_callback=None, timeout=None):
+    """流式运行命令，见 PipRunner.run"""
+    return get_runner().run(cmd, line_callback, timeout)
+
+
+def summarize_pip_error(message, package=None):
+    """从pip错误输出中提取一行错误，指定 package 时优先选择提到该包的行"""
+    lines = [line.strip() for line in message.splitlines() if line.strip()]
+    if package:
+        for line in lines:
+            if line.startswith("ERROR") and normalize_name(package) in normalize_name(line):
+                return line
+    for line in lines:
+        if line.startswith("ERROR"):
+            return line
+    return lines[-1] if lines else "未知错误"
+
+
+class SplitRetry:
+    """对一组包运行一次pip命令，整组失败时拆成两半分别重试，以定位出错的包
+
+    超时或 fatal_error 返回错误说明（如镜像源故障）时拆分也无济于事，整组记为失败；
+    pip调用次数达到 max_invocations 后剩余的组也整组记为失败
+    """
+
+    def __init__(self, build_command, timeout_for, fatal_error=None, max_invocations=20):
+        # build_command(包列表) -> 命令；timeout_for(包列表) -> 超时秒数；
+        # fatal_error(错误输出) -> 不再拆分时的错误说明，可以拆分时返回None
+        self.build_command = build_command
+        self.timeout_for = timeout_for
+        self.fatal_error = fatal_error
+        self.max_invocations = max_invocations
+        self.invocations = 0
+
+    def run(self, packages, status_callback=None, line_callback=None):
+        """返回 {规范化包名: 错误信息}，成功的包不在其中
+
+        status_callback(包列表) 在每次调用pip前回调，line_callback 实时逐行回调pip的输出
+        """
+        self.invocations = 0
+        failures = {}
+        pending = [list(packages)]
+        # 深度优先，与递归拆分的顺序一致（先处理前一半）
+        while pending:
+            chunk = pending.pop()
+            if not chunk:
+                continue
+            message, splittable = self._run_chunk(chunk, status_callback, line_callback)
+            if message is None:
+                continue
+            if not splittable:
+                for name in chunk:
+                    failures[normalize_name(name)] = message
+            elif len(chunk) == 1:
+                failures[normalize_name(chunk[0])] = summarize_pip_error(message, chunk[0])
+            else:
+                middle = len(chunk) // 2
+                pending.append(chunk[middle:])
+                pending.append(chunk[:middle])
+        return failures
+
+    def _run_chunk(self, chunk, status_callback, line_callback):
+        """运行一次pip，返回 (错误信息, 是否可以拆分重试)，成功时错误信息为None"""
+        if self.invocations >= self.max_invocations:
+            return f"pip调用次数已达上限（{self.max_invocations} 次），未再单独重试", False
+
+        if status_callback:
+            status_callback(chunk)
+        self.invocations += 1
+        timeout = self.timeout_for(chunk)
+        try:
+            result = run_streaming(self.build_command(chunk), line_callback, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return f"超时（{timeout} 秒）", False
+        if result.returncode == 0:
+            return None, False
+        message = result.stderr.strip()
+        fatal = self.fatal_error(message) if self.fatal_error else None
+        if fatal:
+            return fatal, False
+        return message, True
@@ -0,0 +1,170 @@
+import re
+import sys
+import threading
+
+# pip输出中的阶段标志
+COLLECTING_PATTERN = re.compile(r"^Collecting (\S+)")
+DOWNLOADING_PATTERN = re.compile(r"^\s*Downloading (\S+)(?: \(([\d.]+) (B|kB|MB|GB)\))?")
+CACHED_PATTERN = re.compile(r"^\s*Using cached (\S+)")
+BAR_PATTERN = re.compile(r"([\d.]+)/([\d.]+) (B|kB|MB|GB)")
+SATISFIED_PATTERN = re.compile(r"^Requirement already satisfied: (\S+)")
+INSTALLING_PATTERN = re.compile(r"^Installing collected packages: (.+)")
+UNINSTALLING_PATTERN = re.compile(r"^\s*Uninstalling (\S+):")
+UNINSTALLED_PATTERN = re.compile(r"^\s*Successfully uninstalled (\S+)")
+BUILDING_PATTERN = re.compile(r"^\s*Building wheel for (\S+)")
+
+UNITS = {"B": 1, "kB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3}
+
+
+def _format_bytes(size):
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+class PipProgress:
+    """根据pip的实时输出显示真实的阶段、包数量和下载字节数
+
+    只在收到输出行时刷新显示，不使用定时器，不会给已完成的操作增加任何等待时间
+    """
+
+    def __init__(self, stream=None, total=None):
+        self.stream = stream or sys.stdout
+        # 预计处理的包数量（如批量卸载的包数），未知时为None
+        self.total = total
+        self.phase = "启动pip"
+        self.current = ""
+        self.collected = 0
+        self.satisfied = 0
+        self.downloads = 0
+        self.cached = 0
+        self.bytes_total = 0
+        self.bytes_done = 0
+        self.installing = []
+        self.uninstalled = 0
+        self._pending_bytes = 0
+        self._width = 0
+        self._lock = threading.Lock()
+
+    def feed(self, line):
+        """处理一行pip输出"""
+        line = line.rstrip()
+        if not line:
+            return
+        with self._lock:
+            self._parse(line)
+            self._render()
+
+    def _parse(self, line):
+        match = COLLECTING_PATTERN.match(line)
+        if match:
+            self._finish_download()
+            self.phase = "解析依赖"
+            self.current = match.group(1)
+            self.collected += 1
+            return
+
+        match = DOWNLOADING_PATTERN.match(line)
+        if match:
+            self._finish_download()
+            self.phase = "下载"
+            self.current = match.group(1).rsplit("/", 1)[-1]
+            self.downloads += 1
+            if match.group(2):
+                self._pending_bytes = int(float(match.group(2)) * UNITS[match.group(3)])
+                self.bytes_total += self._pending_bytes
+            return
+
+        match = BAR_PATTERN.search(line)
+        if match and self.phase == "下载":
+            # 下载完成时pip输出的进度条，如 240.6/240.6 kB
+            done = int(float(match.group(1)) * UNITS[match.group(3)])
+            total = int(float(match.group(2)) * UNITS[match.group(3)])
+            if done >= total:
+                self._finish_download()
+            return
+
+        match = CACHED_PATTERN.match(line)
+        if match:
+            self._finish_download()
+            self.current = match.group(1).rsplit("/", 1)[-1]
+            self.cached += 1
+            return
+
+        match = SATISFIED_PATTERN.match(line)
+        if match:
+            self.phase = "检查已安装版本"
+            self.current = match.group(1)
+            self.satisfied += 1
+            return
+
+        match = BUILDING_PATTERN.match(line)
+        if match:
+            self._finish_download()
+            self.phase = "构建"
+            self.current = match.group(1)
+            return
+
+        match = INSTALLING_PATTERN.match(line)
+        if match:
+            self._finish_download()
+            self.phase = "安装"
+            self.installing = [name.strip() for name in match.group(1).split(",")]
+            self.current = ", ".join(self.installing[:3]) + ("..." if len(self.installing) > 3 else "")
+            return
+
+        match = UNINSTALLING_PATTERN.match(line)
+        if match:
+            self.phase = "卸载"
+            self.current = match.group(1).rstrip(":")
+            return
+
+        match = UNINSTALLED_PATTERN.match(line)
+        if match:
+            self.uninstalled += 1
+            self.current = match.group(1)
+            return
+
+        if line.startswith("Successfully installed"):
+            self.phase = "完成"
+            self.current = ""
+
+    def _finish_download(self):
+        """上一个文件下载结束，计入已下载字节数"""
+        if self._pending_bytes:
+            self.bytes_done += self._pending_bytes
+            self._pending_bytes = 0
+
+    def _render(self):
+        parts = [f"[{self.phase}]"]
+        if self.collected:
+            parts.append(f"已解析 {self.collected} 个包")
+        if self.downloads:
+            parts.append(f"下载 {self.downloads} 个文件 {_format_bytes(self.bytes_done)}/{_format_bytes(self.bytes_total)}")
+        if self.cached:
+            parts.append(f"缓存 {self.cached} 个")
+        if self.installing:
+            parts.append(f"安装 {len(self.installing)} 个包")
+        if self.uninstalled or self.phase == "卸载":
+            total = f"/{self.total}" if self.total else ""
+            parts.append(f"已卸载 {self.uninstalled}{total}")
+        if self.current:
+            parts.append(self.current[:40])
+        text = " ".join(parts)
+        # 用空格覆盖上一次更长的输出
+        padding = " " * max(0, self._width - len(text))
+        self._width = len(text)
+        self.stream.write(f"\r{text}{padding}")
+        self.stream.flush()
+
+    def finish(self):
+        """结束进度显示（换行）"""
+        with self._lock:
+            self._finish_download()
+            if self._width:
+                self.stream.write("\n")
+                self.stream.flush()
+                self._width = 0
+
@@ -0,0 +1,172 @@
+import json
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urldefrag
+
+from package_inventory import normalize_name
+from http_client import get_client
+from version_utils import sort_versions, is_prerelease
+
+# PEP 691 JSON格式优先，不支持时回退到PEP 503 HTML
+SIMPLE_ACCEPT = "application/vnd.pypi.simple.v1+json, application/vnd.pypi.simple.v1+html;q=0.2, text/html;q=0.01"
+
+# 源码包扩展名
+SDIST_EXTENSIONS = (".tar.gz", ".tar.bz2", ".tar.xz", ".tgz", ".zip", ".tar")
+
+
+class _SimpleLinkParser(HTMLParser):
+    """解析Simple API HTML页面中的文件链接"""
+
+    def __init__(self):
+        super().__init__()
+        self.links = []
+        self._current = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            self._current = {"attrs": dict(attrs), "text": ""}
+
+    def handle_data(self, data):
+        if self._current is not None:
+            self._current["text"] += data
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self._current is not None:
+            self.links.append(self._current)
+            self._current = None
+
+
+def version_from_filename(filename, project_name):
+    """从wheel或源码包文件名中提取版本号"""
+    if filename.endswith(".whl"):
+        parts = filename.split("-")
+        return parts[1] if len(parts) >= 5 else None
+
+    for ext in SDIST_EXTENSIONS:
+        if filename.lower().endswith(ext):
+            stem = filename[:-len(ext)]
+            break
+    else:
+        return None
+
+    # 项目名本身可能包含"-"，按规范化名称匹配前缀
+    target = normalize_name(project_name)
+    for i, char in enumerate(stem):
+        if char == "-" and normalize_name(stem[:i]) == target:
+            return stem[i + 1:] or None
+    return None
+
+
+class SimpleIndexClient:
+    def __init__(self, mirror_url, timeout=15, session=None, cache=None):
+        self.mirror_url = mirror_url.rstrip("/") + "/"
+        self.timeout = timeout
+        self.session = session or get_client().session
+        # 可选的磁盘缓存（IndexCache）
+        self.cache = cache
+
+    def project_url(self, name):
+        """获取项目在镜像源上的Simple API地址"""
+        return f"{self.mirror_url}{normalize_name(name)}/"
+
+    def get_project_files(self, name):
+        """获取项目的所有发布文件，项目不存在时返回None"""
+        url = self.project_url(name)
+        page = self.fetch_cached(normalize_name(name), url, SIMPLE_ACCEPT)
+        if page is None:
+            return None
+        text, content_type = page
+        return self.parse_project_page(text, url, content_type)
+
+    def fetch_cached(self, project, url, accept, kind="simple"):
+        """获取页面内容，优先使用缓存并通过ETag/Last-Modified重新验证
+
+        返回 (text, content_type)，页面不存在(404)时返回None
+        """
+        entry = None
+        headers = {"Accept": accept}
+        if self.cache is not None:
+            entry = self.cache.get(self.mirror_url, project, kind)
+            if entry and self.cache.is_fresh(entry):
+                return entry["body"], entry["content_type"]
+            headers.update(self.cache.conditional_headers(entry))
+
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and entry:
+            self.cache.touch(self.mirror_url, project, entry, kind)
+            return entry["body"], entry["content_type"]
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+
+        content_type = response.headers.get("Content-Type", "")
+        if self.cache is not None:
+            self.cache.put(
+                self.mirror_url, project, response.text,
+                content_type=content_type,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+                kind=kind
+            )
+        return response.text, content_type
+
+    def parse_project_page(self, text, base_url, content_type=""):
+        """解析项目页面（JSON或HTML），返回文件信息列表"""
+        files = []
+        if "json" in content_type:
+            data = json.loads(text)
+            for item in data.get("files", []):
+                files.append({
+                    "filename": item["filename"],
+                    "url": urljoin(base_url, item["url"]),
+                    "hashes": item.get("hashes", {}),
+                    "requires_python": item.get("requires-python"),
+                    "yanked": bool(item.get("yanked"))
+                })
+            return files
+
+        parser = _SimpleLinkParser()
+        parser.feed(text)
+        for link in parser.links:
+            href = link["attrs"].get("href")
+            if not href:
+                continue
+            url, fragment = urldefrag(urljoin(base_url, href))
+            hashes = {}
+            if "=" in fragment:
+                algo, value = fragment.split("=", 1)
+                hashes[algo] = value
+            files.append({
+                "filename": link["text"].strip() or url.rsplit("/", 1)[-1],
+                "url": url,
+                "hashes": hashes,
+                "requires_python": link["attrs"].get("data-requires-python"),
+                "yanked": "data-yanked" in link["attrs"]
+            })
+        return files
+
+    def get_project_versions(self, name, files=None):
+        """获取项目所有未撤回的版本（按PEP 440从低到高排序）"""
+        if files is None:
+            files = self.get_project_files(name)
+        if files is None:
+            return None
+
+        versions = set()
+        for item in files:
+            if item["yanked"]:
+                continue
+            version = version_from_filename(item["filename"], name)
+            if version:
+                versions.add(version)
+        return sort_versions(versions)
+
+    def get_latest_version(self, name, include_prereleases=False):
+        """获取项目的最新版本，项目不存在时返回None"""
+        versions = self.get_project_versions(name)
+        if not versions:
+            return None
+        if not include_prereleases:
+            stable = [v for v in versions if not is_prerelease(v)]
+            if stable:
+                return stable[-1]
+        return versions[-1]
@@ -0,0 +1,305 @@
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from app_config import get_data_dir, load_json, save_json
+from version_utils import parse_version, is_prerelease
+from http_client import get_client
+
+# nginx目录列表中的一行: <a href="3.12.1/">3.12.1/</a>   08-Dec-2023 00:38   -
+LISTING_PATTERN = re.compile(
+    r'<a href="([^"?/]+/?)">[^<]*</a>\s+(\d{2}-[A-Za-z]{3}-\d{4} \d{2}:\d{2})\s+(\d+|-)'
+)
+# 文件名中的Python版本号（包括预发布版本，如 python-3.13.0rc1-amd64.exe）
+FILE_VERSION_PATTERN = re.compile(r'^[Pp]ython-(\d+\.\d+\.\d+(?:(?:a|b|rc)\d+)?)[-.]')
+DIR_VERSION_PATTERN = re.compile(r'^(\d+)\.\d+(?:\.\d+)?$')
+
+# 安装文件类型 (架构, 格式) -> 文件名模板
+ARTIFACT_TEMPLATES = {
+    ("amd64", "exe"): "python-{version}-amd64.exe",
+    ("win32", "exe"): "python-{version}.exe",
+    ("arm64", "exe"): "python-{version}-arm64.exe",
+    ("amd64", "msi"): "python-{version}.amd64.msi",
+    ("win32", "msi"): "python-{version}.msi",
+    ("amd64", "embed"): "python-{version}-embed-amd64.zip",
+    ("win32", "embed"): "python-{version}-embed-win32.zip",
+    ("source", "tgz"): "Python-{version}.tgz"
+}
+DEFAULT_ARTIFACTS = [("amd64", "exe"), ("win32", "exe"), ("arm64", "exe")]
+
+MONTHS = {
+    "Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "May": 5, "Jun": 6,
+    "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12
+}
+
+
+def parse_listing(text):
+    """解析nginx目录列表，返回 [(名称, 日期YYYY-MM-DD, 大小或None)]"""
+    entries = []
+    for name, stamp, size in LISTING_PATTERN.findall(text):
+        day, month, rest = stamp.split("-", 2)
+        year = rest.split(" ", 1)[0]
+        # 不依赖系统区域设置解析英文月份
+        date = f"{year}-{MONTHS.get(month, 1):02d}-{day}"
+        entries.append((name, date, None if size == "-" else int(size)))
+    return entries
+
+
+def series_of(version):
+    """版本号所属的系列，如 3.12.1 -> 3.12"""
+    return ".".join(version.split(".")[:2])
+
+
+class ReleaseIndex:
+    def __init__(self, ftp_url="https://www.python.org/ftp/python/", ttl=6 * 3600, index_path=None,
+                 min_major=3, max_workers=8, timeout=15, session=None, negative_ttl=24 * 3600):
+        self.ftp_url = ftp_url.rstrip("/") + "/"
+        self.ttl = ttl
+        self.index_path = index_path or os.path.join(get_data_dir("cache"), "python_releases.json")
+        # 只为该主版本及以上的目录获取文件列表
+        self.min_major = min_major
+        self.max_workers = max_workers
+        self.timeout = timeout
+        # 探测为不存在的文件在此时间后重新探测（已存在的文件不会消失）
+        self.negative_ttl = negative_ttl
+
+        self.session = session or get_client().session
+
+        self.data = None
+        self._by_version = {}
+        self._by_series = {}
+        self._ordered = []
+
+    def load(self):
+        """从磁盘加载索引"""
+        if self.data is None:
+            self.data = load_json(self.index_path, {"fetched_at": 0, "validators": {}, "dirs": {}, "availability": {}})
+            self._build()
+        return self.data
+
+    def is_stale(self):
+        self.load()
+        return time.time() - self.data.get("fetched_at", 0) > self.ttl
+
+    def ensure_fresh(self):
+        """索引过期时刷新，刷新失败时继续使用旧数据，返回是否有可用数据"""
+        self.load()
+        if self.is_stale() or not self.data["dirs"]:
+            try:
+                self.refresh()
+            except (requests.RequestException, OSError) as e:
+                print(f"刷新Python版本索引失败: {e}")
+        return bool(self._ordered)
+
+    def _conditional_get(self, url, validators):
+        """带 If-None-Match / If-Modified-Since 的GET请求，未修改时返回None"""
+        headers = {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        validators["etag"] = response.headers.get("ETag")
+        validators["last_modified"] = response.headers.get("Last-Modified")
+        return response.text
+
+    def refresh(self):
+        """增量刷新：只重新获取日期有变化或新增的版本目录"""
+        self.load()
+        validators = self.data.setdefault("validators", {})
+        text = self._conditional_get(self.ftp_url, validators)
+        if text is not None:
+            dirs = self.data["dirs"]
+            listed = {}
+            for name, date, _ in parse_listing(text):
+                match = DIR_VERSION_PATTERN.match(name.rstrip("/"))
+                if name.endswith("/") and match:
+                    listed[name.rstrip("/")] = (date, int(match.group(1)))
+
+            changed = []
+            for name, (date, major) in listed.items():
+                entry = dirs.setdefault(name, {"date": date, "files": None, "validators": {}})
+                # 新增、日期变化或上次获取失败的目录需要重新获取文件列表
+                if major >= self.min_major and (entry["date"] != date or entry["files"] is None):
+                    changed.append(name)
+                entry["date"] = date
+            for name in list(dirs):
+                if name not in listed:
+                    del dirs[name]
+
+            if changed:
+                print(f"正在更新 {len(changed)} 个版本目录的文件列表...")
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    for name, files in zip(changed, executor.map(self._fetch_dir, changed)):
+                        if files is not None:
+                            dirs[name]["files"] = files
+
+        self.data["fetched_at"] = time.time()
+        save_json(self.index_path, self.data)
+        self._build()
+
+    def _fetch_dir(self, name):
+        """获取单个版本目录中的文件列表，失败或未修改时返回None"""
+        entry = self.data["dirs"][name]
+        validators = dict(entry.get("validators") or {})
+        try:
+            text = self._conditional_get(f"{self.ftp_url}{name}/", validators)
+        except requests.RequestException:
+            return None
+        if text is None:
+            return None
+        entry["validators"] = validators
+        return [
+            {"name": file_name, "date": date, "size": size}
+            for file_name, date, size in parse_listing(text)
+            if not file_name.endswith("/")
+        ]
+
+    def _build(self):
+        """由目录数据构建按版本和系列查询的内存索引"""
+        releases = {}
+        for dir_name, entry in self.data.get("dirs", {}).items():
+            files = entry.get("files")
+            if files is None:
+                # 没有文件列表时只记录目录本身对应的版本
+                releases.setdefault(dir_name, {"dir": dir_name, "date": entry["date"], "files": None})
+                continue
+            for item in files:
+                match = FILE_VERSION_PATTERN.match(item["name"])
+                version = match.group(1) if match else None
+                if not version:
+                    continue
+                release = releases.setdefault(version, {"dir": dir_name, "date": item["date"], "files": []})
+                # 发布日期取该版本最早上传的文件日期
+                release["date"] = min(release["date"], item["date"])
+                release["files"].append(item)
+
+        self._by_version = {}
+        self._by_series = {}
+        ordered = []
+        for version, release in releases.items():
+            key = parse_version(version)
+            if key is None:
+                continue
+            info = {
+                "version": version,
+                "date": release["date"],
+                "type": "prerelease" if is_prerelease(version) else "stable",
+                "download_link": f"{self.ftp_url}{release['dir']}/",
+                "files": release["files"]
+            }
+            ordered.append((key, info))
+        ordered.sort(key=lambda item: item[0], reverse=True)
+
+        self._ordered = [info for _, info in ordered]
+        for info in self._ordered:
+            self._by_version[info["version"]] = info
+            self._by_series.setdefault(series_of(info["version"]), []).append(info)
+
+    def releases(self, include_prereleases=False):
+        """所有版本，从新到旧"""
+        self.load()
+        if include_prereleases:
+            return list(self._ordered)
+        return [info for info in self._ordered if info["type"] == "stable"]
+
+    def get(self, version):
+        self.load()
+        return self._by_version.get(version)
+
+    def series(self, series, include_prereleases=False):
+        """某个系列的所有版本（如 "3.12" 的所有补丁版本），从新到旧"""
+        self.load()
+        return [
+            info for info in self._by_series.get(series, [])
+            if include_prereleases or info["type"] == "stable"
+        ]
+
+    def latest(self, series=None, include_prereleases=False):
+        """最新版本，可限定系列（如 "3.11" 表示最新的 3.11.x）"""
+        self.load()
+        candidates = self._by_series.get(series, []) if series else self._ordered
+        for info in candidates:
+            if include_prereleases or info["type"] == "stable":
+                return info
+        return None
+
+    def latest_per_series(self, include_prereleases=False):
+        """每个系列的最新版本，从新到旧"""
+        self.load()
+        result = []
+        for infos in self._by_series.values():
+            for info in infos:
+                if include_prereleases or info["type"] == "stable":
+                    result.append(info)
+                    break
+        result.sort(key=lambda info: parse_version(info["version"]), reverse=True)
+        return result
+
+    def artifact_url(self, version, arch, file_format):
+        """安装文件的下载地址，发布在 <主版本号.次版本号.修订号>/ 目录下"""
+        release = self.get(version)
+        if release:
+            base_url = release["download_link"]
+        else:
+            # 预发布版本与正式版本共用目录，如 3.13.0rc1 -> 3.13.0/
+            base_url = f"{self.ftp_url}{re.match(r'[0-9.]*[0-9]', version).group(0)}/"
+        return base_url + ARTIFACT_TEMPLATES[(arch, file_format)].format(version=version)
+
+    def probe_artifacts(self, versions, artifacts=None):
+        """批量检查安装文件是否存在，返回可用性矩阵 {版本: {"架构-格式": 下载地址，不存在时为None}}
+
+        已有文件列表的版本直接从索引回答，其余的通过连接池并发发送HEAD请求，
+        结果保存在索引中
+        """
+        self.load()
+        artifacts = artifacts or DEFAULT_ARTIFACTS
+        availability = self.data.setdefault("availability", {})
+        now = time.time()
+
+        matrix = {}
+        to_probe = []
+        for version in versions:
+            row = matrix.setdefault(version, {})
+            release = self.get(version)
+            names = {item["name"] for item in release["files"]} if release and release["files"] else None
+            cached = availability.get(version, {})
+            for arch, file_format in artifacts:
+                key = f"{arch}-{file_format}"
+                url = self.artifact_url(version, arch, file_format)
+                if names is not None:
+                    row[key] = url if url.rsplit("/", 1)[-1] in names else None
+                elif key in cached and (cached[key]["ok"] or now - cached[key]["checked_at"] < self.negative_ttl):
+                    row[key] = url if cached[key]["ok"] else None
+                else:
+                    to_probe.append((version, key, url))
+
+        if to_probe:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = executor.map(self._head_ok, [url for _, _, url in to_probe])
+                for (version, key, url), ok in zip(to_probe, results):
+                    if ok is None:
+                        # 网络错误：矩阵中不包含该项，也不缓存结果
+                        continue
+                    matrix[version][key] = url if ok else None
+                    availability.setdefault(version, {})[key] = {"ok": ok, "checked_at": now}
+            save_json(self.index_path, self.data)
+        return matrix
+
+    def _head_ok(self, url):
+        """文件存在返回True，不存在返回False，网络错误返回None"""
+        try:
+            response = self.session.head(url, allow_redirects=True, timeout=self.timeout)
+        except requests.RequestException:
+            return None
+        if response.status_code == 200:
+            return True
+        if response.status_code in (403, 404, 410):
+            return False
+        return None
@@ -0,0 +1,443 @@
+import os
+import re
+import sys
+import json
+import tempfile
+import subprocess
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from app_config import get_data_dir, load_json, save_json
+from package_inventory import normalize_name
+from version_utils import version_matches
+from venv_discovery import PRUNE_DIRS
+
+# 一条按名称声明的依赖，source 为 (文件路径, 行号)，options 为行末的pip选项（如 --hash=sha256:...）
+Requirement = namedtuple("Requirement", ["name", "key", "extras", "specifier", "marker", "line", "source", "options"])
+
+# 解析后的单个文件，includes 为 [("r" 或 "c", 被引用文件的绝对路径)]
+ParsedFile = namedtuple("ParsedFile", ["path", "requirements", "others", "includes"])
+
+# 同一个包互相矛盾的版本固定，first/second 为 (版本约束, 来源)
+RequirementConflict = namedtuple("RequirementConflict", ["name", "first", "second"])
+
+# 按引用关系合并后的结果
+# requirements/constraints: 按 (包名, 环境标记) 合并的依赖和约束；others: 去重后的其他行；
+# conflicts: 版本固定冲突；files: 读取的文件；missing: [(不存在的文件, 引用它的来源)]
+ResolvedRequirements = namedtuple(
+    "ResolvedRequirements", ["requirements", "constraints", "others", "conflicts", "files", "missing"]
+)
+
+# name[extras] 版本约束 ; 环境标记
+REQUIREMENT_PATTERN = re.compile(
+    r"^(?P<name>[A-Za-z0-9][A-Za-z0-9._-]*)\s*"
+    r"(?:\[(?P<extras>[^\]]*)\])?\s*"
+    r"(?P<specifier>[^;]*?)\s*"
+    r"(?:;\s*(?P<marker>.*?))?\s*$"
+)
+
+# 依赖行末尾的pip选项，如 --hash=sha256:...
+TRAILING_OPTION_PATTERN = re.compile(r"\s+(--[a-z-]+)(?:[= ](\S+))?")
+
+# 引用其他文件: -r/--requirement 为依赖文件，-c/--constraint 为约束文件
+INCLUDE_PATTERN = re.compile(r"^(-r|--requirement|-c|--constraint)(?:\s*=\s*|\s+)(\"[^\"]+\"|'[^']+'|\S+)$")
+
+# 参数为本地路径的选项，路径相对于所在文件
+PATH_OPTION_PATTERN = re.compile(r"^(-e|--editable|-f|--find-links)(?:\s*=\s*|\s+)(\"[^\"]+\"|'[^']+'|\S+)$")
+
+CACHE_VERSION = 2
+
+# 在目标解释器中批量计算环境标记
+MARKER_SCRIPT = """
+import json, sys
+from pip._vendor.packaging.markers import Marker
+result = {}
+for marker in json.loads(sys.stdin.read()):
+    try:
+        result[marker] = Marker(marker).evaluate()
+    except Exception:
+        result[marker] = True
+print(json.dumps(result))
+"""
+
+
+def logical_lines(text):
+    """合并续行、去掉注释，返回 (行号, 内容) 列表"""
+    lines = []
+    buffer = ""
+    start = None
+    for number, raw in enumerate(text.splitlines(), 1):
+        # 行首或空白后的 # 开始注释
+        line = re.sub(r"(^|\s)#.*$", "", raw).rstrip()
+        if start is None:
+            start = number
+        if line.endswith("\\"):
+            buffer += line[:-1] + " "
+            continue
+        buffer += line
+        if buffer.strip():
+            lines.append((start, buffer.strip()))
+        buffer = ""
+        start = None
+    if buffer.strip():
+        lines.append((start, buffer.strip()))
+    return lines
+
+
+def parse_requirement(line, source=None):
+    """解析一条按名称声明的依赖，URL、本地路径等无法解析时返回None"""
+    # 行末的选项（--hash 等）单独保存，写回时原样附加，不能丢掉
+    options = tuple(
+        f"{option}={value}" if value else option for option, value in TRAILING_OPTION_PATTERN.findall(line)
+    )
+    line = TRAILING_OPTION_PATTERN.sub("", line).strip()
+    # "name @ url" 形式的直接引用无法与已安装版本比较
+    if " @ " in line or "://" in line:
+        return None
+    match = REQUIREMENT_PATTERN.match(line)
+    if not match:
+        return None
+    specifier = match.group("specifier").replace(" ", "")
+    if specifier and not re.match(r"^(===|==|!=|~=|<=|>=|<|>)", specifier):
+        return None
+    extras = tuple(sorted(
+        normalize_name(e) for e in (match.group("extras") or "").split(",") if e.strip()
+    ))
+    name = match.group("name")
+    return Requirement(name, normalize_name(name), extras, specifier, match.group("marker") or "", line, source, options)
+
+
+def parse_requirements_text(text, source=None):
+    """解析requirements文本，返回 (依赖列表, 无法按名称比较的行列表)
+
+    以 - 开头的选项行也放入第二个列表
+    """
+    requirements = []
+    others = []
+    for number, line in logical_lines(text):
+        requirement = None if line.startswith("-") else parse_requirement(line, (source, number))
+        if requirement:
+            requirements.append(requirement)
+        else:
+            others.append(line)
+    return requirements, others
+
+
+def requirement_line(requirement, with_options=True):
+    """由依赖的各部分重新组成一行（合并后的依赖原始行已不完整）
+
+    with_options 为False时不附加行末的pip选项，用于显示
+    """
+    line = requirement.name
+    if requirement.extras:
+        line += "[" + ",".join(requirement.extras) + "]"
+    line += requirement.specifier
+    if requirement.marker:
+        line += "; " + requirement.marker
+    if with_options and requirement.options:
+        line += " " + " ".join(requirement.options)
+    return line
+
+
+def constraint_line(requirement):
+    """约束文件中的一行：只有包名、版本约束和环境标记（pip不接受带extras的约束）"""
+    line = requirement.name + requirement.specifier
+    if requirement.marker:
+        line += "; " + requirement.marker
+    return line
+
+
+def format_source(source):
+    path, number = source
+    return f"{path}:{number}"
+
+
+def parse_requirements_file(path):
+    with open(path, "r", encoding="utf-8-sig") as f:
+        return parse_requirements_text(f.read(), path)
+
+
+def evaluate_markers(markers, python_path=None):
+    """在目标解释器中计算环境标记，返回 {标记: 是否适用}；无法计算时视为适用"""
+    markers = sorted(set(m for m in markers if m))
+    if not markers:
+        return {}
+    try:
+        result = subprocess.run(
+            [python_path or sys.executable, "-c", MARKER_SCRIPT],
+            input=json.dumps(markers),
+            capture_output=True,
+            text=True,
+            timeout=30
+        )
+        if result.returncode == 0:
+            return json.loads(result.stdout)
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        pass
+    return {marker: True for marker in markers}
+
+
+def _absolute_path(value, base_dir):
+    """相对于所在文件的本地路径改为绝对路径，URL保持不变"""
+    value = value.strip("\"'")
+    if "://" in value or value.startswith("file:") or os.path.isabs(value):
+        return value
+    return os.path.normpath(os.path.join(base_dir, value))
+
+
+def option_line(option, value):
+    """组成带路径参数的选项行，路径中有空格时加引号"""
+    return f'{option} "{value}"' if re.search(r"\s", value) else f"{option} {value}"
+
+
+def find_requirements_files(root):
+    """查找目录下的requirements文件（requirements*.txt、*requirements.txt 及 requirements 目录中的 .txt）"""
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in PRUNE_DIRS and not os.path.isfile(os.path.join(dirpath, d, "pyvenv.cfg")))
+        in_requirements_dir = os.path.basename(dirpath).lower() == "requirements"
+        for filename in sorted(filenames):
+            lower = filename.lower()
+            if lower.endswith(".txt") and ("requirements" in lower or in_requirements_dir):
+                found.append(os.path.join(dirpath, filename))
+    return found
+
+
+def write_temp_requirements(lines, directory=None):
+    """写入临时requirements文件，返回文件路径（调用方负责删除）"""
+    fd, path = tempfile.mkstemp(prefix=".requirements-", suffix=".txt", dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+class RequirementsParser:
+    """按 -r/-c 引用关系解析一组requirements文件并合并
+
+    解析结果按文件的修改时间和大小缓存在磁盘上，未修改的文件不再重新解析
+    """
+
+    def __init__(self, cache_path=None, max_workers=8):
+        self.cache_path = cache_path or os.path.join(get_data_dir("cache"), "requirements_cache.json")
+        self.max_workers = max_workers
+        self._cache = None
+        self._dirty = False
+        # 上次 resolve 读取的文件数和其中使用缓存的文件数
+        self.last_files = 0
+        self.last_cache_hits = 0
+
+    def _load_cache(self):
+        if self._cache is None:
+            cache = load_json(self.cache_path, {})
+            if cache.get("version") != CACHE_VERSION:
+                cache = {"version": CACHE_VERSION, "files": {}}
+            self._cache = cache
+        return self._cache["files"]
+
+    def save_cache(self):
+        if self._dirty:
+            save_json(self.cache_path, self._cache)
+            self._dirty = False
+
+    def parse_file(self, path):
+        """解析单个文件（不跟随引用），返回 (ParsedFile, 是否使用了缓存)"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        result = self._cached(path, stat)
+        if result is not None:
+            return result, True
+        return self._parse(path, stat), False
+
+    def _cached(self, path, stat):
+        """文件未修改时返回缓存的 ParsedFile，否则返回None"""
+        entry = self._load_cache().get(path)
+        if not entry or entry["mtime"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+            return None
+        requirements = [
+            Requirement(r[0], r[1], tuple(r[2]), r[3], r[4], r[5], tuple(r[6]), tuple(r[7])) for r in entry["requirements"]
+        ]
+        includes = [tuple(include) for include in entry["includes"]]
+        return ParsedFile(path, requirements, entry["others"], includes)
+
+    def _parse(self, path, stat):
+        requirements, lines = parse_requirements_file(path)
+        base_dir = os.path.dirname(path)
+        others = []
+        includes = []
+        for line in lines:
+            match = INCLUDE_PATTERN.match(line)
+            if match:
+                kind = "c" if match.group(1) in ("-c", "--constraint") else "r"
+                includes.append((kind, _absolute_path(match.group(2), base_dir)))
+                continue
+            match = PATH_OPTION_PATTERN.match(line)
+            if match:
+                line = option_line(match.group(1), _absolute_path(match.group(2), base_dir))
+            elif line.startswith("."):
+                line = _absolute_path(line, base_dir)
+            others.append(line)
+
+        self._load_cache()[path] = {
+            "mtime": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "requirements": [list(r) for r in requirements],
+            "others": others,
+            "includes": includes
+        }
+        self._dirty = True
+        return ParsedFile(path, requirements, others, includes)
+
+    def resolve(self, paths):
+        """从 paths 出发跟随全部 -r/-c 引用，返回 ResolvedRequirements
+
+        同一层中需要重新解析的文件并行读取和解析，每个文件只解析一次（循环引用也不会重复）
+        """
+        self._load_cache()
+        kinds = {}
+        order = []
+        missing = []
+        level = []
+        for path in paths:
+            path = os.path.abspath(path)
+            if path not in kinds:
+                kinds[path] = "r"
+                level.append((path, None))
+
+        parsed = {}
+        hits = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while level:
+                results = []
+                for path, origin in level:
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        missing.append((path, origin))
+                        continue
+                    result = self._cached(path, stat)
+                    if result is None:
+                        result = executor.submit(self._parse, path, stat)
+                    else:
+                        hits += 1
+                    results.append((path, result))
+                next_level = []
+                for path, result in results:
+                    if not isinstance(result, ParsedFile):
+                        result = result.result()
+                    parsed[path] = result
+                    order.append(path)
+                    for kind, include in result.includes:
+                        # 约束文件中引用的文件同样是约束
+                        kind = "c" if kinds[path] == "c" else kind
+                        if include not in kinds:
+                            kinds[include] = kind
+                            next_level.append((include, path))
+                        elif kind == "r" and kinds[include] == "c":
+                            # 同一文件既作为依赖又作为约束引用时按依赖处理
+                            kinds[include] = "r"
+                level = next_level
+        self.save_cache()
+        self.last_files = len(order)
+        self.last_cache_hits = hits
+
+        requirements = []
+        constraints = []
+        others = []
+        seen = set()
+        for path in order:
+            target = constraints if kinds[path] == "c" else requirements
+            target.extend(parsed[path].requirements)
+            if kinds[path] == "r":
+                for line in parsed[path].others:
+                    if line not in seen:
+                        seen.add(line)
+                        others.append(line)
+
+        conflicts = find_conflicts(requirements + constraints)
+        return ResolvedRequirements(
+            merge_requirements(requirements), merge_requirements(constraints), others, conflicts, order, missing
+        )
+
+
+def merge_requirements(requirements, by_marker=True):
+    """合并 (包名, 环境标记) 相同的依赖：版本约束去重后合并，extras和行末选项（--hash 等）取并集，
+    保持首次出现的顺序
+
+    by_marker 为False时只按包名合并（用于已确定环境标记适用的依赖）
+    """
+    groups = {}
+    for requirement in requirements:
+        key = (requirement.key, requirement.marker if by_marker else "")
+        group = groups.get(key)
+        if group is None:
+            groups[key] = group = [requirement, {}, set(), {}]
+        # dict 保持版本约束和选项的出现顺序并去重
+        for specifier in requirement.specifier.split(","):
+            if specifier:
+                group[1][specifier] = None
+        group[2].update(requirement.extras)
+        for option in requirement.options:
+            group[3][option] = None
+
+    merged = []
+    for first, specifiers, extras, options in groups.values():
+        specifier = ",".join(specifiers)
+        extras = tuple(sorted(extras))
+        options = tuple(options)
+        if specifier != first.specifier or extras != first.extras or options != first.options:
+            first = first._replace(specifier=specifier, extras=extras, options=options)
+        merged.append(first)
+    return merged
+
+
+def _pins(specifier):
+    """版本约束中固定的版本（== 且不含通配符，或 ===）"""
+    pins = []
+    for part in specifier.split(","):
+        if part.startswith("===") or (part.startswith("==") and not part.endswith(".*")):
+            pins.append(part.lstrip("="))
+    return pins
+
+
+def find_conflicts(requirements):
+    """查找同一个包的版本固定与其他版本约束矛盾的情况
+
+    环境标记不同的两条依赖可能不会同时生效，不视为冲突
+    """
+    by_key = {}
+    pinned_keys = set()
+    for requirement in requirements:
+        if requirement.specifier:
+            # 相同的约束只保留首次出现的一条
+            by_key.setdefault(requirement.key, {}).setdefault((requirement.specifier, requirement.marker), requirement)
+            if "==" in requirement.specifier:
+                pinned_keys.add(requirement.key)
+
+    conflicts = []
+    for key in pinned_keys:
+        entries = list(by_key[key].values())
+        reported = set()
+        for i, pinned in enumerate(entries):
+            for version in _pins(pinned.specifier):
+                for j, other in enumerate(entries):
+                    if i == j or (min(i, j), max(i, j)) in reported:
+                        continue
+                    if pinned.marker and other.marker and pinned.marker != other.marker:
+                        continue
+                    if not version_matches(version, other.specifier):
+                        reported.add((min(i, j), max(i, j)))
+                        conflicts.append(RequirementConflict(
+                            pinned.name,
+                            (pinned.specifier, pinned.source),
+                            (other.specifier, other.source)
+                        ))
+    return conflicts
+
+
+def format_conflicts(conflicts):
+    lines = []
+    for conflict in conflicts:
+        lines.append(f"- {conflict.name}:")
+        for specifier, source in (conflict.first, conflict.second):
+            lines.append(f"    {specifier}  ({format_source(source)})")
+    return "\n".join(lines)
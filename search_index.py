@@ -0,0 +1,403 @@
+import os
+import re
+import json
+import time
+import zlib
+import struct
+import bisect
+import difflib
+import operator
+import tempfile
+import itertools
+from array import array
+from collections import namedtuple, defaultdict, Counter
+
+from app_config import get_data_dir, load_json, save_json
+from package_inventory import normalize_name
+from http_client import get_client
+from pypi_index import SimpleIndexClient, SIMPLE_ACCEPT
+
+INDEX_VERSION = 1
+INDEX_MAGIC = b"PMSI"
+
+# 搜索结果，match 为 exact/prefix/substring/fuzzy
+SearchResult = namedtuple("SearchResult", ["name", "match", "score", "summary"])
+
+# PEP 503 HTML项目列表中的链接（取链接最后一段路径作为项目名）
+HTML_PROJECT_PATTERN = re.compile(r'<a\s[^>]*?href="(?:[^"]*/)?([^"/]+)/?"')
+
+# 新增和删除的项目超过此比例时完整重建索引，否则增量更新
+REBUILD_RATIO = 0.05
+
+# 前缀和子串匹配最多收集的候选数
+MAX_CANDIDATES = 2000
+
+# 按编辑相似度重新排序的模糊匹配候选数
+RERANK_CANDIDATES = 100
+
+# 各类匹配的得分: 前缀和包含匹配按名称长度比例在区间内取值，相似匹配按编辑相似度缩放，
+# 使完整包含查询词的名称一般排在拼写相近的名称之前
+PREFIX_SCORE = (0.6, 0.4)
+SUBSTRING_SCORE = (0.5, 0.4)
+FUZZY_SCALE = 0.9
+
+# 删除的项目在名称中用此字符占位，保持其他项目的位置不变
+TOMBSTONE = "\0"
+
+
+def _grams(key):
+    """名称的三元组集合（首尾加空格，使开头和结尾的字符也有权重）"""
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _encode_postings(ids):
+    """升序的项目编号列表编码为差值数组并压缩，返回 (类型码, 压缩数据)"""
+    deltas = array("I", [ids[0]])
+    deltas.extend(map(operator.sub, ids[1:], ids[:-1]))
+    largest = max(deltas)
+    code = "B" if largest < 1 << 8 else "H" if largest < 1 << 16 else "I"
+    return code, zlib.compress(array(code, deltas).tobytes(), 1)
+
+
+def _decode_postings(code, data):
+    deltas = array(code)
+    deltas.frombytes(zlib.decompress(data))
+    return array("I", itertools.accumulate(deltas))
+
+
+def parse_project_list(text, content_type=""):
+    """解析镜像源 /simple/ 页面，返回规范化的项目名列表"""
+    if "json" in content_type:
+        names = [project["name"] for project in json.loads(text).get("projects", [])]
+    else:
+        names = HTML_PROJECT_PATTERN.findall(text)
+    # 整体规范化比逐个调用 normalize_name 快得多，名称中没有换行，不会跨行合并
+    blob = re.sub(r"[-_.]+", "-", "\n".join(names).lower())
+    return [name for name in blob.split("\n") if name]
+
+
+def json_api_base(mirror_url):
+    """镜像源对应的JSON API地址（.../simple -> .../pypi/），无法推断时使用PyPI官方地址"""
+    mirror_url = mirror_url.rstrip("/")
+    if mirror_url.endswith("/simple"):
+        return mirror_url[:-len("simple")] + "pypi/"
+    return "https://pypi.org/pypi/"
+
+
+def fetch_project_info(name, mirror_url, cache=None, timeout=15):
+    """获取项目的JSON元数据中的 info 部分（结果写入缓存，供搜索结果显示简介），不存在时返回None"""
+    client = SimpleIndexClient(json_api_base(mirror_url), timeout=timeout, cache=cache)
+    key = normalize_name(name)
+    page = client.fetch_cached(key, f"{client.mirror_url}{key}/json", "application/json", kind="json")
+    if page is None:
+        return None
+    return json.loads(page[0]).get("info") or {}
+
+
+def cached_summary(name, mirror_url, cache):
+    """从缓存的JSON元数据中读取项目简介，没有缓存时返回None（不访问网络）"""
+    entry = cache.get(json_api_base(mirror_url).rstrip("/") + "/", normalize_name(name), "json")
+    if not entry:
+        return None
+    try:
+        return (json.loads(entry["body"]).get("info") or {}).get("summary") or None
+    except (ValueError, AttributeError):
+        return None
+
+
+class SearchIndex:
+    """由镜像源 /simple/ 项目列表建立的本地搜索索引
+
+    磁盘上保存压缩的项目名列表和三元组倒排索引（编号差值编码），查询时只读取
+    用到的三元组；刷新时用条件请求，只对新增和删除的项目增量更新
+    """
+
+    def __init__(self, mirror_url, index_dir=None, ttl=24 * 3600, timeout=60, session=None):
+        self.mirror_url = mirror_url.rstrip("/") + "/"
+        self.index_dir = index_dir or get_data_dir("cache", "search")
+        self.index_path = os.path.join(self.index_dir, "projects.idx")
+        self.meta_path = os.path.join(self.index_dir, "meta.json")
+        self.ttl = ttl
+        self.timeout = timeout
+        self.session = session or get_client().session
+
+        self.meta = None
+        self._blob = None
+        self._offsets = None
+        self._table = None
+        self._data_start = 0
+
+    # ---- 读取 ----
+
+    def load(self):
+        """从磁盘加载索引，返回是否有可用的索引"""
+        if self.meta is None:
+            self.meta = load_json(self.meta_path, {})
+            if self.meta.get("version") != INDEX_VERSION:
+                self.meta = {"version": INDEX_VERSION}
+        if self._blob is None and self.meta.get("count") and os.path.exists(self.index_path):
+            try:
+                self._read_index()
+            except (OSError, ValueError, zlib.error, struct.error):
+                self._blob = None
+        return self._blob is not None
+
+    def _read_index(self):
+        with open(self.index_path, "rb") as f:
+            if f.read(4) != INDEX_MAGIC:
+                raise ValueError("索引文件格式不正确")
+            table_size, names_size, lengths_size = struct.unpack(">III", f.read(12))
+            table = json.loads(zlib.decompress(f.read(table_size)).decode("utf-8"))
+            blob = zlib.decompress(f.read(names_size)).decode("utf-8")
+            strides = array("H")
+            strides.frombytes(zlib.decompress(f.read(lengths_size)))
+        # 名称列表格式为 "\n名称0\n名称1\n...\n"，编号 i 的名称从 offsets[i] 开始
+        self._offsets = array("I", itertools.accumulate(itertools.chain([1], strides)))
+        self._blob = blob
+        self._table = table
+        self._data_start = 16 + table_size + names_size + lengths_size
+
+    def __len__(self):
+        return self.meta.get("count", 0) if self.load() else 0
+
+    def name(self, project_id):
+        start = self._offsets[project_id]
+        return self._blob[start:self._offsets[project_id + 1] - 1]
+
+    def names(self):
+        """索引中的全部项目名（不含已删除的）"""
+        names = self._blob[1:-1].split("\n")
+        if self.meta.get("removed"):
+            names = [name for name in names if not name.startswith(TOMBSTONE)]
+        return names
+
+    def _id_at(self, position):
+        return bisect.bisect_right(self._offsets, position) - 1
+
+    def _postings(self, gram, f):
+        entry = self._table.get(gram)
+        if entry is None:
+            return ()
+        offset, size, code, _ = entry
+        f.seek(self._data_start + offset)
+        return _decode_postings(code, f.read(size))
+
+    # ---- 刷新 ----
+
+    def is_stale(self):
+        self.load()
+        return time.time() - self.meta.get("fetched_at", 0) > self.ttl
+
+    def ensure_fresh(self, status_callback=None):
+        """索引不存在或过期时刷新，刷新失败时继续使用旧索引，返回是否有可用索引"""
+        if not self.load() or self.is_stale():
+            try:
+                self.refresh(status_callback)
+            except (OSError, ValueError) as e:
+                # requests 的异常也是 OSError 的子类
+                if status_callback:
+                    status_callback(f"刷新搜索索引失败: {e}")
+        return self.load()
+
+    def refresh(self, status_callback=None):
+        """从镜像源获取项目列表：未修改时只更新时间，变化较少时增量更新，否则重建"""
+        status = status_callback or (lambda message: None)
+        self.load()
+        headers = {"Accept": SIMPLE_ACCEPT}
+        validators = self.meta.get("validators") or {}
+        same_mirror = self.meta.get("mirror_url") == self.mirror_url and self._blob is not None
+        if same_mirror:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+
+        status("正在获取项目列表...")
+        response = self.session.get(self.mirror_url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and same_mirror:
+            self._save_meta()
+            return
+        response.raise_for_status()
+        # 项目列表很大，不让requests猜测编码
+        text = response.content.decode("utf-8", errors="replace")
+        names = parse_project_list(text, response.headers.get("Content-Type", ""))
+        if not names:
+            raise ValueError("镜像源返回的项目列表为空")
+        self.meta["validators"] = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified")
+        }
+
+        if self._blob is not None:
+            current = set(self.names())
+            latest = set(names)
+            added = [name for name in names if name not in current]
+            removed = current - latest
+            tombstones = self.meta.get("removed", 0) + len(removed)
+            if len(added) + len(removed) <= REBUILD_RATIO * len(latest) and tombstones <= REBUILD_RATIO * len(latest):
+                status(f"增量更新搜索索引: 新增 {len(added)} 个，删除 {len(removed)} 个项目")
+                self._update(added, removed)
+                return
+        status(f"正在建立 {len(names)} 个项目的搜索索引...")
+        self._build(names)
+
+    def _build(self, names):
+        names = sorted(set(names))
+        postings = defaultdict(lambda: array("I"))
+        for project_id, name in enumerate(names):
+            for gram in _grams(name):
+                postings[gram].append(project_id)
+        chunks = {gram: _encode_postings(ids) for gram, ids in postings.items()}
+        self._write(names, chunks, {gram: ids[-1] for gram, ids in postings.items()}, removed=0)
+
+    def _update(self, added, removed):
+        """删除的项目替换为占位符，新增的项目追加到末尾并更新相关三元组"""
+        names = self._blob[1:-1].split("\n")
+        for name in removed:
+            project_id = self._id_at(self._blob.find(f"\n{name}\n") + 1)
+            names[project_id] = TOMBSTONE * len(name)
+
+        new_ids = defaultdict(list)
+        for project_id, name in enumerate(added, len(names)):
+            for gram in _grams(name):
+                new_ids[gram].append(project_id)
+        names.extend(added)
+
+        chunks = {}
+        last = {}
+        with open(self.index_path, "rb") as f:
+            for gram, (offset, size, code, gram_last) in self._table.items():
+                if gram not in new_ids:
+                    f.seek(self._data_start + offset)
+                    chunks[gram] = (code, f.read(size))
+                    last[gram] = gram_last
+            for gram, ids in new_ids.items():
+                if gram in self._table:
+                    ids = list(self._postings(gram, f)) + ids
+                chunks[gram] = _encode_postings(array("I", ids))
+                last[gram] = ids[-1]
+        self._write(names, chunks, last, removed=self.meta.get("removed", 0) + len(removed))
+
+    def _write(self, names, chunks, last, removed):
+        """写入索引文件（先写临时文件再替换）并更新元数据"""
+        table = {}
+        data = []
+        offset = 0
+        for gram, (code, chunk) in chunks.items():
+            table[gram] = [offset, len(chunk), code, last[gram]]
+            data.append(chunk)
+            offset += len(chunk)
+        table_bytes = zlib.compress(json.dumps(table, ensure_ascii=False).encode("utf-8"), 1)
+        blob = "\n" + "\n".join(names) + "\n"
+        names_bytes = zlib.compress(blob.encode("utf-8"), 3)
+        # 每个名称占用的长度（含换行），加载时累加得到各名称的位置
+        strides = array("H", map(len, names))
+        strides = array("H", map(operator.add, strides, itertools.repeat(1, len(strides))))
+        lengths_bytes = zlib.compress(strides.tobytes(), 6)
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.index_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(INDEX_MAGIC)
+                f.write(struct.pack(">III", len(table_bytes), len(names_bytes), len(lengths_bytes)))
+                f.write(table_bytes)
+                f.write(names_bytes)
+                f.write(lengths_bytes)
+                for chunk in data:
+                    f.write(chunk)
+            os.replace(temp_path, self.index_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        self.meta["count"] = len(names) - removed
+        self.meta["removed"] = removed
+        self._blob = None
+        self._save_meta()
+        self.load()
+
+    def _save_meta(self):
+        self.meta["version"] = INDEX_VERSION
+        self.meta["mirror_url"] = self.mirror_url
+        self.meta["fetched_at"] = time.time()
+        save_json(self.meta_path, self.meta)
+
+    # ---- 查询 ----
+
+    def search(self, query, limit=20):
+        """搜索项目名，返回 SearchResult 列表
+
+        完全匹配排在最前，其余按得分排序（见 PREFIX_SCORE 等），得分相同时
+        前缀 > 包含 > 相似；相似匹配基于三元组召回，可容忍拼写错误
+        """
+        key = normalize_name(query.strip())
+        if not key or not self.load():
+            return []
+        blob = self._blob
+        found = {}
+
+        # 前缀匹配（包括完全匹配）：名称列表中 "\n查询词" 的位置
+        position = blob.find("\n" + key)
+        while position >= 0 and len(found) < MAX_CANDIDATES:
+            project_id = self._id_at(position + 1)
+            name = self.name(project_id)
+            if name == key:
+                found[project_id] = ("exact", 1.0)
+            else:
+                found[project_id] = ("prefix", PREFIX_SCORE[0] + PREFIX_SCORE[1] * len(key) / len(name))
+            position = blob.find("\n" + key, position + 1)
+
+        # 包含查询词
+        position = blob.find(key)
+        limit_substring = len(found) + MAX_CANDIDATES
+        while position >= 0 and len(found) < limit_substring:
+            if blob[position - 1] != "\n":
+                project_id = self._id_at(position)
+                if project_id not in found:
+                    ratio = len(key) / len(self.name(project_id))
+                    found[project_id] = ("substring", SUBSTRING_SCORE[0] + SUBSTRING_SCORE[1] * ratio)
+            position = blob.find(key, position + 1)
+
+        if len(found) < limit:
+            found.update(self._fuzzy(key, found, limit))
+
+        rank = {"exact": 0, "prefix": 1, "substring": 2, "fuzzy": 3}
+        ordered = sorted(
+            found.items(),
+            key=lambda item: (item[1][0] != "exact", -item[1][1], rank[item[1][0]], self.name(item[0]))
+        )
+        return [SearchResult(self.name(project_id), match, score, None) for project_id, (match, score) in ordered[:limit]]
+
+    def _fuzzy(self, key, exclude, limit):
+        """三元组相似度召回候选，再按编辑相似度重新排序"""
+        grams = _grams(key)
+        counts = Counter()
+        with open(self.index_path, "rb") as f:
+            for gram in grams:
+                counts.update(self._postings(gram, f))
+        # 至少共享一半的三元组
+        threshold = max(2, len(grams) // 2)
+        candidates = []
+        for project_id, common in counts.items():
+            if common >= threshold and project_id not in exclude:
+                name = self.name(project_id)
+                if not name.startswith(TOMBSTONE):
+                    # Dice系数
+                    candidates.append((2 * common / (len(grams) + len(name)), project_id, name))
+        candidates.sort(reverse=True)
+
+        matcher = difflib.SequenceMatcher(None, "", key)
+        scored = []
+        for dice, project_id, name in candidates[:max(RERANK_CANDIDATES, limit)]:
+            matcher.set_seq1(name)
+            scored.append((matcher.ratio(), dice, project_id))
+        scored.sort(reverse=True)
+        return {project_id: ("fuzzy", FUZZY_SCALE * ratio) for ratio, _, project_id in scored[:limit]}
+
+
+def add_summaries(results, mirror_url, cache):
+    """为搜索结果填入缓存中已有的项目简介"""
+    return [result._replace(summary=cached_summary(result.name, mirror_url, cache)) for result in results]
@@ -0,0 +1,166 @@
+import os
+import time
+import shutil
+import subprocess
+from collections import namedtuple
+
+from venv_discovery import env_python
+
+# 克隆结果
+CloneResult = namedtuple("CloneResult", ["path", "files", "linked", "copied", "rewritten", "elapsed"])
+
+# 解释器启动器和可执行文件，内容中不包含环境路径
+LAUNCHER_NAMES = {"python.exe", "pythonw.exe", "python_d.exe", "pythonw_d.exe"}
+
+# 编译缓存中记录了模板的源文件路径，不复制，首次导入时自动重新生成
+SKIP_DIRS = {"__pycache__"}
+
+
+def _is_text(data):
+    return b"\0" not in data[:1024]
+
+
+class VenvCloner:
+    def __init__(self, template_path, use_links=True):
+        self.template_path = os.path.abspath(template_path)
+        # 是否优先使用硬链接（同一文件系统时几乎不占额外空间）
+        self.use_links = use_links
+        self.files = 0
+        self.linked = 0
+        self.copied = 0
+        self.rewritten = 0
+
+    def validate(self):
+        """检查模板是否为有效的虚拟环境"""
+        if not os.path.isfile(os.path.join(self.template_path, "pyvenv.cfg")):
+            raise ValueError(f"{self.template_path} 不是虚拟环境（缺少pyvenv.cfg）")
+        if env_python(self.template_path) is None:
+            raise ValueError(f"{self.template_path} 中未找到Python解释器")
+
+    def clone(self, dest_path):
+        """从模板克隆虚拟环境，返回 CloneResult
+
+        site-packages 等目录中的文件使用硬链接（不支持时复制），
+        pyvenv.cfg、激活脚本和入口脚本中的模板路径改写为新路径
+        """
+        self.validate()
+        dest_path = os.path.abspath(dest_path)
+        if os.path.exists(dest_path):
+            raise FileExistsError(f"目录 {dest_path} 已存在")
+
+        start_time = time.time()
+        self.files = self.linked = self.copied = self.rewritten = 0
+        self._dest_path = dest_path
+        # 与pip安装时写入的入口脚本路径一致
+        self._old_python = env_python(self.template_path)
+        self._new_python = os.path.join(dest_path, os.path.relpath(self._old_python, self.template_path))
+        self._replacements = [
+            (self.template_path, dest_path),
+            (f"({os.path.basename(self.template_path)}) ", f"({os.path.basename(dest_path)}) ")
+        ]
+        try:
+            self._copy_tree(self.template_path, dest_path, top=True)
+        except BaseException:
+            # 克隆失败时删除不完整的环境
+            shutil.rmtree(dest_path, ignore_errors=True)
+            raise
+        return CloneResult(dest_path, self.files, self.linked, self.copied, self.rewritten,
+                           time.time() - start_time)
+
+    def _copy_tree(self, src, dest, top=False):
+        os.makedirs(dest)
+        scripts_dir = os.path.basename(src) in ("Scripts", "bin") and os.path.dirname(src) == self.template_path
+        with os.scandir(src) as entries:
+            for entry in entries:
+                target = os.path.join(dest, entry.name)
+                if entry.is_symlink():
+                    self._copy_symlink(entry.path, target)
+                elif entry.is_dir():
+                    if entry.name not in SKIP_DIRS:
+                        self._copy_tree(entry.path, target)
+                else:
+                    self.files += 1
+                    if top and entry.name == "pyvenv.cfg":
+                        self._rewrite_text(entry.path, target)
+                    elif scripts_dir and entry.name not in LAUNCHER_NAMES:
+                        self._copy_script(entry.path, target)
+                    elif entry.name.endswith(".pth"):
+                        # .pth 中可能包含模板内的绝对路径
+                        self._copy_script(entry.path, target)
+                    else:
+                        self._link_or_copy(entry.path, target)
+
+    def _copy_symlink(self, src, dest):
+        """复制符号链接，指向模板内部的绝对链接改为指向新环境"""
+        link = os.readlink(src)
+        if os.path.isabs(link) and (link + os.sep).startswith(self.template_path + os.sep):
+            link = self._dest_path + link[len(self.template_path):]
+        os.symlink(link, dest, target_is_directory=os.path.isdir(src))
+
+    def _link_or_copy(self, src, dest):
+        if self.use_links:
+            try:
+                os.link(src, dest)
+                self.linked += 1
+                return
+            except OSError:
+                # 跨文件系统或文件系统不支持硬链接
+                self.use_links = False
+        shutil.copy2(src, dest)
+        self.copied += 1
+
+    def _copy_script(self, src, dest):
+        """复制脚本，内容中包含模板路径时改写"""
+        with open(src, "rb") as f:
+            data = f.read()
+        old_path = self.template_path.encode("utf-8")
+        if old_path not in data:
+            self._link_or_copy(src, dest)
+        elif _is_text(data):
+            self._rewrite_text(src, dest, data)
+        else:
+            self._rewrite_launcher(src, dest, data)
+
+    def _rewrite_text(self, src, dest, data=None):
+        if data is None:
+            with open(src, "rb") as f:
+                data = f.read()
+        for old, new in self._replacements:
+            data = data.replace(old.encode("utf-8"), new.encode("utf-8"))
+        self._write(src, dest, data)
+
+    def _rewrite_launcher(self, src, dest, data):
+        """改写Windows入口脚本启动器（exe + shebang + zip）中的shebang
+
+        zip内的偏移量相对于zip数据开头，修改shebang长度不影响启动器定位脚本
+        """
+        data = data.replace(self._old_python.encode("utf-8"), self._new_python.encode("utf-8"), 1)
+        self._write(src, dest, data)
+
+    def _write(self, src, dest, data):
+        with open(dest, "wb") as f:
+            f.write(data)
+        shutil.copystat(src, dest)
+        self.rewritten += 1
+
+
+def clone_venv(template_path, dest_path, use_links=True):
+    """从模板虚拟环境克隆新环境，见 VenvCloner.clone"""
+    return VenvCloner(template_path, use_links).clone(dest_path)
+
+
+def verify_clone(dest_path, timeout=30):
+    """运行新环境的解释器，确认 sys.prefix 指向新环境"""
+    python_path = env_python(dest_path)
+    if python_path is None:
+        return False
+    try:
+        result = subprocess.run(
+            [python_path, "-c", "import sys; print(sys.prefix)"],
+            capture_output=True, text=True, timeout=timeout
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+    prefix = result.stdout.strip()
+    return result.returncode == 0 and os.path.normcase(os.path.realpath(prefix)) == os.path.normcase(os.path.realpath(dest_path))
+
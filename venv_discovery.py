@@ -0,0 +1,162 @@
+import os
+import time
+from collections import namedtuple
+
+from app_config import get_data_dir, load_json, save_json, load_settings
+
+# 发现的虚拟环境
+VirtualEnv = namedtuple("VirtualEnv", ["path", "name", "python", "version", "home"])
+
+# 不会包含虚拟环境、但文件数量巨大的目录，扫描时直接跳过
+PRUNE_DIRS = {
+    ".git", ".hg", ".svn", "node_modules", "__pycache__", "site-packages",
+    ".mypy_cache", ".pytest_cache", ".ruff_cache", ".cache", ".idea", ".vscode",
+    "bower_components", "$Recycle.Bin", "System Volume Information"
+}
+
+DEFAULT_MAX_DEPTH = 6
+INDEX_VERSION = 1
+
+
+def env_python(env_path):
+    """获取虚拟环境的解释器路径（兼容Windows和POSIX布局），不存在时返回None"""
+    for parts in (("Scripts", "python.exe"), ("bin", "python"), ("bin", "python3")):
+        path = os.path.join(env_path, *parts)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def read_pyvenv_cfg(path):
+    """解析 pyvenv.cfg 的 key = value 配置"""
+    values = {}
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if "=" in line:
+                    key, value = line.split("=", 1)
+                    values[key.strip().lower()] = value.strip()
+    except OSError:
+        pass
+    return values
+
+
+class VenvDiscovery:
+    def __init__(self, roots=None, index_path=None, max_depth=None, prune_dirs=None):
+        settings = load_settings()
+        if roots is None:
+            # 配置的搜索目录加上当前目录
+            roots = list(settings.get("venv_roots", [])) + [os.getcwd()]
+        self.roots = []
+        for root in roots:
+            root = os.path.abspath(os.path.expanduser(root))
+            if root not in self.roots:
+                self.roots.append(root)
+        self.max_depth = max_depth or settings.get("venv_scan_depth", DEFAULT_MAX_DEPTH)
+        self.prune_dirs = set(PRUNE_DIRS) | set(prune_dirs or settings.get("venv_prune_dirs", []))
+        self.index_path = index_path or os.path.join(get_data_dir("cache"), "venv_index.json")
+        # 程序数据目录（包含索引文件本身）不参与扫描，否则每次保存索引都会使其失效
+        self.skip_paths = {os.path.abspath(get_data_dir())}
+        # 上次扫描耗时和重新读取的目录数
+        self.last_scan_time = 0.0
+        self.last_scanned_dirs = 0
+
+    def _load_index(self):
+        index = load_json(self.index_path, {})
+        if index.get("version") != INDEX_VERSION:
+            return {}
+        return index.get("dirs", {})
+
+    def find(self):
+        """查找所有搜索目录下的虚拟环境（按路径排序）
+
+        目录的修改时间未变化时直接使用索引中记录的子目录，不再读取目录内容
+        """
+        start_time = time.perf_counter()
+        old_dirs = self._load_index()
+        new_dirs = {}
+        found = {}
+        self.last_scanned_dirs = 0
+
+        for root in self.roots:
+            self._walk(root, 0, old_dirs, new_dirs, found)
+
+        if new_dirs != old_dirs:
+            save_json(self.index_path, {"version": INDEX_VERSION, "dirs": new_dirs})
+        self.last_scan_time = time.perf_counter() - start_time
+        return [found[path] for path in sorted(found)]
+
+    def _walk(self, path, depth, old_dirs, new_dirs, found):
+        # 多个搜索目录相互嵌套时每个目录只处理一次
+        if path in new_dirs or path in self.skip_paths:
+            return
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return
+
+        entry = old_dirs.get(path)
+        if entry is None or entry["mtime"] != mtime:
+            entry = self._scan_dir(path, mtime)
+        else:
+            entry = dict(entry)
+        new_dirs[path] = entry
+
+        if entry.get("venv"):
+            found[path] = self._load_venv(path, entry, old_dirs.get(path))
+            # 虚拟环境内部不会再嵌套虚拟环境，不继续深入
+            return
+
+        if depth >= self.max_depth:
+            return
+        for name in entry["children"]:
+            self._walk(os.path.join(path, name), depth + 1, old_dirs, new_dirs, found)
+
+    def _scan_dir(self, path, mtime):
+        """读取目录内容，返回索引条目"""
+        self.last_scanned_dirs += 1
+        children = []
+        is_venv = False
+        try:
+            with os.scandir(path) as entries:
+                for item in entries:
+                    if item.name == "pyvenv.cfg":
+                        is_venv = True
+                    elif item.name not in self.prune_dirs:
+                        try:
+                            if item.is_dir(follow_symlinks=False):
+                                children.append(item.name)
+                        except OSError:
+                            pass
+        except OSError:
+            pass
+        if is_venv:
+            return {"mtime": mtime, "venv": True, "children": []}
+        return {"mtime": mtime, "children": sorted(children)}
+
+    def _load_venv(self, path, entry, old_entry):
+        """读取虚拟环境信息，pyvenv.cfg 未修改时使用索引中的记录"""
+        cfg_path = os.path.join(path, "pyvenv.cfg")
+        try:
+            cfg_mtime = os.stat(cfg_path).st_mtime
+        except OSError:
+            cfg_mtime = None
+
+        info = old_entry.get("info") if old_entry else None
+        if info is None or old_entry.get("cfg_mtime") != cfg_mtime:
+            cfg = read_pyvenv_cfg(cfg_path)
+            info = {
+                "python": env_python(path),
+                "version": cfg.get("version") or cfg.get("version_info") or "",
+                "home": cfg.get("home", "")
+            }
+        entry["cfg_mtime"] = cfg_mtime
+        entry["info"] = info
+        return VirtualEnv(path, os.path.basename(path), info["python"], info["version"], info["home"])
+
+    def clear(self):
+        """删除索引，下次查找时完整扫描"""
+        try:
+            os.remove(self.index_path)
+        except OSError:
+            pass
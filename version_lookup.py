@@ -0,0 +1,81 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from package_inventory import normalize_name
+from pypi_index import SimpleIndexClient, version_from_filename
+from http_client import get_client
+from version_utils import sort_versions, is_prerelease, parse_version
+
+# 项目的版本信息
+# versions: 未撤回的版本（按PEP 440从低到高），项目不存在或查询失败时为None；
+# yanked: 所有文件都已撤回的版本；latest: 最新稳定版（没有稳定版时为最新版本）；
+# newest: 包括预发布版本在内的最新版本；error: 查询失败时的错误信息
+ProjectVersions = namedtuple("ProjectVersions", ["name", "versions", "yanked", "latest", "newest", "error"])
+
+
+def project_versions(name, files):
+    """由项目的文件列表整理出 ProjectVersions"""
+    available = set()
+    yanked = set()
+    for item in files:
+        version = version_from_filename(item["filename"], name)
+        if version is None or parse_version(version) is None:
+            continue
+        if item["yanked"]:
+            yanked.add(version)
+        else:
+            available.add(version)
+    versions = sort_versions(available)
+    stable = [v for v in versions if not is_prerelease(v)]
+    return ProjectVersions(
+        name,
+        versions,
+        sort_versions(yanked - available),
+        (stable or versions or [None])[-1],
+        versions[-1] if versions else None,
+        None
+    )
+
+
+def latest_version(info, include_prereleases=False):
+    """可升级到的最新版本，include_prereleases 为True时包括预发布版本"""
+    return info.newest if include_prereleases else info.latest
+
+
+class VersionLookup:
+    """批量查询项目版本：并发请求Simple API，共享HTTP连接池和磁盘缓存"""
+
+    def __init__(self, mirror_url, cache=None, max_workers=16, timeout=15):
+        self.max_workers = max_workers
+        self.client = SimpleIndexClient(mirror_url, timeout=timeout, session=get_client().session, cache=cache)
+
+    def get(self, name):
+        """查询单个项目，返回 ProjectVersions"""
+        try:
+            files = self.client.get_project_files(name)
+        except Exception as e:
+            return ProjectVersions(name, None, [], None, None, str(e))
+        if files is None:
+            return ProjectVersions(name, None, [], None, None, None)
+        return project_versions(name, files)
+
+    def lookup(self, names, progress_callback=None):
+        """并发查询多个项目，返回 {名称: ProjectVersions}（顺序与输入一致）
+
+        规范化名称相同的项目只请求一次；progress_callback(已完成数, 总数)
+        """
+        keys = {}
+        for name in names:
+            keys.setdefault(normalize_name(name), name)
+
+        found = {}
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.get, name): key for key, name in keys.items()}
+            for future in as_completed(futures):
+                found[futures[future]] = future.result()
+                done += 1
+                if progress_callback:
+                    progress_callback(done, len(keys))
+
+        return {name: found[normalize_name(name)]._replace(name=name) for name in names}
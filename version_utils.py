@@ -0,0 +1,196 @@
+import re
+
+# PEP 440 版本号正则（与packaging库的定义保持一致）
+VERSION_PATTERN = re.compile(
+    r"""
+    ^\s*v?
+    (?:
+        (?:(?P<epoch>[0-9]+)!)?
+        (?P<release>[0-9]+(?:\.[0-9]+)*)
+        (?P<pre>
+            [-_\.]?
+            (?P<pre_l>alpha|beta|preview|pre|rc|a|b|c)
+            [-_\.]?
+            (?P<pre_n>[0-9]+)?
+        )?
+        (?P<post>
+            (?:-(?P<post_n1>[0-9]+))
+            |
+            (?:
+                [-_\.]?
+                (?P<post_l>post|rev|r)
+                [-_\.]?
+                (?P<post_n2>[0-9]+)?
+            )
+        )?
+        (?P<dev>
+            [-_\.]?
+            (?P<dev_l>dev)
+            [-_\.]?
+            (?P<dev_n>[0-9]+)?
+        )?
+    )
+    (?:\+(?P<local>[a-z0-9]+(?:[-_\.][a-z0-9]+)*))?
+    \s*$
+    """,
+    re.VERBOSE | re.IGNORECASE
+)
+
+# 预发布标记的排序
+PRE_RELEASE_ORDER = {
+    "a": 0, "alpha": 0,
+    "b": 1, "beta": 1,
+    "c": 2, "rc": 2, "pre": 2, "preview": 2
+}
+
+
+def parse_version(version):
+    """将版本号解析为可比较的排序键，无法解析时返回None"""
+    match = VERSION_PATTERN.match(version or "")
+    if not match:
+        return None
+
+    epoch = int(match.group("epoch") or 0)
+
+    # 去掉末尾的0，使 1.0 与 1.0.0 相等
+    release = [int(part) for part in match.group("release").split(".")]
+    while len(release) > 1 and release[-1] == 0:
+        release.pop()
+
+    has_pre = match.group("pre") is not None
+    has_post = match.group("post") is not None
+    has_dev = match.group("dev") is not None
+
+    if has_pre:
+        pre = (1, PRE_RELEASE_ORDER[match.group("pre_l").lower()], int(match.group("pre_n") or 0))
+    elif has_dev and not has_post:
+        # 1.0.dev0 排在 1.0a0 之前
+        pre = (0,)
+    else:
+        pre = (2,)
+
+    if has_post:
+        post = (1, int(match.group("post_n1") or match.group("post_n2") or 0))
+    else:
+        post = (0,)
+
+    if has_dev:
+        dev = (0, int(match.group("dev_n") or 0))
+    else:
+        dev = (1,)
+
+    local = match.group("local")
+    if local:
+        parts = re.split(r"[-_\.]", local.lower())
+        local_key = (1, tuple((1, int(p), "") if p.isdigit() else (0, 0, p) for p in parts))
+    else:
+        local_key = (0,)
+
+    return (epoch, tuple(release), pre, post, dev, local_key)
+
+
+def is_prerelease(version):
+    """判断是否为预发布版本（a/b/rc/dev）"""
+    match = VERSION_PATTERN.match(version or "")
+    if not match:
+        return False
+    return match.group("pre") is not None or match.group("dev") is not None
+
+
+def sort_versions(versions, reverse=False):
+    """按PEP 440规则排序并去重，忽略无法解析的版本号"""
+    keyed = {}
+    for version in versions:
+        key = parse_version(version)
+        if key is not None and key not in keyed:
+            keyed[key] = version
+    return [keyed[key] for key in sorted(keyed, reverse=reverse)]
+
+
+def compare_versions(v1, v2):
+    """比较两个版本号，返回 1 / 0 / -1"""
+    k1 = parse_version(v1)
+    k2 = parse_version(v2)
+    if k1 is None or k2 is None:
+        raise ValueError(f"无效的版本号: {v1 if k1 is None else v2}")
+    return (k1 > k2) - (k1 < k2)
+
+
+# 版本约束，如 ">=1.0"、"~=2.1"、"==1.4.*"
+SPECIFIER_PATTERN = re.compile(r"^\s*(===|==|!=|~=|<=|>=|<|>)\s*(\S+?)\s*$")
+
+
+def _release(version):
+    """版本号的发布部分（保留末尾的0）"""
+    match = VERSION_PATTERN.match(version)
+    return [int(part) for part in match.group("release").split(".")] if match else None
+
+
+def _strip_local(version):
+    return version.split("+", 1)[0]
+
+
+def _match_one(version, operator, target):
+    if operator == "===":
+        return version.strip() == target
+    if target.endswith(".*"):
+        # 前缀匹配，只用于 == 和 !=
+        prefix = _release(target[:-2])
+        release = _release(_strip_local(version))
+        if prefix is None or release is None:
+            return False
+        release = release + [0] * max(0, len(prefix) - len(release))
+        matched = release[:len(prefix)] == prefix
+        return matched if operator == "==" else not matched
+
+    # 约束中没有本地版本标签时忽略已安装版本的本地标签
+    if "+" not in target:
+        version = _strip_local(version)
+    key = parse_version(version)
+    target_key = parse_version(target)
+    if key is None or target_key is None:
+        return False
+
+    if operator == "==":
+        return key == target_key
+    if operator == "!=":
+        return key != target_key
+    if operator == ">=":
+        return key >= target_key
+    if operator == "<=":
+        return key <= target_key
+    if operator == ">":
+        # PEP 440: >V 不包括V的后发布版本，除非V本身就是后发布版本
+        if key <= target_key:
+            return False
+        if key[3] != (0,) and target_key[3] == (0,):
+            # 去掉后发布和开发版本部分后与V相同即为V的后发布版本
+            return key[:3] + ((0,), (1,), (0,)) != target_key
+        return True
+    if operator == "<":
+        # PEP 440: <V 不包括V的预发布版本，除非V本身就是预发布版本
+        if key >= target_key:
+            return False
+        if is_prerelease(version) and not is_prerelease(target):
+            # V的最早预发布版本为 V.dev0
+            return key < parse_version(_strip_local(target) + ".dev0")
+        return True
+    if operator == "~=":
+        # ~=2.2 等价于 >=2.2, ==2.*
+        release = _release(target)
+        if release is None or len(release) < 2:
+            return False
+        prefix = ".".join(str(part) for part in release[:-1]) + ".*"
+        return key >= target_key and _match_one(version, "==", prefix)
+    return False
+
+
+def version_matches(version, specifier):
+    """判断版本号是否满足逗号分隔的版本约束（空约束总是满足）"""
+    for part in (specifier or "").split(","):
+        if not part.strip():
+            continue
+        match = SPECIFIER_PATTERN.match(part)
+        if not match or not _match_one(version, match.group(1), match.group(2)):
+            return False
+    return True